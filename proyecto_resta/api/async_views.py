@@ -0,0 +1,263 @@
+import asyncio
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.views import View
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .broker import broker
+from .models import Menu, Mesas, Notificaciones, Pedido
+from .pagination import KeysetPagination, decode_position, encode_position, keyset_filter
+from .roles import aget_user_roles
+
+# Vistas de solo lectura nativas de ASGI para los endpoints más consultados. A diferencia de
+# las vistas genéricas de DRF (síncronas), no ocupan un hilo del pool de sync_to_async: usan el
+# ORM asíncrono (aget / aiterator) y serializan filas de values() directamente a JSON con el
+# mismo formato que los ModelSerializer con fields='__all__'.
+
+##############################################################################################################################
+
+async def autenticar(request):
+    # Autenticación JWT equivalente a JWTAuthentication, con la consulta del usuario asíncrona
+    autenticador = JWTAuthentication()
+    header = autenticador.get_header(request)
+    if header is None:
+        return None
+    raw_token = autenticador.get_raw_token(header)
+    if raw_token is None:
+        return None
+    token = autenticador.get_validated_token(raw_token)
+    try:
+        user = await User.objects.aget(**{jwt_settings.USER_ID_FIELD: token[jwt_settings.USER_ID_CLAIM]})
+    except (KeyError, User.DoesNotExist):
+        raise AuthenticationFailed('Usuario no encontrado.')
+    if not user.is_active:
+        raise AuthenticationFailed('Usuario inactivo.')
+    return user
+
+
+def valor_json(valor):
+    # Mismas representaciones que los campos de DRF
+    if isinstance(valor, datetime):
+        valor = timezone.localtime(valor).isoformat()
+        return valor[:-6] + 'Z' if valor.endswith('+00:00') else valor
+    if isinstance(valor, date):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    return valor
+
+
+def fila_json(fila):
+    return {campo: valor_json(valor) for campo, valor in fila.items()}
+
+
+def error(detalle, status):
+    return JsonResponse({'detail': detalle}, status=status)
+
+##############################################################################################################################
+
+class AsyncReadView(View):
+    model = None
+    # Roles que pueden acceder a la vista
+    roles = ('Admin', 'Cliente')
+
+    def get_fields(self):
+        return [field.name for field in self.model._meta.concrete_fields]
+
+    def get_queryset(self, request, user, **kwargs):
+        return self.model.objects.all()
+
+    async def check_permissions(self, request, user, **kwargs):
+        return bool(await aget_user_roles(user) & set(self.roles))
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            user = await autenticar(request)
+        except AuthenticationFailed as exc:
+            return error(str(exc.detail), 401)
+        if user is None:
+            return error('Las credenciales de autenticación no se proveyeron.', 401)
+        if not await self.check_permissions(request, user, **kwargs):
+            return error('Usted no tiene permiso para realizar esta acción.', 403)
+        request.user = user
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class AsyncListView(AsyncReadView):
+    # Listado con la misma paginación por cursor (creado, id) que KeysetPagination
+    cursor_field = None
+    chunk_size = 500
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.GET[KeysetPagination.page_size_query_param])
+        except (KeyError, ValueError):
+            return KeysetPagination.page_size
+        if page_size <= 0:
+            return KeysetPagination.page_size
+        return min(page_size, KeysetPagination.max_page_size)
+
+    async def get(self, request, *args, **kwargs):
+        page_size = self.get_page_size(request)
+        queryset = self.get_queryset(request, request.user, **kwargs).order_by(f'-{self.cursor_field}', '-pk')
+
+        cursor = request.GET.get(KeysetPagination.cursor_query_param)
+        if cursor is not None:
+            try:
+                queryset = queryset.filter(keyset_filter(self.cursor_field, *decode_position(cursor)))
+            except ValueError:
+                return error(KeysetPagination.invalid_cursor_message, 404)
+
+        filas = [
+            fila async for fila in
+            queryset.values(*self.get_fields())[:page_size + 1].aiterator(chunk_size=self.chunk_size)
+        ]
+        pagina = filas[:page_size]
+
+        url = request.build_absolute_uri()
+        siguiente = None
+        if len(filas) > page_size:
+            ultima = pagina[-1]
+            siguiente = replace_query_param(
+                url, KeysetPagination.cursor_query_param,
+                encode_position(ultima[self.cursor_field], ultima['id']),
+            )
+        return JsonResponse({
+            'next': siguiente,
+            'first': remove_query_param(url, KeysetPagination.cursor_query_param),
+            'results': [fila_json(fila) for fila in pagina],
+        })
+
+
+class AsyncDetailView(AsyncReadView):
+    async def get(self, request, pk, *args, **kwargs):
+        try:
+            fila = await self.get_queryset(request, request.user, **kwargs).values(*self.get_fields()).aget(pk=pk)
+        except self.model.DoesNotExist:
+            raise Http404
+        return JsonResponse(fila_json(fila))
+
+##############################################################################################################################
+
+class AsyncMenuList(AsyncListView):
+    model = Menu
+    cursor_field = 'menu_creado'
+
+class AsyncMenuDetail(AsyncDetailView):
+    model = Menu
+
+##############################################################################################################################
+
+class AsyncMesasList(AsyncListView):
+    model = Mesas
+    cursor_field = 'mesa_creada'
+    roles = ('Admin',)
+
+class AsyncMesasDetail(AsyncDetailView):
+    model = Mesas
+    roles = ('Admin',)
+
+##############################################################################################################################
+
+class AsyncPedidoPorUsuario(AsyncListView):
+    model = Pedido
+    cursor_field = 'pedido_creado'
+
+    async def check_permissions(self, request, user, **kwargs):
+        # Un cliente solo puede consultar sus propios pedidos; un Admin, los de cualquiera
+        roles = await aget_user_roles(user)
+        return 'Admin' in roles or ('Cliente' in roles and kwargs['id_cliente'] == user.pk)
+
+    def get_queryset(self, request, user, **kwargs):
+        return Pedido.objects.filter(cliente_fk=kwargs['id_cliente'])
+
+##############################################################################################################################
+
+class AsyncNotificacionesList(AsyncListView):
+    # Notificaciones del usuario autenticado
+    model = Notificaciones
+    cursor_field = 'notificacion_creada'
+
+    def get_queryset(self, request, user, **kwargs):
+        return Notificaciones.objects.filter(cliente_fk=user)
+
+class AsyncNotificacionesStream(AsyncReadView):
+    # Server-Sent Events con las notificaciones no leídas del usuario autenticado. Al conectar
+    # se reenvían todas las pendientes posteriores a Last-Event-ID (o ?last_event_id=), por
+    # páginas, y luego se empujan las nuevas a medida que se confirman, sin que el cliente
+    # tenga que consultar.
+    model = Notificaciones
+    # Notificaciones pendientes leídas por consulta durante el reenvío
+    max_reenvio = 500
+
+    def get_ultimo_id(self, request):
+        valor = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id') or 0
+        try:
+            return max(int(valor), 0)
+        except ValueError:
+            return 0
+
+    def evento(self, fila):
+        datos = json.dumps(fila_json(fila))
+        return f"id: {fila['id']}\nevent: notificacion\ndata: {datos}\n\n"
+
+    async def eventos(self, user, ultimo_id):
+        # Suscribirse antes de leer la base de datos para no perder las creadas entre medio
+        suscripcion = broker.suscribir(user.pk)
+        try:
+            # Reenvío por cursor sobre id hasta ponerse al día. Una notificación confirmada
+            # durante el reenvío puede llegar también por la suscripción: se recuerdan los ids
+            # reenviados para no repetirla.
+            reenviados = set()
+            while True:
+                pagina = (
+                    Notificaciones.objects
+                    .filter(cliente_fk=user, id__gt=ultimo_id)
+                    .no_leidas()
+                    .order_by('id')
+                    .values(*self.get_fields())[:self.max_reenvio]
+                )
+                leidas = 0
+                async for fila in pagina.aiterator():
+                    leidas += 1
+                    ultimo_id = fila['id']
+                    reenviados.add(ultimo_id)
+                    yield self.evento(fila)
+                if leidas < self.max_reenvio:
+                    break
+
+            while True:
+                try:
+                    fila = await asyncio.wait_for(suscripcion.cola.get(), timeout=settings.SSE_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    # Comentario SSE para mantener viva la conexión a través de proxies
+                    yield ': ping\n\n'
+                    continue
+                if fila is None or suscripcion.desbordada:
+                    return
+                # Los ids no llegan en orden de confirmación: solo se omiten los ya reenviados
+                if fila['id'] in reenviados:
+                    reenviados.discard(fila['id'])
+                    continue
+                yield self.evento(fila)
+        finally:
+            broker.cancelar(suscripcion)
+
+    async def get(self, request, *args, **kwargs):
+        response = StreamingHttpResponse(
+            self.eventos(request.user, self.get_ultimo_id(request)),
+            content_type='text/event-stream',
+        )
+        response['Cache-Control'] = 'no-cache'
+        # Evitar que nginx acumule el stream en su buffer
+        response['X-Accel-Buffering'] = 'no'
+        return response
@@ -0,0 +1,271 @@
+import re
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, resolve
+from django.utils import timezone
+from rest_framework.mixins import ListModelMixin, RetrieveModelMixin
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from . import urls
+from .cache import catalogo_cache
+from .conditional import ConditionalGetMixin
+from .models import (
+    CategoriaMenu, Comentarios, DetallePedido, Factura, HistorialEstados, Menu, Mesas, MesasEstado, MetodoDePago,
+    Notificaciones, Pedido, Promocion, Reserva, ResumenVentas,
+)
+
+# Mediciones de los endpoints GET de api/urls.py: latencia (p50/p95/p99) y peticiones por
+# segundo a través de la pila completa (middleware, JWT, vista y renderizado), y filas por
+# segundo de cada serializador de listado. Los resultados se comparan con una línea base JSON.
+
+# Modelo de los ids de cada prefijo de ruta (/api/async/<prefijo>/ usa el mismo)
+MODELOS = {
+    'users': User,
+    'categoriamenu': CategoriaMenu,
+    'menu': Menu,
+    'historialestados': HistorialEstados,
+    'pedidos': Pedido,
+    'promociones': Promocion,
+    'metodosdepago': MetodoDePago,
+    'estadomesas': MesasEstado,
+    'mesas': Mesas,
+    'comentarios': Comentarios,
+    'notificaciones': Notificaciones,
+    'reservas': Reserva,
+    'facturas': Factura,
+    'detallespedido': DetallePedido,
+}
+# Rutas que no terminan (Server-Sent Events)
+EXCLUIDAS = {'async/notificaciones/stream/'}
+# Métricas comparadas con la línea base: True si un valor mayor es peor
+METRICAS = {'p50_ms': True, 'p95_ms': True, 'rps': False, 'filas_por_s': False}
+# Paso de EXPLAIN QUERY PLAN de SQLite que recorre una tabla completa, sin índice
+# ('SCAN api_factura'; 'SCAN TABLE api_factura' en versiones anteriores a la 3.36)
+RECORRIDO_COMPLETO_RE = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$')
+
+
+def parametros_consulta(ruta):
+    # Query string necesario para que la ruta responda 200
+    ahora = timezone.now().replace(minute=0, second=0, microsecond=0)
+    return {
+        'menu/buscar/': {'q': 'pollo asado'},
+        'mesas/disponibles/': {'personas': 4, 'desde': ahora.isoformat(), 'hasta': (ahora + timedelta(hours=4)).isoformat()},
+        'reportes/ventas/': {'dimension': ResumenVentas.DIMENSION_MENU},
+    }.get(ruta, {})
+
+
+def rutas_get():
+    # (ruta, clase de la vista) de cada ruta de la API que atiende GET
+    rutas = []
+    for patron in urls.urlpatterns:
+        if not isinstance(patron, URLPattern):
+            continue
+        ruta = str(patron.pattern)
+        vista = getattr(patron.callback, 'view_class', None)
+        if ruta in EXCLUIDAS or vista is None or not hasattr(vista, 'get'):
+            continue
+        rutas.append((ruta, vista))
+    return rutas
+
+
+def resolver_ruta(ruta, cliente):
+    # Sustituye los parámetros de la ruta por ids existentes, preferentemente del cliente
+    prefijo = ruta.removeprefix('async/').split('/')[0]
+    url = ruta
+    for parametro, valor in (
+        ('<int:pk>', None),
+        ('<int:id_cliente>', cliente.pk),
+        ('<int:usuario_id>', cliente.pk),
+        ('<str:estado>', HistorialEstados.ESTADO_ENTREGADO),
+    ):
+        if parametro not in url:
+            continue
+        if valor is None:
+            modelo = MODELOS[prefijo]
+            objetos = modelo.objects.order_by('pk')
+            if any(campo.name == 'cliente_fk' for campo in modelo._meta.fields):
+                objetos = objetos.filter(cliente_fk=cliente)
+            valor = objetos.values_list('pk', flat=True).first()
+        url = url.replace(parametro, str(valor))
+    return '/api/' + url
+
+
+def obtener_token(client, username, password):
+    # Token de acceso real, emitido por /api/token/
+    response = client.post('/api/token/', {'username': username, 'password': password})
+    if response.status_code != 200:
+        raise ValueError(f'No se pudo autenticar a {username}: {response.status_code}')
+    return response.json()['access']
+
+
+def percentiles(latencias):
+    if len(latencias) < 2:
+        return {'p50_ms': latencias[0], 'p95_ms': latencias[0], 'p99_ms': latencias[0]}
+    cuantiles = statistics.quantiles(latencias, n=100, method='inclusive')
+    return {'p50_ms': cuantiles[49], 'p95_ms': cuantiles[94], 'p99_ms': cuantiles[98]}
+
+
+def pedir(client, url, parametros, headers):
+    # Petición completa: las respuestas en streaming se consumen hasta el final
+    response = client.get(url, parametros, headers=headers)
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+def medir_ruta(client, url, parametros, token, repeticiones):
+    headers = {'Authorization': f'Bearer {token}'}
+    # Una petición previa para calentar cachés y conexiones
+    response = pedir(client, url, parametros, headers)
+    if response.status_code != 200:
+        return {'estado': response.status_code}
+
+    # Consultas de una petición completa sin la caché del catálogo (la de roles ya está caliente)
+    catalogo_cache().clear()
+    with CaptureQueriesContext(connection) as capturadas:
+        pedir(client, url, parametros, headers)
+    # Contar ya: captured_queries es una vista de connection.queries, que cada petición
+    # siguiente vacía al emitir request_started
+    consultas = len(capturadas)
+
+    latencias = []
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        antes = time.perf_counter()
+        pedir(client, url, parametros, headers)
+        latencias.append((time.perf_counter() - antes) * 1000)
+    duracion = time.perf_counter() - inicio
+    return {
+        'estado': 200, 'consultas': consultas,
+        **percentiles(latencias), 'rps': repeticiones / duracion,
+    }
+
+
+def medir_rutas(admin, cliente, password, repeticiones=50):
+    # Recorre todas las rutas GET con el token del Admin o, si la vista lo rechaza, del Cliente
+    client = Client()
+    tokens = {
+        'Admin': obtener_token(client, admin.username, password),
+        'Cliente': obtener_token(client, cliente.username, password),
+    }
+    resultados = {}
+    for ruta, _ in rutas_get():
+        url = resolver_ruta(ruta, cliente)
+        parametros = parametros_consulta(ruta)
+        for rol in ('Admin', 'Cliente'):
+            resultado = medir_ruta(client, url, parametros, tokens[rol], repeticiones)
+            if resultado['estado'] != 403:
+                break
+        resultados[f'GET {ruta}'] = {'rol': rol, **resultado}
+    return resultados
+
+
+def medir_serializadores(admin, filas=200, repeticiones=5):
+    # Filas por segundo de cada vista de listado: se carga el queryset de la vista una vez y
+    # se mide solo la serialización (incluidas las consultas que el serializador dispare)
+    factory = APIRequestFactory()
+    resultados = {}
+    for ruta, vista_clase in rutas_get():
+        if '<' in ruta or not issubclass(vista_clase, ListModelMixin):
+            continue
+        request = factory.get('/api/' + ruta, parametros_consulta(ruta))
+        force_authenticate(request, user=admin)
+        vista = vista_clase()
+        vista.setup(request)
+        vista.request = vista.initialize_request(request)
+        vista.format_kwarg = None
+        objetos = list(vista.get_queryset()[:filas])
+        if not objetos:
+            continue
+
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            vista.get_serializer(objetos, many=True).data
+        duracion = time.perf_counter() - inicio
+        nombre = f'{ruta} {vista.get_serializer_class().__name__}'
+        resultados[nombre] = {'filas': len(objetos), 'filas_por_s': len(objetos) * repeticiones / duracion}
+    return resultados
+
+
+def consultas_de_vista(url, parametros, user):
+    # SQL que ejecuta el queryset de la vista al atender la URL: los validadores de caché
+    # condicional (si los tiene) y la página de un listado (con filtros, orden y cursor) o el
+    # objeto de un detalle, sin autenticación
+    match = resolve(url)
+    request = APIRequestFactory().get(url, parametros)
+    force_authenticate(request, user=user)
+    vista = match.func.view_class()
+    vista.setup(request, *match.args, **match.kwargs)
+    vista.request = vista.initialize_request(request)
+    vista.format_kwarg = None
+    # Los validadores usan el formato negociado
+    vista.request.accepted_renderer, vista.request.accepted_media_type = vista.perform_content_negotiation(vista.request)
+    with CaptureQueriesContext(connection) as capturadas:
+        if isinstance(vista, ConditionalGetMixin):
+            if isinstance(vista, RetrieveModelMixin):
+                vista.get_detail_validators(vista.request)
+            else:
+                vista.get_list_validators(vista.request)
+        if isinstance(vista, RetrieveModelMixin):
+            vista.get_object()
+        else:
+            queryset = vista.filter_queryset(vista.get_queryset())
+            pagina = vista.paginate_queryset(queryset)
+            if pagina is None:
+                list(queryset)
+    return [consulta['sql'] for consulta in capturadas.captured_queries]
+
+
+def plan_de_consulta(sql):
+    # Pasos de EXPLAIN QUERY PLAN (solo SQLite)
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+        return [fila[-1] for fila in cursor.fetchall()]
+
+
+def recorridos_completos(sqls):
+    # Tablas que alguna de las consultas recorre completas en lugar de usar un índice
+    tablas = set()
+    for sql in sqls:
+        for paso in plan_de_consulta(sql):
+            coincidencia = RECORRIDO_COMPLETO_RE.match(paso)
+            if coincidencia:
+                tablas.add(coincidencia.group(1))
+    return tablas
+
+
+def comparar(actual, base, tolerancia, minimo_ms=1.0):
+    # Regresiones de 'actual' frente a 'base' mayores que la tolerancia (0.25 = 25 %), como
+    # (escala, nombre, métrica, valor base, valor actual). En las rutas además se exige que la
+    # latencia empeore al menos minimo_ms, para no marcar el ruido de las respuestas de 1 ms
+    regresiones = []
+    for escala, secciones in actual.get('escalas', {}).items():
+        base_escala = base.get('escalas', {}).get(escala, {})
+        for seccion in ('rutas', 'serializadores'):
+            for nombre, medidas in secciones.get(seccion, {}).items():
+                previas = base_escala.get(seccion, {}).get(nombre)
+                if not previas:
+                    continue
+                for metrica, mayor_es_peor in METRICAS.items():
+                    if metrica not in medidas or not previas.get(metrica):
+                        continue
+                    cambio = medidas[metrica] / previas[metrica] - 1
+                    if (cambio if mayor_es_peor else -cambio) <= tolerancia:
+                        continue
+                    if metrica == 'rps':
+                        # Latencia media equivalente a las peticiones por segundo
+                        diferencia_ms = 1000 / medidas[metrica] - 1000 / previas[metrica]
+                    elif metrica.endswith('_ms'):
+                        diferencia_ms = medidas[metrica] - previas[metrica]
+                    else:
+                        diferencia_ms = None
+                    if diferencia_ms is None or diferencia_ms >= minimo_ms:
+                        regresiones.append((escala, nombre, metrica, previas[metrica], medidas[metrica]))
+    return regresiones
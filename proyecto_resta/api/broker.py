@@ -0,0 +1,68 @@
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+
+
+class Suscripcion:
+    # Cola de eventos de un stream SSE. Si el cliente no consume a tiempo y la cola se llena,
+    # la suscripción se marca como desbordada y el stream se cierra: el cliente se reconecta
+    # con Last-Event-ID y recupera lo pendiente desde la base de datos.
+    def __init__(self, user_id, loop, max_size):
+        self.user_id = user_id
+        self.loop = loop
+        self.cola = asyncio.Queue(maxsize=max_size)
+        self.desbordada = False
+
+    def _encolar(self, evento):
+        try:
+            self.cola.put_nowait(evento)
+        except asyncio.QueueFull:
+            self.desbordada = True
+            # Despertar al consumidor para que cierre el stream
+            self.cola.get_nowait()
+            self.cola.put_nowait(None)
+
+
+class NotificacionesBroker:
+    # Broker en memoria del proceso: reparte las notificaciones nuevas a los streams SSE
+    # abiertos de su destinatario. Solo alcanza a los clientes conectados a este mismo
+    # proceso; los demás las reciben al reconectarse gracias a Last-Event-ID.
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._suscripciones = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def suscribir(self, user_id):
+        suscripcion = Suscripcion(user_id, asyncio.get_running_loop(), self.max_size)
+        with self._lock:
+            self._suscripciones[user_id].add(suscripcion)
+        return suscripcion
+
+    def cancelar(self, suscripcion):
+        with self._lock:
+            suscripciones = self._suscripciones.get(suscripcion.user_id)
+            if suscripciones is not None:
+                suscripciones.discard(suscripcion)
+                if not suscripciones:
+                    del self._suscripciones[suscripcion.user_id]
+
+    def suscritos(self):
+        # Ids de los usuarios con al menos un stream abierto en este proceso
+        with self._lock:
+            return set(self._suscripciones)
+
+    def publicar(self, user_id, evento):
+        # Puede llamarse desde cualquier hilo (p. ej. una señal post_save de una vista síncrona)
+        with self._lock:
+            suscripciones = list(self._suscripciones.get(user_id, ()))
+        for suscripcion in suscripciones:
+            try:
+                suscripcion.loop.call_soon_threadsafe(suscripcion._encolar, evento)
+            except RuntimeError:
+                # El event loop del stream ya se cerró
+                self.cancelar(suscripcion)
+
+
+broker = NotificacionesBroker(max_size=getattr(settings, 'SSE_COLA_MAXIMA', 100))
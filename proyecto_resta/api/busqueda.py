@@ -0,0 +1,244 @@
+import heapq
+import math
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.module_loading import import_string
+
+from .models import Menu
+
+# Búsqueda de platos por nombre y descripción, sin distinguir acentos ni mayúsculas, con
+# coincidencia por prefijo (para autocompletar) y resultados ordenados por relevancia.
+# El backend se elige con settings.MENU_BUSQUEDA_BACKEND; por defecto FTS5 en SQLite y un
+# índice invertido en memoria del proceso con las demás bases de datos.
+
+# Peso de una aparición en el nombre frente a una en la descripción
+PESO_NOMBRE = 5.0
+PESO_DESCRIPCION = 1.0
+# Factor para los términos que solo coinciden por prefijo
+FACTOR_PREFIJO = 0.5
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def normalizar(texto):
+    # Minúsculas y sin diacríticos: 'Piñón' -> 'pinon'
+    descompuesto = unicodedata.normalize('NFKD', texto.lower())
+    return ''.join(caracter for caracter in descompuesto if not unicodedata.combining(caracter))
+
+
+def tokenizar(texto):
+    return TOKEN_RE.findall(normalizar(texto or ''))
+
+
+class BusquedaBackend:
+    # Interfaz de los backends de búsqueda de Menu
+    def buscar(self, consulta, limite):
+        # Lista de (menu_id, puntaje) del más al menos relevante. Todos los términos deben
+        # coincidir, completos o como prefijo de una palabra
+        raise NotImplementedError
+
+    def menu_guardado(self, menu):
+        raise NotImplementedError
+
+    def menu_eliminado(self, menu_id):
+        raise NotImplementedError
+
+    def reconstruir(self):
+        raise NotImplementedError
+
+
+class FTS5Backend(BusquedaBackend):
+    # Tabla virtual FTS5 de SQLite (migración 0007) con el tokenizador unicode61, que también
+    # elimina los diacríticos. Se escribe en la misma transacción que el menú.
+    tabla = 'api_menu_busqueda'
+
+    def buscar(self, consulta, limite):
+        terminos = tokenizar(consulta)
+        if not terminos:
+            return []
+        # Cada término entre comillas y con '*' para coincidir por prefijo
+        expresion = ' '.join(f'"{termino}"*' for termino in terminos)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid, bm25({self.tabla}, %s, %s) AS rango FROM {self.tabla} '
+                f'WHERE {self.tabla} MATCH %s ORDER BY rango, rowid LIMIT %s',
+                [PESO_NOMBRE, PESO_DESCRIPCION, expresion, limite],
+            )
+            # bm25() es menor cuanto más relevante
+            return [(menu_id, -rango) for menu_id, rango in cursor.fetchall()]
+
+    def menu_guardado(self, menu):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.tabla} WHERE rowid = %s', [menu.pk])
+            cursor.execute(
+                f'INSERT INTO {self.tabla} (rowid, nombre, descripcion) VALUES (%s, %s, %s)',
+                [menu.pk, menu.nombre, menu.descripcion],
+            )
+
+    def menu_eliminado(self, menu_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.tabla} WHERE rowid = %s', [menu_id])
+
+    def reconstruir(self):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.tabla}')
+            cursor.execute(
+                f'INSERT INTO {self.tabla} (rowid, nombre, descripcion) '
+                f'SELECT id, nombre, descripcion FROM {Menu._meta.db_table}'
+            )
+
+
+class IndiceInvertidoBackend(BusquedaBackend):
+    # Índice invertido en memoria del proceso: término -> {menu_id: peso}, más el vocabulario
+    # ordenado para resolver prefijos con búsqueda binaria. Las señales de Menu lo actualizan
+    # al confirmar la transacción; el TTL acota el desfase con los cambios hechos en otros
+    # procesos, reconstruyéndolo completo al vencer. Solo un hilo reconstruye a la vez: mientras
+    # tanto las demás búsquedas usan el índice anterior (o esperan, si aún no hay ninguno).
+    def __init__(self, ttl=None):
+        self.ttl = ttl if ttl is not None else getattr(settings, 'MENU_BUSQUEDA_TTL', 300)
+        self._lock = threading.Lock()
+        self._reconstruyendo = threading.Lock()
+        self._construido = None
+        self._postings = {}
+        self._documentos = {}
+        self._vocabulario = []
+
+    def _pesos(self, nombre, descripcion):
+        pesos = Counter()
+        for token in tokenizar(nombre):
+            pesos[token] += PESO_NOMBRE
+        for token in tokenizar(descripcion):
+            pesos[token] += PESO_DESCRIPCION
+        return pesos
+
+    def _agregar(self, menu_id, nombre, descripcion):
+        self._quitar(menu_id)
+        pesos = self._pesos(nombre, descripcion)
+        for token, peso in pesos.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                insort(self._vocabulario, token)
+            postings[menu_id] = peso
+        self._documentos[menu_id] = set(pesos)
+
+    def _quitar(self, menu_id):
+        for token in self._documentos.pop(menu_id, ()):
+            postings = self._postings[token]
+            del postings[menu_id]
+            if not postings:
+                del self._postings[token]
+                del self._vocabulario[bisect_left(self._vocabulario, token)]
+
+    def reconstruir(self):
+        with self._reconstruyendo:
+            self._reconstruir()
+
+    def _refrescar(self):
+        # Reconstruye el índice vencido salvo que otro hilo ya lo esté haciendo
+        if self._vigente():
+            return
+        if not self._reconstruyendo.acquire(blocking=self._construido is None):
+            return
+        try:
+            # Quien esperaba el primer índice lo encuentra ya construido
+            if not self._vigente():
+                self._reconstruir()
+        finally:
+            self._reconstruyendo.release()
+
+    def _reconstruir(self):
+        nuevo = IndiceInvertidoBackend(self.ttl)
+        menus = Menu.objects.values_list('pk', 'nombre', 'descripcion').order_by()
+        for menu_id, nombre, descripcion in menus.iterator(chunk_size=2000):
+            nuevo._agregar(menu_id, nombre, descripcion)
+        with self._lock:
+            self._postings = nuevo._postings
+            self._documentos = nuevo._documentos
+            self._vocabulario = nuevo._vocabulario
+            self._construido = time.monotonic()
+
+    def _vigente(self):
+        return self._construido is not None and time.monotonic() - self._construido < self.ttl
+
+    def menu_guardado(self, menu):
+        menu_id, nombre, descripcion = menu.pk, menu.nombre, menu.descripcion
+
+        def indexar():
+            with self._lock:
+                if self._construido is not None:
+                    self._agregar(menu_id, nombre, descripcion)
+
+        transaction.on_commit(indexar)
+
+    def menu_eliminado(self, menu_id):
+        def quitar():
+            with self._lock:
+                if self._construido is not None:
+                    self._quitar(menu_id)
+
+        transaction.on_commit(quitar)
+
+    def _candidatos(self, termino, total):
+        # Menús que contienen el término o una palabra que empieza por él, con su puntaje
+        candidatos = defaultdict(float)
+        posicion = bisect_left(self._vocabulario, termino)
+        while posicion < len(self._vocabulario) and self._vocabulario[posicion].startswith(termino):
+            token = self._vocabulario[posicion]
+            postings = self._postings[token]
+            idf = math.log(1 + total / len(postings))
+            factor = 1.0 if token == termino else FACTOR_PREFIJO
+            for menu_id, peso in postings.items():
+                candidatos[menu_id] = max(candidatos[menu_id], peso * idf * factor)
+            posicion += 1
+        return candidatos
+
+    def buscar(self, consulta, limite):
+        terminos = tokenizar(consulta)
+        if not terminos:
+            return []
+        self._refrescar()
+
+        with self._lock:
+            total = len(self._documentos)
+            puntajes = None
+            for termino in terminos:
+                candidatos = self._candidatos(termino, total)
+                if puntajes is None:
+                    puntajes = candidatos
+                else:
+                    puntajes = {menu_id: puntaje + candidatos[menu_id] for menu_id, puntaje in puntajes.items() if menu_id in candidatos}
+                if not puntajes:
+                    return []
+        return heapq.nlargest(limite, puntajes.items(), key=lambda item: (item[1], -item[0]))
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            ruta = getattr(settings, 'MENU_BUSQUEDA_BACKEND', None)
+            if ruta is None:
+                ruta = 'api.busqueda.FTS5Backend' if connection.vendor == 'sqlite' else 'api.busqueda.IndiceInvertidoBackend'
+            _backend = import_string(ruta)()
+        return _backend
+
+
+def buscar_menus(consulta, limite, queryset=None):
+    # Menús en orden de relevancia (una consulta al índice y otra a Menu). 'queryset' permite
+    # cargarlos con select_related/only, p. ej. el de la vista ajustado a ?fields= y ?expand=
+    resultados = get_backend().buscar(consulta, limite)
+    queryset = Menu.objects.all() if queryset is None else queryset
+    menus = queryset.in_bulk([menu_id for menu_id, _ in resultados])
+    return [menus[menu_id] for menu_id, _ in resultados if menu_id in menus]
@@ -0,0 +1,71 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+from .conditional import ConditionalGetMixin, calcular_etag
+
+CATALOGO_VERSION_KEY = 'catalogo:version'
+
+
+def catalogo_cache():
+    # Backend configurable en settings.CACHES (LocMem, archivos, Redis, Memcached...)
+    return caches[getattr(settings, 'CATALOGO_CACHE_ALIAS', 'default')]
+
+
+def get_catalogo_version():
+    # Si la clave de versión se pierde (expulsión o reinicio) se reinicia con la hora actual,
+    # de modo que nunca vuelva a coincidir con una generación anterior todavía en caché.
+    cache = catalogo_cache()
+    version = cache.get(CATALOGO_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOGO_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(CATALOGO_VERSION_KEY)
+    return version
+
+
+def bump_catalogo_version():
+    # Invalida de golpe todas las respuestas del catálogo al cambiar de generación
+    cache = catalogo_cache()
+    try:
+        cache.incr(CATALOGO_VERSION_KEY)
+    except ValueError:
+        cache.set(CATALOGO_VERSION_KEY, time.time_ns(), timeout=None)
+
+
+class CatalogoCacheMixin(ConditionalGetMixin):
+    # Cache de lectura para listados del catálogo: guarda los bytes ya renderizados de la
+    # respuesta bajo una clave que incluye la versión del catálogo, la URL completa y el
+    # formato negociado, y los devuelve sin consultar la base de datos ni serializar.
+    # El ETag también se deriva de la versión, así que un 304 tampoco hace consultas.
+    # Las expansiones del catálogo (?expand=) solo alcanzan modelos del catálogo, que también
+    # cambian la versión, por lo que estas respuestas sí se pueden guardar.
+    def get_cache_key(self, request):
+        return ':'.join([
+            'catalogo',
+            str(get_catalogo_version()),
+            request.accepted_media_type,
+            request.build_absolute_uri(),
+        ])
+
+    def get_list_validators(self, request):
+        return calcular_etag(self.get_cache_key(request)), None
+
+    def get_list_response(self, request, *args, **kwargs):
+        cache = catalogo_cache()
+        key = self.get_cache_key(request)
+
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+
+        response = super().get_list_response(request, *args, **kwargs)
+
+        def guardar(response):
+            if response.status_code == 200:
+                cache.set(key, (response.content, response['Content-Type']))
+
+        response.add_post_render_callback(guardar)
+        return response
@@ -0,0 +1,74 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, FloatField, Q, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce
+from django.db.models.lookups import GreaterThan
+from django.utils import timezone
+
+from .cache import bump_catalogo_version
+from .models import CAMPOS_CALIFICACION, Comentarios, Menu
+
+# Columna del histograma para cada calificación válida
+CAMPOS_HISTOGRAMA = {calificacion: f'calificaciones_{calificacion}' for calificacion in range(1, 6)}
+
+
+def _promedio(suma, total):
+    return Case(
+        When(GreaterThan(total, 0), then=Cast(Cast(suma, FloatField()) / total, DecimalField(max_digits=3, decimal_places=2))),
+        default=Value(0),
+        output_field=DecimalField(max_digits=3, decimal_places=2),
+    )
+
+
+def aplicar_calificacion(menu_id, calificacion, signo):
+    # Suma (signo=1) o resta (signo=-1) una calificación al resumen del menú con un solo
+    # UPDATE ... SET x = x ± n, sin leer el menú ni agregar sus comentarios
+    total = F('calificaciones_total') + signo
+    suma = F('calificaciones_suma') + signo * calificacion
+    cambios = {
+        'calificaciones_total': total,
+        'calificaciones_suma': suma,
+        'calificacion_promedio': _promedio(suma, total),
+        'menu_actualizado': timezone.now(),
+    }
+    campo = CAMPOS_HISTOGRAMA.get(calificacion)
+    if campo is not None:
+        cambios[campo] = F(campo) + signo
+    Menu.objects.filter(pk=menu_id).update(**cambios)
+    # El catálogo en caché incluye las calificaciones
+    transaction.on_commit(bump_catalogo_version)
+
+
+def reconstruir_calificaciones(lote=1000):
+    # Recalcula el resumen de todos los menús con una sola consulta agrupada sobre Comentarios
+    grupos = {
+        grupo['menu_fk']: grupo
+        for grupo in (
+            Comentarios.objects
+            .values('menu_fk')
+            .annotate(
+                total=Count('pk'),
+                suma=Coalesce(Sum('calificacion'), 0),
+                **{campo: Count('pk', filter=Q(calificacion=valor)) for valor, campo in CAMPOS_HISTOGRAMA.items()},
+            )
+            .order_by()
+        )
+    }
+
+    with transaction.atomic():
+        menus = []
+        for menu in Menu.objects.only('pk', *CAMPOS_CALIFICACION).iterator(chunk_size=lote):
+            grupo = grupos.get(menu.pk, {})
+            menu.calificaciones_total = grupo.get('total', 0)
+            menu.calificaciones_suma = grupo.get('suma', 0)
+            for campo in CAMPOS_HISTOGRAMA.values():
+                setattr(menu, campo, grupo.get(campo, 0))
+            menu.calificacion_promedio = (
+                (Decimal(menu.calificaciones_suma) / menu.calificaciones_total).quantize(Decimal('0.01'))
+                if menu.calificaciones_total else 0
+            )
+            menus.append(menu)
+        Menu.objects.bulk_update(menus, CAMPOS_CALIFICACION, batch_size=lote)
+        transaction.on_commit(bump_catalogo_version)
+    return len(menus)
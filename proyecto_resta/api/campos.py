@@ -0,0 +1,167 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch, QuerySet
+from django.utils.module_loading import import_string
+from rest_framework import serializers
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.permissions import SAFE_METHODS
+
+# Campos a medida en las lecturas de la API:
+#   ?fields=id,nombre              solo esos campos en la respuesta
+#   ?expand=categoria_fk           el objeto relacionado anidado en lugar de su id
+#   ?expand=menu_fk.categoria_fk   expansiones encadenadas
+#   ?fields=id,menu_fk.nombre&expand=menu_fk
+# El serializador recorta sus campos (CamposDinamicosMixin) y CamposDinamicosFilter ajusta el
+# queryset de la vista a lo que se va a serializar: .only() con las columnas necesarias,
+# select_related para las relaciones de un objeto y prefetch_related para las de varios, de
+# modo que la respuesta expandida se obtiene con un número constante de consultas.
+
+PARAMETRO_CAMPOS = 'fields'
+PARAMETRO_EXPANDIR = 'expand'
+
+
+def arbol(valor):
+    # 'id,menu_fk.nombre' -> {'id': {}, 'menu_fk': {'nombre': {}}}
+    raiz = {}
+    for ruta in valor.split(','):
+        nodo = raiz
+        for nombre in ruta.strip().split('.'):
+            if nombre:
+                nodo = nodo.setdefault(nombre, {})
+    return raiz
+
+
+def parametros_campos(request):
+    # (campos, expandir) pedidos en el query string. Solo aplican a lecturas: en las
+    # escrituras el serializador conserva todos sus campos y relaciones por id.
+    if request is None or request.method not in SAFE_METHODS:
+        return None, {}
+    campos = request.query_params.get(PARAMETRO_CAMPOS)
+    expandir = request.query_params.get(PARAMETRO_EXPANDIR)
+    return (arbol(campos) or None) if campos else None, arbol(expandir) if expandir else {}
+
+
+def relacion(modelo, nombre):
+    # Campo de relación del modelo con ese nombre de atributo (directo o inverso, p. ej. 'detallepedido_set')
+    for campo in modelo._meta.get_fields():
+        if not campo.is_relation:
+            continue
+        atributo = campo.get_accessor_name() if campo.auto_created and not campo.concrete else campo.name
+        if atributo == nombre:
+            return campo
+    return None
+
+
+class CamposDinamicosMixin:
+    # Serializador con ?fields= y ?expand=. Las relaciones expandibles se declaran en
+    # Meta.expandibles como {atributo: nombre del serializador} (del mismo módulo o ruta completa).
+    # Los serializadores anidados reciben sus campos y expansiones del padre, no del request.
+
+    def __init__(self, *args, campos=None, expandir=None, **kwargs):
+        anidado = expandir is not None
+        super().__init__(*args, **kwargs)
+        if not anidado:
+            campos, expandir = parametros_campos(self.context.get('request'))
+        if campos is not None or expandir:
+            self.aplicar_campos(campos, expandir)
+
+    def serializador_expandible(self, nombre):
+        ruta = getattr(self.Meta, 'expandibles', {})[nombre]
+        if '.' not in ruta:
+            ruta = f'{type(self).__module__}.{ruta}'
+        return import_string(ruta)
+
+    def aplicar_campos(self, campos, expandir):
+        expandibles = getattr(self.Meta, 'expandibles', {})
+        for nombre, subarbol in expandir.items():
+            if nombre not in expandibles:
+                raise serializers.ValidationError({PARAMETRO_EXPANDIR: [f"'{nombre}' no se puede expandir."]})
+            campo = relacion(self.Meta.model, nombre)
+            self.fields[nombre] = self.serializador_expandible(nombre)(
+                many=campo.one_to_many or campo.many_to_many, read_only=True,
+                campos=(campos or {}).get(nombre) or None, expandir=subarbol,
+            )
+
+        if campos is None:
+            return
+        desconocidos = [nombre for nombre in campos if nombre not in self.fields]
+        if desconocidos:
+            raise serializers.ValidationError({PARAMETRO_CAMPOS: [f"Campo desconocido: '{nombre}'." for nombre in desconocidos]})
+        sin_expandir = [nombre for nombre, subarbol in campos.items() if subarbol and nombre not in expandir]
+        if sin_expandir:
+            raise serializers.ValidationError({PARAMETRO_CAMPOS: [f"'{nombre}' debe incluirse en ?{PARAMETRO_EXPANDIR}=." for nombre in sin_expandir]})
+        # Las relaciones expandidas se incluyen aunque no se listen en ?fields=
+        for nombre in list(self.fields):
+            if nombre not in campos and nombre not in expandir:
+                self.fields.pop(nombre)
+
+
+def _hijo(campo):
+    # Serializador anidado (o el hijo de una lista de ellos) de un campo expandido
+    campo = getattr(campo, 'child', campo)
+    return campo if isinstance(campo, CamposDinamicosMixin) else None
+
+
+def plan_consulta(serializer, modelo, prefijo=''):
+    # (columnas para .only() o None si hace falta la fila completa, rutas de select_related,
+    # Prefetch) necesarios para serializar instancias de 'modelo' con 'serializer'
+    columnas, seleccionadas, prefetch = [], [], []
+    completa = False
+    for campo in serializer.fields.values():
+        if campo.write_only:
+            continue
+        hijo = _hijo(campo)
+        if hijo is not None:
+            rel = relacion(modelo, campo.source)
+            if rel.one_to_many or rel.many_to_many:
+                # Una consulta por relación; el FK hacia el padre es necesario para repartir las filas
+                siempre = [rel.field.name] if rel.one_to_many else []
+                queryset = optimizar_queryset(rel.related_model._default_manager.all(), hijo, siempre)
+                prefetch.append(Prefetch(prefijo + campo.source, queryset=queryset))
+                continue
+            columnas.append(prefijo + campo.source)
+            seleccionadas.append(prefijo + campo.source)
+            sub_columnas, sub_seleccionadas, sub_prefetch = plan_consulta(hijo, rel.related_model, f'{prefijo}{campo.source}__')
+            # Sin columnas del relacionado, select_related lo carga completo
+            columnas.extend(sub_columnas or [])
+            seleccionadas.extend(sub_seleccionadas)
+            prefetch.extend(sub_prefetch)
+            continue
+        try:
+            campo_modelo = modelo._meta.get_field(campo.source)
+        except FieldDoesNotExist:
+            # Propiedades, anotaciones o source='*': no se puede saber qué columnas usan
+            completa = True
+            continue
+        if not campo_modelo.concrete or campo_modelo.many_to_many:
+            completa = True
+            continue
+        columnas.append(prefijo + campo_modelo.name)
+    return (None if completa else columnas), seleccionadas, prefetch
+
+
+def optimizar_queryset(queryset, serializer, siempre=()):
+    # Aplica el plan de consulta del serializador; 'siempre' son columnas que necesita la vista
+    columnas, seleccionadas, prefetch = plan_consulta(serializer, queryset.model)
+    if seleccionadas:
+        queryset = queryset.select_related(*seleccionadas)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    if columnas is not None:
+        queryset = queryset.only(*columnas, *siempre)
+    return queryset
+
+
+class CamposDinamicosFilter(BaseFilterBackend):
+    # Ajusta el queryset de las lecturas con ?fields= o ?expand= (filter_queryset se aplica
+    # tanto a los listados como a get_object). Sin esos parámetros no cambia nada.
+
+    def filter_queryset(self, request, queryset, view):
+        campos, expandir = parametros_campos(request)
+        if (campos is None and not expandir) or not isinstance(queryset, QuerySet):
+            return queryset
+        serializer = view.get_serializer()
+        if not isinstance(serializer, CamposDinamicosMixin):
+            return queryset
+        # La paginación por cursor lee cursor_field de la última fila
+        cursor_field = getattr(view, 'cursor_field', None)
+        return optimizar_queryset(queryset, serializer, [cursor_field] if cursor_field else [])
@@ -0,0 +1,111 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+from .campos import PARAMETRO_EXPANDIR
+from .metricas import fase
+
+
+def calcular_etag(*partes):
+    return quote_etag(hashlib.md5('|'.join(str(parte) for parte in partes).encode()).hexdigest())
+
+
+class ConditionalGetMixin:
+    # GET condicional (ETag / Last-Modified / 304) a partir del campo auto_now del modelo.
+    # Los validadores se calculan con una consulta mínima antes de serializar: para listados
+    # paginados, (id, actualizado) de las filas de la página pedida, que lee el mismo índice que
+    # la página y cuesta lo mismo a cualquier profundidad; para detalles el timestamp de la fila.
+    # Si el cliente ya tiene la versión vigente se responde 304 sin serializar nada.
+    # Los listados solo llevan ETag: un Last-Modified (el máximo de 'actualizado') no cambia al
+    # borrar filas, así que un If-Modified-Since recibiría un 304 obsoleto.
+    # Con ?expand= no hay validadores: los objetos anidados cambian sin tocar la fila principal.
+
+    def get_updated_field(self):
+        model = self.get_queryset().model
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False):
+                return field.name
+        return None
+
+    def get_list_validators(self, request):
+        updated_field = self.get_updated_field()
+        if updated_field is None or request.query_params.get(PARAMETRO_EXPANDIR):
+            return None, None
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.paginator is not None and hasattr(self.paginator, 'page_queryset'):
+            filas = self.paginator.page_queryset(queryset, request, self).values_list('pk', updated_field)
+            version = [f'{pk}:{actualizado.isoformat()}' for pk, actualizado in filas]
+        else:
+            # Sin paginación por cursor: resumen de todo el listado (recorre el queryset filtrado)
+            resumen = queryset.aggregate(ultimo=Max(updated_field), total=Count('pk'))
+            version = [resumen['ultimo'].isoformat() if resumen['ultimo'] else '', resumen['total']]
+        etag = calcular_etag(request.build_absolute_uri(), request.accepted_media_type, *version)
+        return etag, None
+
+    def get_detail_validators(self, request):
+        updated_field = self.get_updated_field()
+        if updated_field is None or request.query_params.get(PARAMETRO_EXPANDIR):
+            return None, None
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        ultimo = (
+            self.get_queryset()
+            .filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+            .values_list(updated_field, flat=True)
+            .first()
+        )
+        if ultimo is None:
+            # No existe: dejar que la vista responda 404 normalmente
+            return None, None
+        # La URL completa: cada ?fields= es una representación distinta
+        etag = calcular_etag(request.get_full_path(), request.accepted_media_type, self.kwargs[lookup_url_kwarg], ultimo.isoformat())
+        return etag, ultimo
+
+    def conditional_response(self, request, validators, get_response):
+        etag, ultimo = validators
+        if etag is None:
+            return get_response()
+
+        last_modified = int(ultimo.timestamp()) if ultimo else None
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = get_response()
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def get_list_response(self, request, *args, **kwargs):
+        # Igual que ListModelMixin.list, midiendo la serialización (ver api/metricas.py)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page if page is not None else queryset, many=True)
+        with fase('serializacion'):
+            data = serializer.data
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def get_detail_response(self, request, *args, **kwargs):
+        # Igual que RetrieveModelMixin.retrieve, midiendo la serialización
+        serializer = self.get_serializer(self.get_object())
+        with fase('serializacion'):
+            data = serializer.data
+        return Response(data)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request,
+            self.get_list_validators(request),
+            lambda: self.get_list_response(request, *args, **kwargs),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request,
+            self.get_detail_validators(request),
+            lambda: self.get_detail_response(request, *args, **kwargs),
+        )
@@ -0,0 +1,36 @@
+from django.db import transaction
+from django.utils import timezone
+
+from .models import EventoEstadoPedido, HistorialEstados, Pedido
+
+# Flujo de un pedido en orden: solo se permite avanzar
+ORDEN_ESTADOS = [estado for estado, _ in HistorialEstados.ESTADOS_CHOICES]
+
+
+def estados_previos(estado):
+    # Estados desde los que se puede avanzar hasta 'estado'
+    return ORDEN_ESTADOS[:ORDEN_ESTADOS.index(estado)]
+
+
+def avanzar_pedidos(pedido_ids, estado):
+    # Avanza varios pedidos a 'estado' en una transacción: un INSERT con los eventos y un
+    # UPDATE del estado actual desnormalizado. Los pedidos inexistentes o que ya están en ese
+    # estado (o en uno posterior) se omiten.
+    ahora = timezone.now()
+    with transaction.atomic():
+        actualizados = list(
+            Pedido.objects
+            .select_for_update()
+            .filter(pk__in=pedido_ids, estado_actual__in=estados_previos(estado))
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        )
+        if actualizados:
+            EventoEstadoPedido.objects.bulk_create([
+                EventoEstadoPedido(pedido_fk_id=pk, estado=estado, evento_creado=ahora) for pk in actualizados
+            ])
+            Pedido.objects.filter(pk__in=actualizados).update(
+                estado_actual=estado, estado_actualizado=ahora, pedido_actualizado=ahora,
+            )
+    omitidos = sorted(set(pedido_ids).difference(actualizados))
+    return actualizados, omitidos
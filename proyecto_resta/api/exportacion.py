@@ -0,0 +1,71 @@
+import csv
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+from .pagination import keyset_filter
+
+# Exportación en streaming de tablas grandes (CSV o NDJSON). Las filas se leen con values_list,
+# sin construir instancias del modelo, por lotes de settings.EXPORTACION_LOTE recorridos por
+# cursor (creado, id) con el mismo índice de la paginación, y se envían a medida que se leen:
+# la memoria del servidor no depende del número de filas exportadas. Se usan lotes por cursor
+# en lugar de QuerySet.iterator() porque el driver de MySQL carga el resultado completo en memoria.
+
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+
+class _Eco:
+    # Archivo falso para csv.writer: devuelve la línea escrita en lugar de guardarla
+    def write(self, valor):
+        return valor
+
+
+def lotes(queryset, cursor_field, columnas, lote=None):
+    # Tuplas de 'columnas' ordenadas por (cursor_field, id), por lotes de una consulta cada uno
+    lote = lote or settings.EXPORTACION_LOTE
+    posicion_cursor, posicion_pk = columnas.index(cursor_field), columnas.index('id')
+    queryset = queryset.order_by(cursor_field, 'pk')
+    ultima = None
+    while True:
+        pagina = queryset
+        if ultima is not None:
+            pagina = pagina.filter(keyset_filter(cursor_field, ultima[posicion_cursor], ultima[posicion_pk], ascending=True))
+        filas = list(pagina.values_list(*columnas)[:lote])
+        if filas:
+            yield filas
+        if len(filas) < lote:
+            return
+        ultima = filas[-1]
+
+
+def _valor_csv(valor):
+    if valor is None:
+        return ''
+    if hasattr(valor, 'isoformat'):
+        return valor.isoformat()
+    return valor
+
+
+def filas_csv(lotes_filas, columnas):
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(columnas)
+    for filas in lotes_filas:
+        # Un fragmento de la respuesta por lote, no por fila
+        yield ''.join(escritor.writerow([_valor_csv(valor) for valor in fila]) for fila in filas)
+
+
+def filas_ndjson(lotes_filas, columnas):
+    for filas in lotes_filas:
+        yield ''.join(json.dumps(dict(zip(columnas, fila)), cls=DjangoJSONEncoder) + '\n' for fila in filas)
+
+
+def respuesta_exportacion(queryset, cursor_field, columnas, formato, nombre):
+    generador = filas_csv if formato == 'csv' else filas_ndjson
+    response = StreamingHttpResponse(generador(lotes(queryset, cursor_field, columnas), columnas), content_type=FORMATOS[formato])
+    response['Content-Disposition'] = f'attachment; filename="{nombre}.{formato}"'
+    return response
@@ -0,0 +1,272 @@
+import csv
+import io
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .busqueda import get_backend as get_busqueda_backend
+from .cache import bump_catalogo_version
+from .models import CategoriaMenu, Menu
+from .serializers import SOLO_LETRAS_RE
+
+# Importación masiva (upsert) de CategoriaMenu y Menu desde CSV o NDJSON. El archivo se lee
+# como stream y se procesa por lotes de settings.IMPORTACION_LOTE filas: cada lote se valida
+# con las mismas reglas que los serializadores, resuelve sus categorías y menús existentes con
+# una consulta y se guarda con bulk_create / bulk_update en su propia transacción. Las filas
+# inválidas no detienen la importación: se devuelven en el reporte con su número de fila.
+
+MENSAJE_SOLO_LETRAS = "Este campo solo debe contener letras y espacios."
+VERDADEROS = {'1', 'true', 'si', 'sí', 'yes'}
+FALSOS = {'0', 'false', 'no'}
+FORMATOS = ('csv', 'ndjson')
+
+
+def leer_filas(archivo, formato):
+    # (número de fila, dict) de un archivo binario, sin cargarlo completo en memoria. En CSV
+    # la fila 1 es el encabezado; en NDJSON cada línea es una fila.
+    texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+    if formato == 'csv':
+        lector = csv.DictReader(texto)
+        for fila in lector:
+            yield lector.line_num, fila
+        return
+    for numero, linea in enumerate(texto, start=1):
+        if not linea.strip():
+            continue
+        try:
+            fila = json.loads(linea)
+        except ValueError:
+            fila = None
+        yield numero, fila if isinstance(fila, dict) else None
+
+
+def _texto(fila, campo):
+    valor = fila.get(campo)
+    return '' if valor is None else str(valor).strip()
+
+
+class Importador:
+    modelo = None
+
+    def __init__(self, simular=False, lote=None):
+        self.simular = simular
+        self.lote = lote or settings.IMPORTACION_LOTE
+        self.creados = 0
+        self.actualizados = 0
+        self.errores = []
+        self.errores_total = 0
+
+    def importar(self, filas):
+        pendientes = []
+        for numero, fila in filas:
+            pendientes.append((numero, fila))
+            if len(pendientes) >= self.lote:
+                self.procesar_lote(pendientes)
+                pendientes = []
+        if pendientes:
+            self.procesar_lote(pendientes)
+        return self.reporte()
+
+    def reporte(self):
+        return {
+            'creados': self.creados,
+            'actualizados': self.actualizados,
+            'errores_total': self.errores_total,
+            # Las primeras IMPORTACION_MAX_ERRORES filas con errores
+            'errores': self.errores,
+            'simulado': self.simular,
+        }
+
+    def error(self, numero, errores):
+        self.errores_total += 1
+        if len(self.errores) < settings.IMPORTACION_MAX_ERRORES:
+            self.errores.append({'fila': numero, 'errores': errores})
+
+    def procesar_lote(self, filas):
+        validas = []
+        for numero, fila in filas:
+            if fila is None:
+                self.error(numero, {'fila': ['La fila no es un objeto JSON válido.']})
+                continue
+            datos, errores = self.validar(fila)
+            if errores:
+                self.error(numero, errores)
+            else:
+                validas.append((numero, datos))
+        if validas:
+            with transaction.atomic():
+                self.guardar(validas)
+                if self.simular:
+                    transaction.set_rollback(True)
+
+    def validar(self, fila):
+        raise NotImplementedError
+
+    def guardar(self, filas):
+        raise NotImplementedError
+
+
+class ImportadorCategorias(Importador):
+    # Upsert por nombre (restricción categoria_nombre_unico) con bulk_create(update_conflicts=True)
+    modelo = CategoriaMenu
+
+    def validar(self, fila):
+        errores = {}
+        nombre = _texto(fila, 'nombre')
+        descripcion = _texto(fila, 'descripcion')
+        if not nombre:
+            errores['nombre'] = ["El nombre no puede estar vacío."]
+        elif len(nombre) > CategoriaMenu._meta.get_field('nombre').max_length:
+            errores['nombre'] = ["El nombre es demasiado largo."]
+        elif not SOLO_LETRAS_RE.match(nombre):
+            errores['nombre'] = [MENSAJE_SOLO_LETRAS]
+        if not descripcion:
+            errores['descripcion'] = ["Este campo es requerido."]
+        elif not SOLO_LETRAS_RE.match(descripcion):
+            errores['descripcion'] = [MENSAJE_SOLO_LETRAS]
+        return {'nombre': nombre, 'descripcion': descripcion}, errores
+
+    def guardar(self, filas):
+        # Una fila por nombre: si se repite en el lote, gana la última
+        categorias = {datos['nombre']: datos for _, datos in filas}
+        existentes = set(CategoriaMenu.objects.filter(nombre__in=categorias).values_list('nombre', flat=True))
+        ahora = timezone.now()
+        CategoriaMenu.objects.bulk_create(
+            [CategoriaMenu(categoria_creada=ahora, categoria_actualizada=ahora, **datos) for datos in categorias.values()],
+            update_conflicts=True,
+            # MySQL resuelve el conflicto con cualquier restricción única (ON DUPLICATE KEY UPDATE)
+            unique_fields=['nombre'] if connection.features.supports_update_conflicts_with_target else None,
+            update_fields=['descripcion', 'categoria_actualizada'],
+        )
+        self.creados += len(categorias) - len(existentes)
+        self.actualizados += len(existentes)
+        transaction.on_commit(bump_catalogo_version)
+
+
+class ImportadorMenus(Importador):
+    # Upsert por 'id' si la fila lo trae o por (categoría, nombre). La categoría se indica por
+    # su nombre en la columna 'categoria'. El resumen de calificaciones nunca se modifica.
+    modelo = Menu
+    CAMPOS = ['nombre', 'descripcion', 'precio', 'disponibilidad', 'categoria_fk', 'menu_actualizado']
+
+    def validar(self, fila):
+        errores = {}
+        datos = {
+            'nombre': _texto(fila, 'nombre'),
+            'descripcion': _texto(fila, 'descripcion'),
+            'categoria': _texto(fila, 'categoria'),
+        }
+
+        nombre = datos['nombre']
+        if not nombre:
+            errores['nombre'] = ["El nombre del menú no puede estar vacío."]
+        elif len(nombre) < 3:
+            errores['nombre'] = ["El nombre del menú debe tener al menos 3 caracteres."]
+        elif len(nombre) > Menu._meta.get_field('nombre').max_length:
+            errores['nombre'] = ["El nombre del menú es demasiado largo."]
+        elif not SOLO_LETRAS_RE.match(nombre):
+            errores['nombre'] = [MENSAJE_SOLO_LETRAS]
+        if not datos['descripcion']:
+            errores['descripcion'] = ["Este campo es requerido."]
+        elif not SOLO_LETRAS_RE.match(datos['descripcion']):
+            errores['descripcion'] = [MENSAJE_SOLO_LETRAS]
+        if not datos['categoria']:
+            errores['categoria'] = ["Este campo es requerido."]
+
+        try:
+            precio = Decimal(_texto(fila, 'precio'))
+        except InvalidOperation:
+            errores['precio'] = ["Se requiere un número válido."]
+        else:
+            if not precio.is_finite() or precio <= 0:
+                errores['precio'] = ["El precio del menú debe ser un valor positivo."]
+            elif precio.as_tuple().exponent < -2 or precio.adjusted() >= 8:
+                errores['precio'] = ["El precio admite hasta 8 enteros y 2 decimales."]
+            datos['precio'] = precio
+
+        disponibilidad = _texto(fila, 'disponibilidad').lower()
+        if disponibilidad in VERDADEROS or disponibilidad == '':
+            datos['disponibilidad'] = True
+        elif disponibilidad in FALSOS:
+            datos['disponibilidad'] = False
+        else:
+            errores['disponibilidad'] = ["Se requiere un valor booleano válido."]
+
+        identificador = _texto(fila, 'id')
+        datos['id'] = None
+        if identificador:
+            if identificador.isdigit():
+                datos['id'] = int(identificador)
+            else:
+                errores['id'] = ["Se requiere un número entero válido."]
+        return datos, errores
+
+    def guardar(self, filas):
+        # Categorías del lote por nombre, en una sola consulta
+        categorias = dict(
+            CategoriaMenu.objects
+            .filter(nombre__in={datos['categoria'] for _, datos in filas})
+            .values_list('nombre', 'pk')
+        )
+        # Menús existentes del lote, por id y por (categoría, nombre), en una sola consulta
+        ids = {datos['id'] for _, datos in filas if datos['id']}
+        nombres = {datos['nombre'] for _, datos in filas if not datos['id']}
+        existentes = Menu.objects.filter(pk__in=ids) | Menu.objects.filter(categoria_fk__in=categorias.values(), nombre__in=nombres)
+        por_id = {}
+        por_clave = {}
+        for menu in existentes.defer('descripcion').order_by('pk'):
+            por_id[menu.pk] = menu
+            por_clave.setdefault((menu.categoria_fk_id, menu.nombre), menu)
+
+        ahora = timezone.now()
+        nuevos = {}
+        actualizados = {}
+        for numero, datos in filas:
+            categoria_id = categorias.get(datos['categoria'])
+            if categoria_id is None:
+                self.error(numero, {'categoria': [f"No existe la categoría '{datos['categoria']}'."]})
+                continue
+            if datos['id']:
+                menu = por_id.get(datos['id'])
+                if menu is None:
+                    self.error(numero, {'id': [f"No existe el menú {datos['id']}."]})
+                    continue
+            else:
+                clave = (categoria_id, datos['nombre'])
+                menu = por_clave.get(clave) or nuevos.get(clave)
+                if menu is None:
+                    menu = nuevos[clave] = Menu(menu_creado=ahora)
+
+            menu.nombre = datos['nombre']
+            menu.descripcion = datos['descripcion']
+            menu.precio = datos['precio']
+            menu.disponibilidad = datos['disponibilidad']
+            menu.categoria_fk_id = categoria_id
+            menu.menu_actualizado = ahora
+            if menu.pk is not None:
+                actualizados[menu.pk] = menu
+
+        # Solo los campos importados: el resumen de calificaciones queda intacto
+        Menu.objects.bulk_update(actualizados.values(), self.CAMPOS, batch_size=self.lote)
+        creados = Menu.objects.bulk_create(nuevos.values(), batch_size=self.lote)
+        self.creados += len(creados)
+        self.actualizados += len(actualizados)
+
+        # bulk_create / bulk_update no emiten señales: índice de búsqueda y caché del catálogo
+        busqueda = get_busqueda_backend()
+        if creados and any(menu.pk is None for menu in creados):
+            # Sin los ids de los nuevos (MySQL) el índice se reconstruye al confirmar
+            transaction.on_commit(busqueda.reconstruir)
+        else:
+            for menu in [*actualizados.values(), *creados]:
+                busqueda.menu_guardado(menu)
+        transaction.on_commit(bump_catalogo_version)
+
+
+IMPORTADORES = {
+    'menu': ImportadorMenus,
+    'categoria': ImportadorCategorias,
+}
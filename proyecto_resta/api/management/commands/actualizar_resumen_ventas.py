@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from api.ventas import actualizar_resumenes
+
+
+class Command(BaseCommand):
+    help = (
+        'Incorpora a los resúmenes de ventas los DetallePedido creados o modificados desde la última '
+        'ejecución (marca de agua). Pensado para ejecutarse periódicamente (cron).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, help='Detalles procesados por transacción.')
+
+    def handle(self, *args, **options):
+        procesados = actualizar_resumenes(lote=options['lote'])
+        self.stdout.write(self.style.SUCCESS(f'{procesados} detalles incorporados a los resúmenes de ventas.'))
@@ -0,0 +1,73 @@
+import asyncio
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara peticiones por segundo de las vistas síncronas (DRF) y las asíncronas (/api/async/) '
+        'ejecutándolas de forma concurrente contra la aplicación ASGI del proyecto.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', help='Usuario con el que autenticarse (por defecto, el primer Admin).')
+        parser.add_argument('--peticiones', type=int, default=500, help='Peticiones por endpoint.')
+        parser.add_argument('--concurrencia', type=int, default=50, help='Peticiones simultáneas.')
+
+    def handle(self, *args, **options):
+        if options['usuario']:
+            user = User.objects.filter(username=options['usuario']).first()
+        else:
+            user = User.objects.filter(groups__name='Admin').order_by('pk').first()
+        if user is None:
+            raise CommandError('No se encontró un usuario con el que autenticarse.')
+
+        token = str(RefreshToken.for_user(user).access_token)
+        pares = [
+            ('menu', '/api/menu/', '/api/async/menu/'),
+            ('mesas', '/api/mesas/', '/api/async/mesas/'),
+            ('pedidos por cliente', f'/api/pedidos/cliente/{user.pk}/', f'/api/async/pedidos/cliente/{user.pk}/'),
+            ('notificaciones', '/api/notificaciones/', '/api/async/notificaciones/'),
+        ]
+
+        self.stdout.write(f"{'endpoint':<22}{'vista':<8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errores':>9}")
+        # El cliente de pruebas usa el host 'testserver'
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            for nombre, url_sync, url_async in pares:
+                for vista, url in (('sync', url_sync), ('async', url_async)):
+                    rps, p50, p95, errores = asyncio.run(
+                        self.medir(url, token, options['peticiones'], options['concurrencia'])
+                    )
+                    self.stdout.write(f'{nombre:<22}{vista:<8}{rps:>10.1f}{p50:>10.2f}{p95:>10.2f}{errores:>9}')
+
+    async def medir(self, url, token, peticiones, concurrencia):
+        client = AsyncClient()
+        headers = {'Authorization': f'Bearer {token}'}
+        semaforo = asyncio.Semaphore(concurrencia)
+        latencias = []
+        errores = 0
+
+        async def una_peticion():
+            nonlocal errores
+            async with semaforo:
+                inicio = time.perf_counter()
+                response = await client.get(url, headers=headers)
+                latencias.append((time.perf_counter() - inicio) * 1000)
+                if response.status_code != 200:
+                    errores += 1
+
+        # Una petición previa para calentar cachés y conexiones
+        await client.get(url, headers=headers)
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(una_peticion() for _ in range(peticiones)))
+        duracion = time.perf_counter() - inicio
+
+        cuantiles = statistics.quantiles(latencias, n=100)
+        return peticiones / duracion, cuantiles[49], cuantiles[94], errores
@@ -0,0 +1,118 @@
+import json
+from io import StringIO
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from api.benchmark import comparar, medir_rutas, medir_serializadores
+from api.management.commands.generar_datos import PREFIJO
+from api.models import DetallePedido, Factura, Menu, Pedido
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide latencia (p50/p95/p99), peticiones por segundo y filas serializadas por segundo de '
+        'todas las rutas GET de la API con datos sintéticos de varios tamaños, en una base de datos '
+        'de pruebas temporal. Compara contra una línea base JSON y falla si hay regresiones.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escalas', type=float, nargs='+', default=[0.01, 0.1, 1.0], help='Escalas de generar_datos a medir.')
+        parser.add_argument('--semilla', type=int, default=1, help='Semilla de los datos generados.')
+        parser.add_argument('--repeticiones', type=int, default=50, help='Peticiones medidas por ruta.')
+        parser.add_argument('--filas', type=int, default=200, help='Filas por medición de serializador.')
+        parser.add_argument(
+            '--linea-base', default=str(Path(settings.BASE_DIR) / 'benchmarks' / 'linea_base.json'),
+            help='Archivo JSON con la línea base.',
+        )
+        parser.add_argument('--guardar', action='store_true', help='Guardar los resultados como nueva línea base.')
+        parser.add_argument(
+            '--tolerancia', type=float, default=settings.BENCHMARK_TOLERANCIA,
+            help='Empeoramiento relativo admitido antes de marcar una regresión (0.25 = 25 %%).',
+        )
+        parser.add_argument('--minimo-ms', type=float, default=1.0, help='Empeoramiento mínimo de latencia, en ms, para marcar una regresión.')
+
+    def handle(self, *args, **options):
+        if options['repeticiones'] <= 0 or options['filas'] <= 0:
+            raise CommandError('--repeticiones y --filas deben ser mayores a cero.')
+        if any(escala <= 0 for escala in options['escalas']):
+            raise CommandError('Las escalas deben ser mayores a cero.')
+
+        resultados = {
+            'generado': timezone.now().isoformat(),
+            'base_de_datos': connection.vendor,
+            'repeticiones': options['repeticiones'],
+            'escalas': {},
+        }
+        # Los datos se generan en una base de datos de pruebas que se destruye al terminar
+        nombre_original = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            # El cliente de pruebas usa el host 'testserver'
+            with override_settings(ALLOWED_HOSTS=['testserver']):
+                for escala in options['escalas']:
+                    resultados['escalas'][str(escala)] = self.medir_escala(escala, options)
+        finally:
+            connection.creation.destroy_test_db(nombre_original, verbosity=0)
+
+        ruta_base = Path(options['linea_base'])
+        if options['guardar']:
+            ruta_base.parent.mkdir(parents=True, exist_ok=True)
+            ruta_base.write_text(json.dumps(resultados, indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+            self.stdout.write(self.style.SUCCESS(f'Línea base guardada en {ruta_base}.'))
+            return
+        if not ruta_base.exists():
+            self.stdout.write(self.style.WARNING(f'No hay línea base en {ruta_base}; use --guardar para crearla.'))
+            return
+
+        regresiones = comparar(
+            resultados, json.loads(ruta_base.read_text(encoding='utf-8')),
+            options['tolerancia'], options['minimo_ms'],
+        )
+        for escala, nombre, metrica, previo, actual in regresiones:
+            self.stdout.write(self.style.ERROR(f'[{escala}] {nombre}: {metrica} {previo:.2f} -> {actual:.2f}'))
+        if regresiones:
+            raise CommandError(f'{len(regresiones)} regresiones superan la tolerancia de {options["tolerancia"]:.0%}.')
+        self.stdout.write(self.style.SUCCESS('Sin regresiones frente a la línea base.'))
+
+    def medir_escala(self, escala, options):
+        password = 'benchmark123'
+        call_command(
+            'generar_datos', '--limpiar', '--escala', str(escala), '--semilla', str(options['semilla']),
+            '--password', password, stdout=self.stdout if options['verbosity'] > 1 else StringIO(),
+        )
+        usuarios = User.objects.filter(username__startswith=PREFIJO).order_by('pk')
+        admin = usuarios.filter(groups__name='Admin').first()
+        # El cliente con más pedidos, para que sus listados no salgan vacíos
+        cliente = (
+            usuarios.filter(groups__name='Cliente')
+            .annotate(pedidos=Count('pedido')).order_by('-pedidos', 'pk').first()
+        )
+
+        filas = {modelo.__name__: modelo.objects.count() for modelo in (Menu, Pedido, DetallePedido, Factura)}
+        self.stdout.write(self.style.MIGRATE_HEADING(f'Escala {escala}: ' + ', '.join(f'{n} {m}' for m, n in filas.items())))
+
+        rutas = medir_rutas(admin, cliente, password, options['repeticiones'])
+        self.stdout.write(f"{'ruta':<48}{'rol':<9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}{'consultas':>11}")
+        for nombre, medidas in rutas.items():
+            if medidas['estado'] != 200:
+                self.stdout.write(self.style.WARNING(f"{nombre:<48}{medidas['rol']:<9}  estado {medidas['estado']}"))
+                continue
+            self.stdout.write(
+                f"{nombre:<48}{medidas['rol']:<9}{medidas['p50_ms']:>9.2f}{medidas['p95_ms']:>9.2f}"
+                f"{medidas['p99_ms']:>9.2f}{medidas['rps']:>9.1f}{medidas['consultas']:>11}"
+            )
+
+        serializadores = medir_serializadores(admin, options['filas'])
+        self.stdout.write(f"{'serializador':<66}{'filas/s':>12}")
+        for nombre, medidas in serializadores.items():
+            self.stdout.write(f"{nombre:<66}{medidas['filas_por_s']:>12.0f}")
+
+        return {'filas': filas, 'rutas': rutas, 'serializadores': serializadores}
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import Menu
+from api.notificaciones import DESTINO_CLIENTES, DESTINO_MENU, destinatarios, enviar_notificaciones
+
+
+class Command(BaseCommand):
+    help = 'Envía una notificación a todos los clientes o a quienes pidieron un menú, en lotes con bulk_create.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('mensaje', help='Texto de la notificación.')
+        parser.add_argument('--destino', choices=[DESTINO_CLIENTES, DESTINO_MENU], default=DESTINO_CLIENTES)
+        parser.add_argument('--menu', type=int, help="ID del menú (requerido con --destino menu).")
+        parser.add_argument('--lote', type=int, default=settings.NOTIFICACIONES_LOTE, help='Filas por bulk_create.')
+
+    def handle(self, *args, **options):
+        if options['lote'] <= 0:
+            raise CommandError('--lote debe ser mayor a cero.')
+        if options['destino'] == DESTINO_MENU:
+            if options['menu'] is None:
+                raise CommandError("Indique --menu para el destino 'menu'.")
+            if not Menu.objects.filter(pk=options['menu']).exists():
+                raise CommandError(f"El menú {options['menu']} no existe.")
+
+        usuarios = destinatarios(options['destino'], options['menu'])
+        resultado = enviar_notificaciones(options['mensaje'], usuarios, lote=options['lote'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado['filas']} notificaciones creadas en {resultado['segundos']} s "
+            f"({resultado['filas_por_segundo']} filas/s)."
+        ))
@@ -0,0 +1,424 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from api.busqueda import get_backend as get_busqueda_backend
+from api.cache import bump_catalogo_version
+from api.calificaciones import reconstruir_calificaciones
+from api.models import (
+    CategoriaMenu, Comentarios, DetallePedido, EventoEstadoPedido, Factura, HistorialEstados, MarcaResumenVentas,
+    Menu, Mesas, MesasEstado, MetodoDePago, Notificaciones, Pedido, Promocion, Reserva, ResumenVentas,
+)
+from api.serializers import calcular_montos
+from api.ventas import reconstruir_resumenes
+
+# Filas de cada modelo con --escala 1; las líneas de pedido son entre 1 y LINEAS_POR_PEDIDO
+# por pedido. Con --escala 50 se generan alrededor de un millón de pedidos.
+BASE = {
+    'admins': 2,
+    'clientes': 1000,
+    'categorias': 12,
+    'menus': 300,
+    'promociones': 60,
+    'mesas': 40,
+    'pedidos': 20000,
+    'reservas': 3000,
+    'comentarios': 5000,
+    'notificaciones': 10000,
+}
+LINEAS_POR_PEDIDO = 4
+# Proporción de pedidos que se facturan
+FACTURADOS = 0.7
+# Proporción de líneas que aplican una promoción del menú
+CON_PROMOCION = 0.3
+# Prefijo de los usuarios generados (--limpiar solo elimina estos)
+PREFIJO = 'sint_'
+
+CATEGORIAS = ['Entradas', 'Sopas', 'Ensaladas', 'Carnes', 'Mariscos', 'Pastas', 'Típicos', 'Postres', 'Bebidas', 'Desayunos', 'Infantil', 'Vegetariano']
+PLATOS = ['Pollo', 'Res', 'Cerdo', 'Pescado', 'Camarón', 'Pupusa', 'Tamal', 'Lomito', 'Costilla', 'Pasta', 'Crema', 'Piña', 'Plátano', 'Yuca', 'Café', 'Limonada']
+PREPARACIONES = ['asado', 'a la plancha', 'frito', 'en salsa', 'gratinado', 'al ajillo', 'empanizado', 'horneado', 'al vapor', 'con queso']
+INGREDIENTES = ['arroz', 'frijoles', 'ensalada fresca', 'papas', 'tortillas', 'chimol', 'aguacate', 'crema', 'queso duro', 'vegetales salteados', 'salsa de tomate', 'loroco']
+TIPOS_PAGO = ['efectivo', 'tarjeta', 'transferencia']
+CAPACIDADES = [2, 2, 4, 4, 4, 6, 8]
+# Peso de cada calificación de 1 a 5
+PESOS_CALIFICACION = [5, 7, 15, 33, 40]
+COMENTARIOS = ['Muy bueno', 'Excelente sabor', 'Regular', 'Llegó frío', 'Porción generosa', 'Lo volvería a pedir', 'Un poco salado', 'Recomendado']
+MENSAJES = ['Tu pedido está en camino', 'Tu pedido fue entregado', 'Nueva promoción disponible', 'Tu reserva fue confirmada', 'Gracias por tu visita']
+# Peso de cada estado final de un pedido: preparación, enviado, entregado
+PESOS_ESTADO = [3, 7, 90]
+
+# Tablas vaciadas por --limpiar, de hijas a padres
+TABLAS = [
+    ResumenVentas, MarcaResumenVentas, EventoEstadoPedido, DetallePedido, Factura, Reserva, Comentarios,
+    Notificaciones, Promocion, Pedido, HistorialEstados, MetodoDePago, Mesas, MesasEstado, Menu, CategoriaMenu,
+]
+
+
+@contextmanager
+def fechas_manuales(*modelos):
+    # Desactiva auto_now/auto_now_add mientras dure el bloque para que bulk_create respete las
+    # fechas asignadas y los datos queden repartidos en el tiempo (y sean reproducibles)
+    campos = [
+        campo for modelo in modelos for campo in modelo._meta.concrete_fields
+        if getattr(campo, 'auto_now', False) or getattr(campo, 'auto_now_add', False)
+    ]
+    originales = [(campo, campo.auto_now, campo.auto_now_add) for campo in campos]
+    for campo in campos:
+        campo.auto_now = campo.auto_now_add = False
+    try:
+        yield
+    finally:
+        for campo, auto_now, auto_now_add in originales:
+            campo.auto_now, campo.auto_now_add = auto_now, auto_now_add
+
+
+def siguiente_id(modelo):
+    # Los ids se asignan explícitamente: MySQL no los devuelve tras bulk_create y así los datos
+    # generados con la misma semilla son idénticos también en sus claves
+    return (modelo.objects.aggregate(maximo=Max('pk'))['maximo'] or 0) + 1
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera datos sintéticos consistentes (usuarios Admin y Cliente, catálogo, mesas, reservas, '
+        'pedidos con sus líneas y facturas, comentarios y notificaciones) a la escala indicada. '
+        'Con la misma semilla y la misma fecha --hasta los datos son idénticos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--semilla', type=int, default=1, help='Semilla del generador aleatorio.')
+        parser.add_argument('--escala', type=float, default=1.0, help='Multiplicador de la cantidad de filas (1 = 20000 pedidos).')
+        parser.add_argument('--dias', type=int, default=365, help='Días de historia que cubren los pedidos.')
+        parser.add_argument('--hasta', help='Último día de la historia (AAAA-MM-DD). Por defecto, hoy.')
+        parser.add_argument('--lote', type=int, default=5000, help='Filas por bulk_create y pedidos por transacción.')
+        parser.add_argument('--password', default='sintetico123', help='Contraseña de todos los usuarios generados.')
+        parser.add_argument('--limpiar', action='store_true', help='Eliminar antes los datos existentes de la API y los usuarios generados.')
+        parser.add_argument('--sin-resumenes', action='store_true', help='No reconstruir los resúmenes de ventas al terminar.')
+
+    def handle(self, *args, **options):
+        if options['escala'] <= 0 or options['dias'] <= 0 or options['lote'] <= 0:
+            raise CommandError('--escala, --dias y --lote deben ser mayores a cero.')
+        hasta = parse_date(options['hasta']) if options['hasta'] else timezone.localdate()
+        if hasta is None:
+            raise CommandError(f"Fecha inválida: {options['hasta']}")
+
+        if options['limpiar']:
+            self.limpiar()
+        elif Menu.objects.exists() or Pedido.objects.exists():
+            raise CommandError('Ya hay datos en la base de datos; use --limpiar para reemplazarlos.')
+
+        self.rng = random.Random(options['semilla'])
+        self.lote = options['lote']
+        self.cantidades = {modelo: max(1, round(base * options['escala'])) for modelo, base in BASE.items()}
+        self.fin = timezone.make_aware(datetime(hasta.year, hasta.month, hasta.day)) + timedelta(days=1)
+        self.inicio = self.fin - timedelta(days=options['dias'])
+        self.password = make_password(options['password'])
+
+        inicio = time.perf_counter()
+        with fechas_manuales(*TABLAS, User):
+            self.generar_usuarios()
+            self.generar_catalogo()
+            self.generar_mesas()
+            self.generar_pedidos()
+            self.generar_reservas()
+            self.generar_comentarios()
+            self.generar_notificaciones()
+
+        # bulk_create no emite señales: recalcular lo que ellas mantienen
+        self.paso('Calificaciones', reconstruir_calificaciones)
+        self.paso('Índice de búsqueda', get_busqueda_backend().reconstruir)
+        if not options['sin_resumenes']:
+            self.paso('Resúmenes de ventas', reconstruir_resumenes)
+        bump_catalogo_version()
+
+        self.stdout.write(self.style.SUCCESS(f'Datos generados en {time.perf_counter() - inicio:.1f} s.'))
+
+    ##########################################################################################
+
+    def paso(self, nombre, funcion):
+        inicio = time.perf_counter()
+        funcion()
+        self.stdout.write(f'{nombre}: {time.perf_counter() - inicio:.1f} s')
+
+    def insertar(self, modelo, filas):
+        modelo.objects.bulk_create(filas, batch_size=self.lote)
+
+    def fecha(self, desde=None, hasta=None):
+        desde = desde or self.inicio
+        hasta = hasta or self.fin
+        return desde + timedelta(seconds=self.rng.random() * (hasta - desde).total_seconds())
+
+    def limpiar(self):
+        inicio = time.perf_counter()
+        with transaction.atomic(), connection.cursor() as cursor:
+            # DELETE directo, sin cargar filas ni emitir señales
+            for modelo in TABLAS:
+                cursor.execute(f'DELETE FROM {connection.ops.quote_name(modelo._meta.db_table)}')
+            User.objects.filter(username__startswith=PREFIJO).delete()
+        self.stdout.write(f'Datos anteriores eliminados: {time.perf_counter() - inicio:.1f} s')
+
+    ##########################################################################################
+
+    def generar_usuarios(self):
+        inicio = time.perf_counter()
+        grupos = {nombre: Group.objects.get_or_create(name=nombre)[0] for nombre in ('Admin', 'Cliente')}
+        Membresia = User.groups.through
+        siguiente = siguiente_id(User)
+        self.clientes = []
+
+        for rol, cantidad in (('Admin', self.cantidades['admins']), ('Cliente', self.cantidades['clientes'])):
+            for desde in range(0, cantidad, self.lote):
+                usuarios = []
+                for numero in range(desde + 1, min(desde + self.lote, cantidad) + 1):
+                    username = f'{PREFIJO}{rol.lower()}{numero:06d}'
+                    usuarios.append(User(
+                        pk=siguiente, username=username, email=f'{username}@example.com', password=self.password,
+                        first_name=rol, last_name=f'{numero:06d}', date_joined=self.fecha(), is_staff=rol == 'Admin',
+                    ))
+                    siguiente += 1
+                with transaction.atomic():
+                    self.insertar(User, usuarios)
+                    self.insertar(Membresia, [Membresia(user_id=usuario.pk, group_id=grupos[rol].pk) for usuario in usuarios])
+                if rol == 'Cliente':
+                    self.clientes += [usuario.pk for usuario in usuarios]
+        self.stdout.write(f'Usuarios: {len(self.clientes) + self.cantidades["admins"]} ({time.perf_counter() - inicio:.1f} s)')
+
+    def generar_catalogo(self):
+        inicio = time.perf_counter()
+        rng = self.rng
+        siguiente = siguiente_id(CategoriaMenu)
+        categorias = []
+        for numero in range(self.cantidades['categorias']):
+            nombre = CATEGORIAS[numero % len(CATEGORIAS)]
+            if numero >= len(CATEGORIAS):
+                nombre = f'{nombre} {numero // len(CATEGORIAS) + 1}'
+            creada = self.fecha(hasta=self.inicio + timedelta(days=1))
+            categorias.append(CategoriaMenu(
+                pk=siguiente + numero, nombre=nombre, descripcion=f'Platos de la categoría {nombre.lower()}',
+                categoria_creada=creada, categoria_actualizada=creada,
+            ))
+
+        siguiente = siguiente_id(Menu)
+        menus = []
+        for numero in range(self.cantidades['menus']):
+            nombre = f'{rng.choice(PLATOS)} {rng.choice(PREPARACIONES)}'
+            creado = self.fecha(hasta=self.inicio + timedelta(days=1))
+            menus.append(Menu(
+                pk=siguiente + numero, nombre=nombre,
+                descripcion=f'{nombre} con {rng.choice(INGREDIENTES)} y {rng.choice(INGREDIENTES)}',
+                precio=Decimal(rng.randrange(300, 3000, 25)) / 100, disponibilidad=rng.random() < 0.9,
+                categoria_fk_id=rng.choice(categorias).pk, menu_creado=creado, menu_actualizado=creado,
+            ))
+
+        siguiente = siguiente_id(Promocion)
+        promociones = []
+        for numero in range(self.cantidades['promociones']):
+            menu = rng.choice(menus)
+            creada = self.fecha()
+            promociones.append(Promocion(
+                pk=siguiente + numero, nombre=f'Promo {menu.nombre}', descripcion=f'Descuento en {menu.nombre.lower()}',
+                descuento=rng.choice([5, 10, 15, 20, 25]), fecha_vencimiento=creada + timedelta(days=rng.randint(7, 90)),
+                menu_fk_id=menu.pk, promocion_creado=creada, promocion_actualizado=creada,
+            ))
+
+        with transaction.atomic():
+            self.insertar(CategoriaMenu, categorias)
+            self.insertar(Menu, menus)
+            self.insertar(Promocion, promociones)
+
+        # Solo se necesitan el precio del menú y sus promociones para generar los pedidos
+        self.menus = [(menu.pk, menu.precio) for menu in menus]
+        self.promociones = {}
+        for promocion in promociones:
+            self.promociones.setdefault(promocion.menu_fk_id, []).append(promocion)
+        self.stdout.write(
+            f'Catálogo: {len(categorias)} categorías, {len(menus)} menús, {len(promociones)} promociones '
+            f'({time.perf_counter() - inicio:.1f} s)'
+        )
+
+    def generar_mesas(self):
+        estados = {}
+        for nombre in ('disponible', 'reservada'):
+            estados[nombre] = MesasEstado(
+                pk=siguiente_id(MesasEstado) + len(estados), nombre_estado=nombre,
+                estado_mesa_creado=self.inicio, estado_mesa_actualizado=self.inicio,
+            )
+        siguiente = siguiente_id(Mesas)
+        numero_inicial = (Mesas.objects.aggregate(maximo=Max('numero_mesa'))['maximo'] or 0) + 1
+        mesas = [
+            Mesas(
+                pk=siguiente + numero, numero_mesa=numero_inicial + numero, capacidad_mesa=self.rng.choice(CAPACIDADES),
+                estado_mesa_fk_id=estados['disponible' if self.rng.random() < 0.8 else 'reservada'].pk,
+                mesa_creada=self.inicio, mesa_actualizada=self.inicio,
+            )
+            for numero in range(self.cantidades['mesas'])
+        ]
+        with transaction.atomic():
+            self.insertar(MesasEstado, list(estados.values()))
+            self.insertar(Mesas, mesas)
+        self.mesas = [mesa.pk for mesa in mesas]
+        self.stdout.write(f'Mesas: {len(mesas)}')
+
+    def generar_pedidos(self):
+        inicio = time.perf_counter()
+        rng = self.rng
+        estados = [estado for estado, _ in HistorialEstados.ESTADOS_CHOICES]
+        historial = {}
+        for estado in estados:
+            historial[estado] = HistorialEstados(
+                pk=siguiente_id(HistorialEstados) + len(historial), estado=estado,
+                historial_creado=self.inicio, historial_actualizado=self.inicio,
+            )
+        self.insertar(HistorialEstados, list(historial.values()))
+
+        ids = {modelo: siguiente_id(modelo) for modelo in (Pedido, DetallePedido, Factura, MetodoDePago, EventoEstadoPedido)}
+        total = self.cantidades['pedidos']
+        paso = (self.fin - self.inicio) / total
+        lineas_total = 0
+
+        for desde in range(0, total, self.lote):
+            pedidos, detalles, facturas, metodos, eventos = [], [], [], [], []
+            for numero in range(desde, min(desde + self.lote, total)):
+                # Fechas crecientes con el id, como en producción
+                creado = self.inicio + paso * (numero + rng.random())
+                cliente = rng.choice(self.clientes)
+                final = rng.choices(estados, weights=PESOS_ESTADO)[0]
+
+                momento = creado
+                for estado in estados[:estados.index(final) + 1]:
+                    if estado != estados[0]:
+                        momento += timedelta(minutes=rng.randint(5, 45))
+                    eventos.append(EventoEstadoPedido(pk=ids[EventoEstadoPedido], evento_creado=momento, estado=estado, pedido_fk_id=ids[Pedido]))
+                    ids[EventoEstadoPedido] += 1
+
+                pedido = Pedido(
+                    pk=ids[Pedido], pedido_creado=creado, pedido_actualizado=momento, fecha_pedido=creado,
+                    estado_fk_id=historial[final].pk, cliente_fk_id=cliente, estado_actual=final, estado_actualizado=momento,
+                )
+                ids[Pedido] += 1
+                pedidos.append(pedido)
+
+                factura = None
+                if rng.random() < FACTURADOS:
+                    emitida = momento + timedelta(minutes=rng.randint(1, 30))
+                    metodo = MetodoDePago(
+                        pk=ids[MetodoDePago], tipo_pago=rng.choice(TIPOS_PAGO), fecha_compra=timezone.localdate(emitida),
+                        total_compra=0, metodo_pago_creado=emitida, metodo_pago_actualizado=emitida,
+                    )
+                    ids[MetodoDePago] += 1
+                    factura = Factura(
+                        pk=ids[Factura], fecha_emision=emitida, factura_actualizada=emitida, total_factura=0,
+                        metodo_pago_fk_id=metodo.pk, mesa_fk_id=rng.choice(self.mesas), cliente_fk_id=cliente,
+                    )
+                    ids[Factura] += 1
+                    metodos.append(metodo)
+                    facturas.append(factura)
+
+                for _ in range(rng.randint(1, LINEAS_POR_PEDIDO)):
+                    menu_id, precio = rng.choice(self.menus)
+                    promocion = None
+                    vigentes = [p for p in self.promociones.get(menu_id, ()) if p.promocion_creado <= creado < p.fecha_vencimiento]
+                    if vigentes and rng.random() < CON_PROMOCION:
+                        promocion = rng.choice(vigentes)
+                    cantidad = rng.randint(1, 4)
+                    # Los montos de DetallePedido son enteros, como al guardarlos desde la API
+                    montos = calcular_montos(precio, cantidad, promocion.descuento if promocion else 0)
+                    detalles.append(DetallePedido(
+                        pk=ids[DetallePedido], cantidad=cantidad, pedido_fk_id=pedido.pk, menu_fk_id=menu_id,
+                        factura_fk_id=factura.pk if factura else None, promocion_fk_id=promocion.pk if promocion else None,
+                        detalle_pedido_creado=creado, detalle_pedido_actualizado=creado, **montos,
+                    ))
+                    ids[DetallePedido] += 1
+                    if factura:
+                        factura.total_factura += montos['total']
+                        metodos[-1].total_compra = factura.total_factura
+
+            with transaction.atomic():
+                self.insertar(Pedido, pedidos)
+                self.insertar(EventoEstadoPedido, eventos)
+                self.insertar(MetodoDePago, metodos)
+                self.insertar(Factura, facturas)
+                self.insertar(DetallePedido, detalles)
+            lineas_total += len(detalles)
+            self.stdout.write(f'  pedidos {desde + len(pedidos)}/{total}')
+
+        self.stdout.write(f'Pedidos: {total} con {lineas_total} líneas ({time.perf_counter() - inicio:.1f} s)')
+
+    def generar_reservas(self):
+        inicio = time.perf_counter()
+        rng = self.rng
+        total = self.cantidades['reservas']
+        # Turnos consecutivos por mesa, separados al menos por la duración de una reserva
+        turnos = -(-total // len(self.mesas))
+        duracion = timedelta(minutes=settings.RESERVA_DURACION_MINUTOS)
+        separacion = max((self.fin - self.inicio) / turnos, duracion)
+        ids = {modelo: siguiente_id(modelo) for modelo in (Reserva, MetodoDePago)}
+
+        for desde in range(0, total, self.lote):
+            reservas, metodos = [], []
+            for numero in range(desde, min(desde + self.lote, total)):
+                fecha_reserva = self.inicio + separacion * (numero // len(self.mesas))
+                creada = fecha_reserva - timedelta(hours=rng.randint(1, 72))
+                metodo = MetodoDePago(
+                    pk=ids[MetodoDePago], tipo_pago=rng.choice(TIPOS_PAGO), fecha_compra=timezone.localdate(creada),
+                    total_compra=Decimal(rng.choice([10, 15, 20, 25])), metodo_pago_creado=creada, metodo_pago_actualizado=creada,
+                )
+                ids[MetodoDePago] += 1
+                metodos.append(metodo)
+                reservas.append(Reserva(
+                    pk=ids[Reserva], mesa_fk_id=self.mesas[numero % len(self.mesas)], metodo_pago_fk_id=metodo.pk,
+                    fecha_reserva=fecha_reserva, cliente_fk_id=rng.choice(self.clientes),
+                    reserva_creada=creada, reserva_actualizada=creada,
+                ))
+                ids[Reserva] += 1
+            with transaction.atomic():
+                self.insertar(MetodoDePago, metodos)
+                self.insertar(Reserva, reservas)
+        self.stdout.write(f'Reservas: {total} ({time.perf_counter() - inicio:.1f} s)')
+
+    def generar_comentarios(self):
+        inicio = time.perf_counter()
+        rng = self.rng
+        total = self.cantidades['comentarios']
+        siguiente = siguiente_id(Comentarios)
+        for desde in range(0, total, self.lote):
+            comentarios = []
+            for numero in range(desde, min(desde + self.lote, total)):
+                creado = self.fecha()
+                comentarios.append(Comentarios(
+                    pk=siguiente + numero, comentario=rng.choice(COMENTARIOS),
+                    calificacion=rng.choices(range(1, 6), weights=PESOS_CALIFICACION)[0],
+                    menu_fk_id=rng.choice(self.menus)[0], cliente_fk_id=rng.choice(self.clientes),
+                    comentario_creado=creado, comentario_actualizado=creado,
+                ))
+            with transaction.atomic():
+                self.insertar(Comentarios, comentarios)
+        self.stdout.write(f'Comentarios: {total} ({time.perf_counter() - inicio:.1f} s)')
+
+    def generar_notificaciones(self):
+        inicio = time.perf_counter()
+        rng = self.rng
+        total = self.cantidades['notificaciones']
+        siguiente = siguiente_id(Notificaciones)
+        for desde in range(0, total, self.lote):
+            notificaciones = []
+            for numero in range(desde, min(desde + self.lote, total)):
+                creada = self.fecha()
+                notificaciones.append(Notificaciones(
+                    pk=siguiente + numero, mensaje=rng.choice(MENSAJES), leido=rng.random() < 0.7,
+                    cliente_fk_id=rng.choice(self.clientes), notificacion_creada=creada, notificacion_actualizada=creada,
+                ))
+            with transaction.atomic():
+                self.insertar(Notificaciones, notificaciones)
+        self.stdout.write(f'Notificaciones: {total} ({time.perf_counter() - inicio:.1f} s)')
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.importacion import FORMATOS, IMPORTADORES, leer_filas
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa (crea o actualiza) CategoriaMenu o Menu desde un archivo CSV o NDJSON, por lotes '
+        'con bulk_create / bulk_update, e informa los errores de cada fila.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('modelo', choices=list(IMPORTADORES), help='Qué se importa.')
+        parser.add_argument('archivo', help='Ruta del archivo.')
+        parser.add_argument('--formato', choices=FORMATOS, help='Formato del archivo (por defecto, según la extensión).')
+        parser.add_argument('--lote', type=int, help='Filas por lote (por defecto, IMPORTACION_LOTE).')
+        parser.add_argument('--simular', action='store_true', help='Validar y reportar sin guardar nada.')
+
+    def handle(self, *args, **options):
+        if options['lote'] is not None and options['lote'] <= 0:
+            raise CommandError('--lote debe ser mayor a cero.')
+        formato = options['formato'] or ('ndjson' if options['archivo'].lower().endswith(('.ndjson', '.jsonl')) else 'csv')
+
+        importador = IMPORTADORES[options['modelo']](simular=options['simular'], lote=options['lote'])
+        try:
+            with open(options['archivo'], 'rb') as archivo:
+                reporte = importador.importar(leer_filas(archivo, formato))
+        except OSError as error:
+            raise CommandError(f'No se pudo leer el archivo: {error}')
+
+        for error in reporte['errores']:
+            detalle = '; '.join(f'{campo}: {" ".join(mensajes)}' for campo, mensajes in error['errores'].items())
+            self.stdout.write(self.style.WARNING(f"Fila {error['fila']}: {detalle}"))
+        if reporte['errores_total'] > len(reporte['errores']):
+            self.stdout.write(self.style.WARNING(f"... y {reporte['errores_total'] - len(reporte['errores'])} filas más con errores."))
+
+        resumen = f"{reporte['creados']} creados, {reporte['actualizados']} actualizados, {reporte['errores_total']} filas con errores"
+        if options['simular']:
+            resumen += ' (simulación: no se guardó nada)'
+        self.stdout.write(self.style.SUCCESS(resumen + '.'))
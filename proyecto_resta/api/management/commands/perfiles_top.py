@@ -0,0 +1,28 @@
+import pstats
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.perfilador import directorio_perfiles
+
+
+class Command(BaseCommand):
+    help = 'Lista las funciones más costosas sumando los perfiles capturados por PerfiladorMiddleware.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limite', type=int, default=30, help='Funciones a listar.')
+        parser.add_argument('--orden', choices=['cumulative', 'tottime', 'ncalls'], default='cumulative')
+        parser.add_argument('--ruta', help='Solo perfiles cuyo nombre contenga este texto (p. ej. api_facturas).')
+        parser.add_argument('--ultimos', type=int, help='Solo los N perfiles más recientes.')
+
+    def handle(self, *args, **options):
+        perfiles = sorted(directorio_perfiles().glob('*.prof'), key=lambda archivo: archivo.stat().st_mtime, reverse=True)
+        if options['ruta']:
+            perfiles = [archivo for archivo in perfiles if options['ruta'] in archivo.name]
+        if options['ultimos']:
+            perfiles = perfiles[:options['ultimos']]
+        if not perfiles:
+            raise CommandError(f'No hay perfiles en {directorio_perfiles()}.')
+
+        self.stdout.write(f'{len(perfiles)} perfiles combinados.')
+        estadisticas = pstats.Stats(*(str(archivo) for archivo in perfiles), stream=self.stdout)
+        estadisticas.strip_dirs().sort_stats(options['orden']).print_stats(options['limite'])
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db.models import DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from api.models import DetallePedido, Factura
+
+
+class Command(BaseCommand):
+    help = 'Recalcula Factura.total_factura a partir de los DetallePedido con una sola consulta agregada.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('facturas', nargs='*', type=int, help='IDs de factura a recalcular (por defecto, todas).')
+
+    def handle(self, *args, **options):
+        # Suma de los detalles de cada factura como subconsulta correlacionada
+        totales = (
+            DetallePedido.objects
+            .filter(factura_fk=OuterRef('pk'))
+            .values('factura_fk')
+            .annotate(suma=Sum('total'))
+            .values('suma')
+        )
+
+        facturas = Factura.objects.all()
+        if options['facturas']:
+            facturas = facturas.filter(pk__in=options['facturas'])
+
+        # UPDATE factura SET total_factura = COALESCE((SELECT SUM(total) ...), 0).
+        # factura_actualizada se fija a mano (update() no aplica auto_now) para invalidar los ETag
+        actualizadas = facturas.update(
+            total_factura=Coalesce(
+                Subquery(totales, output_field=DecimalField(max_digits=10, decimal_places=2)),
+                Value(0),
+                output_field=DecimalField(max_digits=10, decimal_places=2),
+            ),
+            factura_actualizada=timezone.now(),
+        )
+        self.stdout.write(self.style.SUCCESS(f'{actualizadas} facturas recalculadas.'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from api.busqueda import get_backend
+
+
+class Command(BaseCommand):
+    help = (
+        'Reconstruye el índice FTS5 de búsqueda de Menu tras cargas masivas que no emiten señales. '
+        'El índice en memoria de cada proceso se reconstruye solo al vencer MENU_BUSQUEDA_TTL.'
+    )
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        backend.reconstruir()
+        self.stdout.write(self.style.SUCCESS(f'Índice de búsqueda reconstruido ({backend.__class__.__name__}).'))
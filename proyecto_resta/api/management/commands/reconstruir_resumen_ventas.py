@@ -0,0 +1,35 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from api.ventas import reconstruir_resumenes
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los resúmenes de ventas por hora y por día a partir de DetallePedido, por bloques de horas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help='Primer día a reconstruir (AAAA-MM-DD). Por defecto, el primer detalle.')
+        parser.add_argument('--hasta', help='Último día a reconstruir (AAAA-MM-DD). Por defecto, el último detalle.')
+        parser.add_argument('--horas-por-lote', type=int, default=24, help='Horas recalculadas por transacción.')
+
+    def handle(self, *args, **options):
+        desde = self.parse_dia(options['desde'])
+        hasta = self.parse_dia(options['hasta'])
+        if desde and hasta and desde > hasta:
+            raise CommandError('--desde debe ser anterior o igual a --hasta.')
+        if options['horas_por_lote'] <= 0:
+            raise CommandError('--horas-por-lote debe ser mayor a cero.')
+
+        horas = reconstruir_resumenes(desde, hasta, horas_por_lote=options['horas_por_lote'])
+        self.stdout.write(self.style.SUCCESS(f'{horas} horas de ventas recalculadas.'))
+
+    def parse_dia(self, valor):
+        if valor is None:
+            return None
+        dia = parse_date(valor)
+        if dia is None:
+            raise CommandError(f'Fecha inválida: {valor}')
+        return timezone.make_aware(datetime(dia.year, dia.month, dia.day))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api.calificaciones import reconstruir_calificaciones
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el resumen de calificaciones de cada Menu a partir de Comentarios con una sola consulta agrupada.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=1000, help='Menús por UPDATE.')
+
+    def handle(self, *args, **options):
+        menus = reconstruir_calificaciones(lote=options['lote'])
+        self.stdout.write(self.style.SUCCESS(f'{menus} menús recalculados.'))
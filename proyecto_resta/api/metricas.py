@@ -0,0 +1,215 @@
+import random
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+# Métricas por ruta acumuladas en memoria del proceso y expuestas en formato de texto de
+# Prometheus (api/metricas/). Todas las peticiones cuentan para el total y la latencia; solo
+# una muestra (settings.METRICAS_MUESTREO) se instrumenta además con el conteo de consultas,
+# el tiempo de base de datos, las fases de la petición y la cabecera Server-Timing.
+
+LIMITES_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LIMITES_CONSULTAS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+_medicion = ContextVar('medicion', default=None)
+
+
+class Medicion:
+    # Consultas, tiempo de base de datos y duración de las fases de una petición muestreada
+    def __init__(self):
+        self.consultas = 0
+        self.db = 0.0
+        self.fases = defaultdict(float)
+
+    def __call__(self, execute, sql, params, many, context):
+        # Se instala con connection.execute_wrapper en todas las conexiones
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.consultas += 1
+            self.db += time.perf_counter() - inicio
+
+    def instalar(self, pila):
+        for alias in connections:
+            pila.enter_context(connections[alias].execute_wrapper(self))
+
+    def server_timing(self, total):
+        partes = [f'db;dur={self.db * 1000:.1f};desc="{self.consultas} consultas"']
+        partes += [f'{nombre};dur={duracion * 1000:.1f}' for nombre, duracion in self.fases.items()]
+        partes.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(partes)
+
+
+@contextmanager
+def fase(nombre):
+    # Suma la duración del bloque a la fase indicada si la petición en curso está muestreada
+    medicion = _medicion.get()
+    if medicion is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        medicion.fases[nombre] += time.perf_counter() - inicio
+
+
+class Histograma:
+    def __init__(self, limites):
+        self.limites = limites
+        # Un contador por límite más el de +Inf
+        self.conteos = [0] * (len(limites) + 1)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.conteos[bisect_left(self.limites, valor)] += 1
+        self.suma += valor
+        self.total += 1
+
+    def exportar(self, nombre, etiquetas):
+        lineas = []
+        acumulado = 0
+        for limite, conteo in zip(self.limites + ('+Inf',), self.conteos):
+            acumulado += conteo
+            lineas.append(f'{nombre}_bucket{{{etiquetas},le="{limite}"}} {acumulado}')
+        lineas.append(f'{nombre}_sum{{{etiquetas}}} {self.suma}')
+        lineas.append(f'{nombre}_count{{{etiquetas}}} {self.total}')
+        return lineas
+
+
+class SerieRuta:
+    def __init__(self):
+        self.estados = defaultdict(int)
+        self.latencia = Histograma(LIMITES_LATENCIA)
+        self.consultas = Histograma(LIMITES_CONSULTAS)
+        self.db = Histograma(LIMITES_LATENCIA)
+
+
+class RegistroMetricas:
+    def __init__(self):
+        self._series = defaultdict(SerieRuta)
+        self._lock = threading.Lock()
+
+    def registrar(self, ruta, metodo, estado, duracion, medicion=None):
+        with self._lock:
+            serie = self._series[(ruta, metodo)]
+            serie.estados[estado] += 1
+            serie.latencia.observar(duracion)
+            if medicion is not None:
+                serie.consultas.observar(medicion.consultas)
+                serie.db.observar(medicion.db)
+
+    def limpiar(self):
+        with self._lock:
+            self._series.clear()
+
+    def exportar(self):
+        peticiones = [
+            '# HELP api_peticiones_total Peticiones atendidas por ruta, método y código de estado.',
+            '# TYPE api_peticiones_total counter',
+        ]
+        latencia = [
+            '# HELP api_latencia_segundos Latencia de las peticiones por ruta y método.',
+            '# TYPE api_latencia_segundos histogram',
+        ]
+        consultas = [
+            '# HELP api_consultas_db Consultas SQL por petición (peticiones muestreadas).',
+            '# TYPE api_consultas_db histogram',
+        ]
+        db = [
+            '# HELP api_tiempo_db_segundos Tiempo en la base de datos por petición (peticiones muestreadas).',
+            '# TYPE api_tiempo_db_segundos histogram',
+        ]
+        with self._lock:
+            for (ruta, metodo), serie in sorted(self._series.items()):
+                etiquetas = f'ruta="{ruta}",metodo="{metodo}"'
+                for estado, total in sorted(serie.estados.items()):
+                    peticiones.append(f'api_peticiones_total{{{etiquetas},estado="{estado}"}} {total}')
+                latencia += serie.latencia.exportar('api_latencia_segundos', etiquetas)
+                if serie.consultas.total:
+                    consultas += serie.consultas.exportar('api_consultas_db', etiquetas)
+                    db += serie.db.exportar('api_tiempo_db_segundos', etiquetas)
+        return '\n'.join(peticiones + latencia + consultas + db) + '\n'
+
+
+registro = RegistroMetricas()
+
+
+class MetricasMiddleware:
+    # Debe ir primero en MIDDLEWARE para que la medición cubra toda la petición
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def muestrear(self):
+        return random.random() < getattr(settings, 'METRICAS_MUESTREO', 0.05)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        inicio = time.perf_counter()
+        medicion = Medicion() if self.muestrear() else None
+        if medicion is None:
+            response = self.get_response(request)
+        else:
+            token = _medicion.set(medicion)
+            try:
+                with ExitStack() as pila:
+                    medicion.instalar(pila)
+                    response = self.get_response(request)
+            finally:
+                _medicion.reset(token)
+        return self.finalizar(request, response, inicio, medicion)
+
+    async def __acall__(self, request):
+        inicio = time.perf_counter()
+        medicion = Medicion() if self.muestrear() else None
+        if medicion is None:
+            response = await self.get_response(request)
+        else:
+            # Las conexiones son por hilo: el wrapper se instala en el hilo donde esta petición
+            # ejecuta su código síncrono y el ORM asíncrono (uno por petición bajo ASGI)
+            token = _medicion.set(medicion)
+            pila = ExitStack()
+            try:
+                await sync_to_async(medicion.instalar)(pila)
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(pila.close)()
+                _medicion.reset(token)
+        return self.finalizar(request, response, inicio, medicion)
+
+    def process_template_response(self, request, response):
+        # La vista terminó; lo que sigue hasta el final es el renderizado de la respuesta
+        request._metricas_fin_vista = time.perf_counter()
+        return response
+
+    def finalizar(self, request, response, inicio, medicion):
+        fin = time.perf_counter()
+        fin_vista = getattr(request, '_metricas_fin_vista', None)
+        if medicion is not None and fin_vista is not None:
+            medicion.fases['vista'] = fin_vista - inicio
+            medicion.fases['render'] = fin - fin_vista
+
+        match = getattr(request, 'resolver_match', None)
+        # Ruta con sus parámetros sin resolver, para no crear una serie por id
+        ruta = match.route if match is not None else 'sin_ruta'
+        registro.registrar(ruta, request.method, response.status_code, fin - inicio, medicion)
+
+        if medicion is not None:
+            response['Server-Timing'] = medicion.server_timing(fin - inicio)
+        return response
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.15 on 2026-10-18 18:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comentarios',
+            index=models.Index(fields=['comentario_creado', 'id'], name='comentario_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='detallepedido',
+            index=models.Index(fields=['detalle_pedido_creado', 'id'], name='detallepedido_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificaciones',
+            index=models.Index(fields=['notificacion_creada', 'id'], name='notificacion_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['pedido_creado', 'id'], name='pedido_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.15 on 2026-10-18 18:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comentarios',
+            index=models.Index(fields=['cliente_fk', 'comentario_creado', 'id'], name='comentario_cliente_creado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificaciones',
+            index=models.Index(fields=['cliente_fk', 'leido'], name='notificacion_cliente_leido_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['cliente_fk', 'pedido_creado', 'id'], name='pedido_cliente_creado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='promocion',
+            index=models.Index(fields=['menu_fk', 'fecha_vencimiento'], name='promocion_menu_vence_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['mesa_fk', 'fecha_reserva'], name='reserva_mesa_fecha_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='mesas',
+            constraint=models.UniqueConstraint(fields=('numero_mesa',), name='mesa_numero_unico'),
+        ),
+    ]
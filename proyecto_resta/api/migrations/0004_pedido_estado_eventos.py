@@ -0,0 +1,73 @@
+# Generated by Django 5.1.15 on 2026-10-18 18:16
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def poblar_estado_actual(apps, schema_editor):
+    # Copia el estado del HistorialEstados compartido a cada pedido y registra un evento inicial
+    Pedido = apps.get_model('api', 'Pedido')
+    HistorialEstados = apps.get_model('api', 'HistorialEstados')
+    EventoEstadoPedido = apps.get_model('api', 'EventoEstadoPedido')
+
+    estado = HistorialEstados.objects.filter(pk=models.OuterRef('estado_fk')).values('estado')[:1]
+    Pedido.objects.update(estado_actual=models.Subquery(estado), estado_actualizado=models.F('pedido_actualizado'))
+
+    ultimo = 0
+    while True:
+        lote = list(
+            Pedido.objects.filter(pk__gt=ultimo).order_by('pk')
+            .values_list('pk', 'estado_actual', 'estado_actualizado')[:2000]
+        )
+        if not lote:
+            break
+        ultimo = lote[-1][0]
+        EventoEstadoPedido.objects.bulk_create([
+            EventoEstadoPedido(pedido_fk_id=pk, estado=estado_actual, evento_creado=actualizado)
+            for pk, estado_actual, actualizado in lote
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_query_indexes_and_constraints'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoEstadoPedido',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('evento_creado', models.DateTimeField(default=django.utils.timezone.now)),
+                ('estado', models.CharField(choices=[('preparación', 'Preparación'), ('enviado', 'Enviado'), ('entregado', 'Entregado')], max_length=20)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='pedido',
+            name='estado_actual',
+            field=models.CharField(choices=[('preparación', 'Preparación'), ('enviado', 'Enviado'), ('entregado', 'Entregado')], default='preparación', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='pedido',
+            name='estado_actualizado',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['estado_actual', 'estado_actualizado', 'id'], name='pedido_estado_idx'),
+        ),
+        migrations.AddField(
+            model_name='eventoestadopedido',
+            name='pedido_fk',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.pedido'),
+        ),
+        migrations.AddIndex(
+            model_name='eventoestadopedido',
+            index=models.Index(fields=['pedido_fk', 'evento_creado', 'id'], name='evento_pedido_idx'),
+        ),
+        migrations.RunPython(poblar_estado_actual, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.1.15 on 2026-10-18 18:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_pedido_estado_eventos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarcaResumenVentas',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('actualizado', models.DateTimeField()),
+                ('detalle_id', models.BigIntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ResumenVentas',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo', models.CharField(choices=[('hora', 'Hora'), ('dia', 'Día')], max_length=4)),
+                ('dimension', models.CharField(choices=[('menu', 'Menú'), ('categoria', 'Categoría'), ('tipo_pago', 'Tipo de pago')], max_length=10)),
+                ('clave', models.CharField(max_length=50)),
+                ('etiqueta', models.CharField(max_length=100)),
+                ('inicio', models.DateTimeField()),
+                ('lineas', models.IntegerField()),
+                ('cantidad', models.BigIntegerField()),
+                ('subtotal', models.BigIntegerField()),
+                ('iva', models.BigIntegerField()),
+                ('total', models.BigIntegerField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='detallepedido',
+            index=models.Index(fields=['detalle_pedido_actualizado', 'id'], name='detallepedido_actualizado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resumenventas',
+            index=models.Index(fields=['periodo', 'dimension', 'inicio', 'id'], name='resumen_ventas_rango_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='resumenventas',
+            constraint=models.UniqueConstraint(fields=('periodo', 'dimension', 'clave', 'inicio'), name='resumen_ventas_unico'),
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.1.15 on 2026-10-18 18:22
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+def poblar_calificaciones(apps, schema_editor):
+    # Resumen inicial de calificaciones con una consulta agrupada sobre Comentarios
+    Menu = apps.get_model('api', 'Menu')
+    Comentarios = apps.get_model('api', 'Comentarios')
+    histograma = {f'calificaciones_{valor}': models.Count('pk', filter=models.Q(calificacion=valor)) for valor in range(1, 6)}
+    menus = []
+    for grupo in Comentarios.objects.values('menu_fk').annotate(total=models.Count('pk'), suma=models.Sum('calificacion'), **histograma).order_by():
+        menu = Menu(pk=grupo['menu_fk'])
+        menu.calificaciones_total = grupo['total']
+        menu.calificaciones_suma = grupo['suma']
+        for campo in histograma:
+            setattr(menu, campo, grupo[campo])
+        menu.calificacion_promedio = (Decimal(grupo['suma']) / grupo['total']).quantize(Decimal('0.01'))
+        menus.append(menu)
+    Menu.objects.bulk_update(
+        menus, ['calificaciones_total', 'calificaciones_suma', 'calificacion_promedio', *histograma], batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_resumen_ventas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menu',
+            name='calificacion_promedio',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=3),
+        ),
+        migrations.AddField(
+            model_name='menu',
+            name='calificaciones_1',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='menu',
+            name='calificaciones_2',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='menu',
+            name='calificaciones_3',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='menu',
+            name='calificaciones_4',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='menu',
+            name='calificaciones_5',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='menu',
+            name='calificaciones_suma',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='menu',
+            name='calificaciones_total',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='menu',
+            index=models.Index(fields=['calificacion_promedio', 'calificaciones_total', 'id'], name='menu_calificacion_idx'),
+        ),
+        migrations.RunPython(poblar_calificaciones, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations
+
+
+def crear_indice_fts(apps, schema_editor):
+    # Índice FTS5 de Menu solo en SQLite; con otras bases se usa el índice en memoria (api/busqueda.py)
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE api_menu_busqueda USING fts5("
+        "nombre, descripcion, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        "INSERT INTO api_menu_busqueda (rowid, nombre, descripcion) SELECT id, nombre, descripcion FROM api_menu"
+    )
+
+
+def borrar_indice_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS api_menu_busqueda")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_menu_calificaciones'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice_fts, borrar_indice_fts),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.15 on 2026-10-18 18:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_menu_busqueda'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='factura',
+            index=models.Index(fields=['fecha_emision', 'id'], name='factura_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='metododepago',
+            index=models.Index(fields=['metodo_pago_creado', 'id'], name='metodopago_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['reserva_creada', 'id'], name='reserva_keyset_idx'),
+        ),
+    ]
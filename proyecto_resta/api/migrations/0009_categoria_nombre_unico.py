@@ -0,0 +1,34 @@
+# Generated by Django 5.1.15 on 2026-10-18 18:41
+
+from django.db import migrations, models
+
+
+def fusionar_categorias_repetidas(apps, schema_editor):
+    # La API permitía repetir nombres de categoría: antes de la restricción única cada grupo
+    # repetido se fusiona en la categoría más antigua (menor id), que recibe sus menús
+    CategoriaMenu = apps.get_model('api', 'CategoriaMenu')
+    Menu = apps.get_model('api', 'Menu')
+
+    repetidos = (
+        CategoriaMenu.objects.values('nombre')
+        .annotate(total=models.Count('pk'), conservar=models.Min('pk'))
+        .filter(total__gt=1)
+    )
+    for grupo in repetidos:
+        sobrantes = CategoriaMenu.objects.filter(nombre=grupo['nombre']).exclude(pk=grupo['conservar'])
+        Menu.objects.filter(categoria_fk__in=sobrantes).update(categoria_fk=grupo['conservar'])
+        sobrantes.delete()
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_keyset_facturas_reservas_pagos'),
+    ]
+
+    operations = [
+        migrations.RunPython(fusionar_categorias_repetidas, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='categoriamenu',
+            constraint=models.UniqueConstraint(fields=('nombre',), name='categoria_nombre_unico'),
+        ),
+    ]
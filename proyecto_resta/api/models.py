@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 
 class CategoriaMenu(models.Model):
@@ -7,6 +8,12 @@ class CategoriaMenu(models.Model):
     nombre = models.CharField(max_length=100)
     descripcion = models.TextField()
 
+    class Meta:
+        constraints = [
+            # Las importaciones resuelven las categorías por nombre
+            models.UniqueConstraint(fields=['nombre'], name='categoria_nombre_unico'),
+        ]
+
     def __str__(self):
         return self.nombre
     
@@ -20,10 +27,41 @@ class Menu(models.Model):
     precio = models.DecimalField(max_digits=10, decimal_places=2)
     disponibilidad = models.BooleanField(default=True)
     categoria_fk = models.ForeignKey(CategoriaMenu, on_delete=models.CASCADE)
+    # Resumen de las calificaciones de Comentarios, mantenido por api/calificaciones.py
+    calificaciones_total = models.IntegerField(default=0)
+    calificaciones_suma = models.IntegerField(default=0)
+    calificaciones_1 = models.IntegerField(default=0)
+    calificaciones_2 = models.IntegerField(default=0)
+    calificaciones_3 = models.IntegerField(default=0)
+    calificaciones_4 = models.IntegerField(default=0)
+    calificaciones_5 = models.IntegerField(default=0)
+    calificacion_promedio = models.DecimalField(max_digits=3, decimal_places=2, default=0)
+
+    class Meta:
+        indexes = [
+            # Menús mejor calificados (recorrido en orden descendente)
+            models.Index(fields=['calificacion_promedio', 'calificaciones_total', 'id'], name='menu_calificacion_idx'),
+        ]
 
     def __str__(self):
         return f"{self.nombre} - ${self.precio}"
 
+    def save(self, *args, **kwargs):
+        # Los contadores de calificaciones solo cambian con UPDATE ... F(); al guardar un menú
+        # existente no se escriben, para no pisarlos con valores leídos antes
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in CAMPOS_CALIFICACION
+            ]
+        super().save(*args, **kwargs)
+
+
+CAMPOS_CALIFICACION = (
+    'calificaciones_total', 'calificaciones_suma', 'calificaciones_1', 'calificaciones_2',
+    'calificaciones_3', 'calificaciones_4', 'calificaciones_5', 'calificacion_promedio',
+)
+
 ####################################################################################
 
 class HistorialEstados(models.Model):   
@@ -51,13 +89,43 @@ class Pedido(models.Model):
     pedido_actualizado = models.DateTimeField(auto_now=True)
     fecha_pedido = models.DateTimeField(auto_now_add=True)
     estado_fk = models.ForeignKey(HistorialEstados, on_delete=models.CASCADE)
-    cliente_fk = models.ForeignKey(User, on_delete=models.CASCADE)  
+    cliente_fk = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Estado actual desnormalizado a partir de EventoEstadoPedido y momento en que se alcanzó
+    estado_actual = models.CharField(max_length=20, choices=HistorialEstados.ESTADOS_CHOICES, default=HistorialEstados.ESTADO_PREPARACION)
+    estado_actualizado = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Índice para la paginación por cursor (creado, id)
+            models.Index(fields=['pedido_creado', 'id'], name='pedido_keyset_idx'),
+            # Pedidos de un cliente ordenados por fecha (PedidoPorUsuario)
+            models.Index(fields=['cliente_fk', 'pedido_creado', 'id'], name='pedido_cliente_creado_idx'),
+            # Tablero de cocina: pedidos en un estado, del más antiguo al más reciente
+            models.Index(fields=['estado_actual', 'estado_actualizado', 'id'], name='pedido_estado_idx'),
+        ]
 
     def __str__(self):
         return f"Pedido {self.pk} - Fecha {self.fecha_pedido}"
 
 ####################################################################################
 
+class EventoEstadoPedido(models.Model):
+    # Registro de solo inserción con cada cambio de estado de un pedido
+    evento_creado = models.DateTimeField(default=timezone.now)
+    estado = models.CharField(max_length=20, choices=HistorialEstados.ESTADOS_CHOICES)
+    pedido_fk = models.ForeignKey(Pedido, on_delete=models.CASCADE)
+
+    class Meta:
+        indexes = [
+            # Historial de un pedido en orden cronológico
+            models.Index(fields=['pedido_fk', 'evento_creado', 'id'], name='evento_pedido_idx'),
+        ]
+
+    def __str__(self):
+        return f"Pedido {self.pedido_fk_id} - Estado {self.estado}"
+
+####################################################################################
+
 class Promocion(models.Model):
     promocion_creado = models.DateTimeField(auto_now_add=True)
     promocion_actualizado = models.DateTimeField(auto_now=True)
@@ -65,7 +133,13 @@ class Promocion(models.Model):
     descripcion = models.TextField()
     descuento = models.IntegerField()
     fecha_vencimiento = models.DateTimeField()
-    menu_fk = models.ForeignKey(Menu, on_delete=models.CASCADE) 
+    menu_fk = models.ForeignKey(Menu, on_delete=models.CASCADE)
+
+    class Meta:
+        indexes = [
+            # Promociones vigentes de un menú (fecha_vencimiento__gt)
+            models.Index(fields=['menu_fk', 'fecha_vencimiento'], name='promocion_menu_vence_idx'),
+        ]
 
     def __str__(self):
         return f"Promoción {self.nombre} - {self.id_menu}"
@@ -79,6 +153,11 @@ class MetodoDePago(models.Model):
     fecha_compra = models.DateField()
     total_compra = models.DecimalField(max_digits=10, decimal_places=2)
 
+    class Meta:
+        indexes = [
+            # Índice para la paginación por cursor (creado, id)
+            models.Index(fields=['metodo_pago_creado', 'id'], name='metodopago_keyset_idx'),
+        ]
 
     def __str__(self):
         return self.tipo_pago
@@ -107,7 +186,13 @@ class Mesas(models.Model):
     numero_mesa = models.IntegerField()
     capacidad_mesa = models.IntegerField()
     estado_mesa_fk = models.ForeignKey(MesasEstado, on_delete=models.CASCADE)
-   
+
+    class Meta:
+        constraints = [
+            # El número de mesa es único; lo garantiza la base de datos
+            models.UniqueConstraint(fields=['numero_mesa'], name='mesa_numero_unico'),
+        ]
+
     def __str__(self):
         return str(self.numero_mesa)
 
@@ -119,25 +204,56 @@ class Comentarios(models.Model):
     comentario = models.TextField()
     calificacion = models.IntegerField()
     menu_fk = models.ForeignKey(Menu, on_delete=models.CASCADE)
-    cliente_fk = models.ForeignKey(User, on_delete=models.CASCADE)  
-   
+    cliente_fk = models.ForeignKey(User, on_delete=models.CASCADE)
+
+    class Meta:
+        indexes = [
+            # Índice para la paginación por cursor (creado, id)
+            models.Index(fields=['comentario_creado', 'id'], name='comentario_keyset_idx'),
+            # Comentarios de un cliente ordenados por fecha (ComentarioPorUsuario)
+            models.Index(fields=['cliente_fk', 'comentario_creado', 'id'], name='comentario_cliente_creado_idx'),
+        ]
+
     def __str__(self):
         return str(self.comentario)
 
 ####################################################################################
 
+class NotificacionesQuerySet(models.QuerySet):
+    def no_leidas(self):
+        # leido=False se compila como "NOT leido", que no aprovecha el índice (cliente_fk, leido);
+        # la forma "leido IN (False)" sí permite buscar por ambas columnas del índice.
+        return self.filter(leido__in=[False])
+
 class Notificaciones(models.Model):
     notificacion_creada = models.DateTimeField(auto_now_add=True)
     notificacion_actualizada = models.DateTimeField(auto_now=True)
     mensaje = models.TextField()
     leido = models.BooleanField()
     cliente_fk = models.ForeignKey(User, on_delete=models.CASCADE)
-   
+
+    objects = NotificacionesQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Índice para la paginación por cursor (creado, id)
+            models.Index(fields=['notificacion_creada', 'id'], name='notificacion_keyset_idx'),
+            # Notificaciones no leídas de un cliente
+            models.Index(fields=['cliente_fk', 'leido'], name='notificacion_cliente_leido_idx'),
+        ]
+
     def __str__(self):
         return str(self.mensaje)
 
 ####################################################################################
 
+class ReservaQuerySet(models.QuerySet):
+    def solapadas(self, desde, hasta, duracion):
+        # Reservas que se cruzan con [desde, hasta), suponiendo que cada una ocupa la mesa
+        # durante 'duracion' a partir de fecha_reserva. Es un rango sobre fecha_reserva,
+        # por lo que usa el índice (mesa_fk, fecha_reserva).
+        return self.filter(fecha_reserva__gt=desde - duracion, fecha_reserva__lt=hasta)
+
 class Reserva(models.Model):
     reserva_creada = models.DateTimeField(auto_now_add=True)
     reserva_actualizada = models.DateTimeField(auto_now=True)
@@ -146,6 +262,16 @@ class Reserva(models.Model):
     fecha_reserva = models.DateTimeField()
     cliente_fk = models.ForeignKey(User, on_delete=models.CASCADE)
 
+    objects = ReservaQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Reservas de una mesa por fecha
+            models.Index(fields=['mesa_fk', 'fecha_reserva'], name='reserva_mesa_fecha_idx'),
+            # Índice para la paginación por cursor (creado, id)
+            models.Index(fields=['reserva_creada', 'id'], name='reserva_keyset_idx'),
+        ]
+
     def __str__(self):
         return f"Reserva {self.pk}"
 
@@ -159,6 +285,12 @@ class Factura(models.Model):
     mesa_fk = models.ForeignKey(Mesas, on_delete=models.CASCADE)  
     cliente_fk = models.ForeignKey(User, on_delete=models.CASCADE)  
 
+    class Meta:
+        indexes = [
+            # Índice para la paginación por cursor (emisión, id)
+            models.Index(fields=['fecha_emision', 'id'], name='factura_keyset_idx'),
+        ]
+
     def __str__(self):
         return f"Factura {self.pk} - Total {self.total_factura} - MetodoDePago {self.metodo_pago.tipo_pago}"
 
@@ -176,5 +308,68 @@ class DetallePedido(models.Model):
     factura_fk = models.ForeignKey('Factura', on_delete=models.CASCADE, null=True, blank=True)
     promocion_fk = models.ForeignKey('Promocion', on_delete=models.SET_NULL, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Índice para la paginación por cursor (creado, id)
+            models.Index(fields=['detalle_pedido_creado', 'id'], name='detallepedido_keyset_idx'),
+            # Recorrido incremental de los resúmenes de ventas (marca de agua)
+            models.Index(fields=['detalle_pedido_actualizado', 'id'], name='detallepedido_actualizado_idx'),
+        ]
+
+    def __str__(self):
+        return f"Total: ${self.total}"
+
+####################################################################################
+
+class ResumenVentas(models.Model):
+    # Ventas acumuladas por hora o por día para un menú, una categoría o un tipo de pago.
+    # Se calcula a partir de DetallePedido (ver api/ventas.py) y es lo único que leen los reportes.
+    PERIODO_HORA = 'hora'
+    PERIODO_DIA = 'dia'
+    PERIODOS_CHOICES = [
+        (PERIODO_HORA, 'Hora'),
+        (PERIODO_DIA, 'Día'),
+    ]
+
+    DIMENSION_MENU = 'menu'
+    DIMENSION_CATEGORIA = 'categoria'
+    DIMENSION_TIPO_PAGO = 'tipo_pago'
+    DIMENSIONES_CHOICES = [
+        (DIMENSION_MENU, 'Menú'),
+        (DIMENSION_CATEGORIA, 'Categoría'),
+        (DIMENSION_TIPO_PAGO, 'Tipo de pago'),
+    ]
+
+    periodo = models.CharField(max_length=4, choices=PERIODOS_CHOICES)
+    dimension = models.CharField(max_length=10, choices=DIMENSIONES_CHOICES)
+    # Id del menú o de la categoría, o el tipo de pago
+    clave = models.CharField(max_length=50)
+    etiqueta = models.CharField(max_length=100)
+    inicio = models.DateTimeField()
+    lineas = models.IntegerField()
+    cantidad = models.BigIntegerField()
+    subtotal = models.BigIntegerField()
+    iva = models.BigIntegerField()
+    total = models.BigIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['periodo', 'dimension', 'clave', 'inicio'], name='resumen_ventas_unico'),
+        ]
+        indexes = [
+            # Reportes de una dimensión en un rango de fechas
+            models.Index(fields=['periodo', 'dimension', 'inicio', 'id'], name='resumen_ventas_rango_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.dimension} {self.etiqueta} - {self.periodo} {self.inicio}"
+
+####################################################################################
+
+class MarcaResumenVentas(models.Model):
+    # Última fila de DetallePedido (actualizado, id) incorporada a ResumenVentas
+    actualizado = models.DateTimeField()
+    detalle_id = models.BigIntegerField()
+
     def __str__(self):
-        return f"Total: ${self.total}"
\ No newline at end of file
+        return f"Resumen de ventas hasta {self.actualizado} (detalle {self.detalle_id})"
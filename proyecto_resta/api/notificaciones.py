@@ -0,0 +1,72 @@
+import time
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Exists, Max, OuterRef
+
+from .broker import broker
+from .models import DetallePedido, Notificaciones
+
+DESTINO_CLIENTES = 'clientes'
+DESTINO_MENU = 'menu'
+
+
+def destinatarios(destino, menu_id=None):
+    # Usuarios a notificar según el selector
+    if destino == DESTINO_CLIENTES:
+        return User.objects.filter(groups__name='Cliente')
+    if destino == DESTINO_MENU:
+        pidieron_menu = DetallePedido.objects.filter(pedido_fk__cliente_fk=OuterRef('pk'), menu_fk=menu_id)
+        return User.objects.filter(Exists(pidieron_menu))
+    raise ValueError(f'Destino desconocido: {destino}')
+
+
+def enviar_notificaciones(mensaje, usuarios, lote=1000):
+    # Crea una notificación por usuario en lotes de tamaño fijo con bulk_create. Los ids de los
+    # usuarios se recorren por rangos de pk, así que la memoria no depende del total de destinatarios.
+    inicio = time.perf_counter()
+    ultimo_id_previo = Notificaciones.objects.aggregate(ultimo=Max('pk'))['ultimo'] or 0
+    ids = usuarios.order_by('pk').values_list('pk', flat=True)
+    filas = 0
+    ultimo_usuario = 0
+
+    while True:
+        lote_ids = list(ids.filter(pk__gt=ultimo_usuario)[:lote])
+        if not lote_ids:
+            break
+        ultimo_usuario = lote_ids[-1]
+
+        with transaction.atomic():
+            Notificaciones.objects.bulk_create(
+                [Notificaciones(mensaje=mensaje, leido=False, cliente_fk_id=user_id) for user_id in lote_ids],
+                batch_size=lote,
+            )
+            _publicar_lote(lote_ids, ultimo_id_previo)
+        filas += len(lote_ids)
+
+    segundos = time.perf_counter() - inicio
+    return {
+        'filas': filas,
+        'segundos': round(segundos, 3),
+        'filas_por_segundo': round(filas / segundos, 1) if segundos else None,
+    }
+
+
+def _publicar_lote(lote_ids, ultimo_id_previo):
+    # bulk_create no emite post_save: avisar a los streams SSE abiertos de este lote
+    suscritos = broker.suscritos().intersection(lote_ids)
+    if not suscritos:
+        return
+    campos = [field.name for field in Notificaciones._meta.concrete_fields]
+    nuevas = list(
+        Notificaciones.objects
+        .filter(cliente_fk__in=suscritos, pk__gt=ultimo_id_previo)
+        .no_leidas()
+        .values(*campos)
+    )
+
+    def publicar():
+        for fila in nuevas:
+            broker.publicar(fila['cliente_fk'], fila)
+
+    transaction.on_commit(publicar)
@@ -0,0 +1,132 @@
+from base64 import b64decode, b64encode
+from binascii import Error as BinasciiError
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+# Mayor id posible de un BigAutoField
+MAX_PK = 2 ** 63 - 1
+
+
+def encode_position(creado, pk):
+    # Cursor opaco con la posición (timestamp de creación, id) de la última fila entregada
+    return b64encode(f'{creado.isoformat()}|{pk}'.encode('ascii')).decode('ascii')
+
+
+def decode_position(encoded):
+    # Inverso de encode_position; lanza ValueError si el cursor no es válido
+    try:
+        creado, pk = b64decode(encoded.encode('ascii')).decode('ascii').rsplit('|', 1)
+    except (BinasciiError, UnicodeError) as exc:
+        raise ValueError(encoded) from exc
+    creado, pk = parse_datetime(creado), int(pk)
+    # Un id fuera del rango de BigAutoField haría fallar la consulta en algunas bases de datos
+    if creado is None or not 0 < pk <= MAX_PK:
+        raise ValueError(encoded)
+    return creado, pk
+
+
+def keyset_filter(cursor_field, creado, pk, ascending=False):
+    # Filas estrictamente anteriores a (creado, pk) en orden descendente, o posteriores si ascending
+    lookup = 'gt' if ascending else 'lt'
+    return Q(**{f'{cursor_field}__{lookup}': creado}) | Q(**{cursor_field: creado, f'pk__{lookup}': pk})
+
+
+class KeysetPagination(BasePagination):
+    # Paginación por cursor sobre (timestamp de creación, id), del más reciente al más antiguo.
+    # Cada página filtra con "WHERE (creado, id) < (cursor)" en lugar de OFFSET, por lo que
+    # el costo de pedir la página siguiente no crece con la profundidad. Las vistas con
+    # 'cursor_ascending = True' recorren del más antiguo al más reciente.
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = api_settings.PAGE_SIZE or 50
+    # Tope máximo que el cliente puede pedir con ?page_size=
+    max_page_size = getattr(settings, 'API_MAX_PAGE_SIZE', 200)
+    invalid_cursor_message = 'Cursor inválido.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        results = list(self.page_queryset(queryset, request, view))
+        self.page = results[:self.page_size]
+        self.has_next = len(results) > self.page_size
+        return self.page
+
+    def page_queryset(self, queryset, request, view=None):
+        # Queryset (sin evaluar) de la página pedida más una fila extra, que indica si existe
+        # una página siguiente. También lo usan los validadores de caché condicional.
+        self.page_size = self.get_page_size(request)
+        self.cursor_field = self.get_cursor_field(view)
+        self.ascending = getattr(view, 'cursor_ascending', False)
+
+        if self.ascending:
+            queryset = queryset.order_by(self.cursor_field, 'pk')
+        else:
+            queryset = queryset.order_by(f'-{self.cursor_field}', '-pk')
+
+        # Si hay cursor, continuar desde la última fila entregada
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(keyset_filter(self.cursor_field, *position, ascending=self.ascending))
+        return queryset[:self.page_size + 1]
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_cursor_field(self, view):
+        # Cada vista declara su campo de creación con el atributo 'cursor_field'
+        cursor_field = getattr(view, 'cursor_field', None)
+        assert cursor_field is not None, (
+            f"'{view.__class__.__name__}' debe definir 'cursor_field' para usar KeysetPagination."
+        )
+        return cursor_field
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            return decode_position(encoded)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, instance):
+        return encode_position(getattr(instance, self.cursor_field), instance.pk)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_first_link(self):
+        return remove_query_param(self.base_url, self.cursor_query_param)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'first': self.get_first_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'first': {'type': 'string', 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,140 @@
+import cProfile
+import random
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .roles import roles_de_usuario
+
+# Perfilado opcional de vistas con cProfile. Una petición se perfila si un Admin envía la
+# cabecera X-Perfilar, si cae en la muestra settings.PERFILADOR_MUESTREO o si la petición
+# anterior a su ruta superó PERFILADOR_UMBRAL_MS (PERFILADOR_LENTAS: todas se cronometran,
+# lo que cuesta dos lecturas del reloj). Las pedidas por cabecera siempre se guardan; las
+# demás solo si superan el umbral. Los archivos .prof (pstats) se escriben en
+# PERFILADOR_DIRECTORIO y se conservan los PERFILADOR_MAXIMO más recientes. El comando
+# perfiles_top resume los capturados.
+
+CABECERA = 'X-Perfilar'
+# Desde Python 3.12 solo puede haber un cProfile activo por proceso (sys.monitoring): con
+# otra petición ya perfilándose en otro hilo, la vista se ejecuta sin perfilar
+perfilando = threading.Lock()
+# Rutas cuya última petición sin perfilar superó el umbral (por proceso)
+rutas_lentas = set()
+_rutas_lentas_lock = threading.Lock()
+
+
+def directorio_perfiles():
+    return Path(getattr(settings, 'PERFILADOR_DIRECTORIO', Path(settings.BASE_DIR) / 'perfiles'))
+
+
+def es_admin(request):
+    # La autenticación JWT de DRF ocurre dentro de la vista: aquí se valida el token aparte
+    try:
+        resultado = JWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    return resultado is not None and 'Admin' in roles_de_usuario(resultado[0])
+
+
+def guardar_perfil(perfil, request, duracion):
+    directorio = directorio_perfiles()
+    directorio.mkdir(parents=True, exist_ok=True)
+    ruta = request.resolver_match.route if request.resolver_match else request.path
+    # El sufijo evita que dos perfiles del mismo segundo se sobrescriban
+    nombre = '{}_{}_{}_{}ms_{}.prof'.format(
+        time.strftime('%Y%m%d-%H%M%S'), request.method,
+        re.sub(r'\W+', '_', ruta).strip('_') or 'raiz', int(duracion * 1000), uuid.uuid4().hex[:8],
+    )
+    perfil.dump_stats(directorio / nombre)
+    rotar(directorio)
+    return nombre
+
+
+def rotar(directorio):
+    # Conservar solo los perfiles más recientes
+    perfiles = sorted(directorio.glob('*.prof'), key=lambda archivo: archivo.stat().st_mtime, reverse=True)
+    for archivo in perfiles[getattr(settings, 'PERFILADOR_MAXIMO', 200):]:
+        archivo.unlink(missing_ok=True)
+
+
+class PerfiladorMiddleware:
+    # Debe ir al final de MIDDLEWARE: ejecuta la vista (y su renderizado) dentro del perfilador
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        inicio = time.perf_counter()
+        response = self.get_response(request)
+        self.registrar_duracion(request, time.perf_counter() - inicio)
+        return response
+
+    async def __acall__(self, request):
+        inicio = time.perf_counter()
+        response = await self.get_response(request)
+        self.registrar_duracion(request, time.perf_counter() - inicio)
+        return response
+
+    def registrar_duracion(self, request, duracion):
+        # Una petición lenta sin perfil marca su ruta para perfilar la siguiente
+        if getattr(request, '_perfilada', False) or request.resolver_match is None:
+            return
+        if not getattr(settings, 'PERFILADOR_LENTAS', True):
+            return
+        if duracion * 1000 >= getattr(settings, 'PERFILADOR_UMBRAL_MS', 1000):
+            with _rutas_lentas_lock:
+                rutas_lentas.add(request.resolver_match.route)
+
+    def ruta_lenta(self, request):
+        # Consume la marca de la ruta: solo se perfila una petición por cada lenta
+        with _rutas_lentas_lock:
+            if request.resolver_match.route not in rutas_lentas:
+                return False
+            rutas_lentas.discard(request.resolver_match.route)
+            return True
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Las vistas asíncronas comparten el event loop con otras peticiones: no se perfilan
+        if iscoroutinefunction(view_func):
+            return None
+
+        pedido = CABECERA in request.headers and es_admin(request)
+        if not pedido and random.random() >= getattr(settings, 'PERFILADOR_MUESTREO', 0) and not self.ruta_lenta(request):
+            return None
+
+        if not perfilando.acquire(blocking=False):
+            return None
+        request._perfilada = True
+        try:
+            perfil = cProfile.Profile()
+            inicio = time.perf_counter()
+            response = perfil.runcall(self.ejecutar, request, view_func, view_args, view_kwargs)
+            duracion = time.perf_counter() - inicio
+        finally:
+            perfilando.release()
+
+        if pedido or duracion * 1000 >= getattr(settings, 'PERFILADOR_UMBRAL_MS', 1000):
+            nombre = guardar_perfil(perfil, request, duracion)
+            if pedido:
+                response[CABECERA] = nombre
+        return response
+
+    def ejecutar(self, request, view_func, view_args, view_kwargs):
+        response = view_func(request, *view_args, **view_kwargs)
+        # Incluir el renderizado de las respuestas de DRF en el perfil
+        if hasattr(response, 'render') and callable(response.render):
+            response.render()
+        return response
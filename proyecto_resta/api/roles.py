@@ -0,0 +1,91 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+class RoleCache:
+    # Caché LRU con expiración (TTL) de los grupos de cada usuario, compartida entre
+    # peticiones del mismo proceso. Las señales de api/signals.py invalidan las entradas
+    # cuando cambian los grupos, pero solo en el proceso que hizo el cambio: en los demás un
+    # permiso revocado sigue vigente hasta que vence su entrada (settings.ROLE_CACHE_TTL).
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry is None:
+                return None
+            roles, expires = entry
+            if expires < time.monotonic():
+                del self._data[user_id]
+                return None
+            self._data.move_to_end(user_id)
+            return roles
+
+    def set(self, user_id, roles):
+        with self._lock:
+            self._data[user_id] = (roles, time.monotonic() + self.ttl)
+            self._data.move_to_end(user_id)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def invalidate(self, user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._data.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+role_cache = RoleCache(
+    max_size=getattr(settings, 'ROLE_CACHE_MAX_SIZE', 10000),
+    ttl=getattr(settings, 'ROLE_CACHE_TTL', 30),
+)
+
+
+def get_user_roles(request):
+    # Devuelve los nombres de grupo del usuario autenticado. Se calculan una sola vez por
+    # petición y, entre peticiones, se reutilizan desde la caché del proceso.
+    user = request.user
+    if not user or not user.is_authenticated:
+        return frozenset()
+
+    roles = getattr(request, '_api_roles', None)
+    if roles is not None:
+        return roles
+
+    roles = roles_de_usuario(user)
+    request._api_roles = roles
+    return roles
+
+
+def roles_de_usuario(user):
+    # Nombres de grupo de un usuario desde la caché del proceso
+    roles = role_cache.get(user.pk)
+    if roles is None:
+        roles = frozenset(user.groups.values_list('name', flat=True))
+        role_cache.set(user.pk, roles)
+    return roles
+
+
+async def aget_user_roles(user):
+    # Variante asíncrona para las vistas ASGI nativas (api/async_views.py)
+    if not user or not user.is_authenticated:
+        return frozenset()
+
+    roles = role_cache.get(user.pk)
+    if roles is None:
+        roles = frozenset([name async for name in user.groups.values_list('name', flat=True)])
+        role_cache.set(user.pk, roles)
+    return roles
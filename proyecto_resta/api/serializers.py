@@ -1,13 +1,21 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.utils import timezone
-from datetime import datetime
+from datetime import timedelta
+from decimal import Decimal
 import re
-from .models import CategoriaMenu, Menu, HistorialEstados, Pedido, Promocion, MetodoDePago, MesasEstado, Mesas, Comentarios, Notificaciones, Reserva, Factura, DetallePedido
+from .models import CAMPOS_CALIFICACION, CategoriaMenu, Menu, HistorialEstados, Pedido, EventoEstadoPedido, Promocion, MetodoDePago, MesasEstado, Mesas, Comentarios, Notificaciones, Reserva, Factura, DetallePedido, ResumenVentas
 from django.contrib.auth.models import User, Group
+from django.db import IntegrityError, transaction
 from rest_framework.response import Response
+from .exportacion import FORMATOS as FORMATOS_EXPORTACION
+from .campos import CamposDinamicosMixin
 
+# Letras (con tildes y ñ) y espacios; compilada una vez para todos los validadores
+SOLO_LETRAS_RE = re.compile(r'^[a-zA-ZáéíóúÁÉÍÓÚñÑ\s]+$')
 
-class UserRegisterSerializer(serializers.ModelSerializer):
+
+class UserRegisterSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     # Campo 'role' se define como solo escritura
     role = serializers.CharField(write_only=True)
 
@@ -57,7 +65,7 @@ class UserRegisterSerializer(serializers.ModelSerializer):
         return instance
 
 ###################################################################################################################
-class CategoriaMenuSerializer(serializers.ModelSerializer):
+class CategoriaMenuSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = CategoriaMenu
         # Incluir todos los campos del modelo CategoriaMenu
@@ -69,22 +77,26 @@ class CategoriaMenuSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("El nombre no puede estar vacío.")
    
         # Validar que el nombre solo contenga letras y espacios
-        if not re.match(r'^[a-zA-ZáéíóúÁÉÍÓÚñÑ\s]+$', value):
+        if not SOLO_LETRAS_RE.match(value):
             raise serializers.ValidationError("Este campo solo debe contener letras y espacios.")
         return value
         
     def validate_descripcion(self, value):
         # Validar que la descripción solo contenga letras y espacios
-        if not re.match(r'^[a-zA-ZáéíóúÁÉÍÓÚñÑ\s]+$', value):
+        if not SOLO_LETRAS_RE.match(value):
             raise serializers.ValidationError("Este campo solo debe contener letras y espacios.")
         return value
 
 ###################################################################################################################
-class MenuSerializer(serializers.ModelSerializer):
+class MenuSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Menu
         # Incluir todos los campos del modelo Menu
         fields = '__all__'
+        # El resumen de calificaciones se mantiene a partir de Comentarios
+        read_only_fields = CAMPOS_CALIFICACION
+        # Relaciones que se pueden anidar con ?expand=
+        expandibles = {'categoria_fk': 'CategoriaMenuSerializer'}
         
     def validate_nombre(self, value):
         # Validar que el nombre del menú no esté vacío
@@ -94,7 +106,7 @@ class MenuSerializer(serializers.ModelSerializer):
         if len(value) < 3:
             raise serializers.ValidationError("El nombre del menú debe tener al menos 3 caracteres.")
         # Validar que el nombre solo contenga letras y espacios
-        if not re.match(r'^[a-zA-ZáéíóúÁÉÍÓÚñÑ\s]+$', value):
+        if not SOLO_LETRAS_RE.match(value):
             raise serializers.ValidationError("Este campo solo debe contener letras y espacios.")
         return value 
     
@@ -112,12 +124,35 @@ class MenuSerializer(serializers.ModelSerializer):
     
     def validate_descripcion(self, value):
         # Validar que la descripción solo contenga letras y espacios
-        if not re.match(r'^[a-zA-ZáéíóúÁÉÍÓÚñÑ\s]+$', value):
+        if not SOLO_LETRAS_RE.match(value):
             raise serializers.ValidationError("Este campo solo debe contener letras y espacios.")
         return value
   
+class MejorCalificadosSerializer(serializers.Serializer):
+    # Parámetros del listado de menús mejor calificados
+    minimo = serializers.IntegerField(min_value=1, default=1)
+    limite = serializers.IntegerField(min_value=1, max_value=settings.API_MAX_PAGE_SIZE, default=10)
+
+class BusquedaMenuSerializer(serializers.Serializer):
+    # Parámetros de la búsqueda de menús
+    q = serializers.CharField(max_length=100)
+    limite = serializers.IntegerField(min_value=1, max_value=settings.API_MAX_PAGE_SIZE, default=20)
+
+class ImportacionSerializer(serializers.Serializer):
+    # Archivo de la importación masiva; el formato se deduce de la extensión si no se indica
+    archivo = serializers.FileField()
+    formato = serializers.ChoiceField(choices=['csv', 'ndjson'], required=False)
+    # Validar y reportar sin guardar nada
+    simular = serializers.BooleanField(default=False)
+
+    def validate(self, attrs):
+        if 'formato' not in attrs:
+            nombre = attrs['archivo'].name.lower()
+            attrs['formato'] = 'ndjson' if nombre.endswith(('.ndjson', '.jsonl')) else 'csv'
+        return attrs
+
 ################################################################################################################### 
-class HistorialEstadosSerializer(serializers.ModelSerializer):
+class HistorialEstadosSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = HistorialEstados
         # Incluir todos los campos del modelo HistorialEstados
@@ -139,11 +174,15 @@ class HistorialEstadosSerializer(serializers.ModelSerializer):
         self.save()  # Guardar los cambios en la base de datos
 
 ###################################################################################################################
-class PedidoSerializer(serializers.ModelSerializer):
+class PedidoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Pedido
         # Incluir todos los campos del modelo Pedido
         fields = '__all__'
+        # El estado actual solo cambia con estado_fk o con la transición de estados
+        read_only_fields = ('estado_actual', 'estado_actualizado')
+        # Relaciones que se pueden anidar con ?expand=
+        expandibles = {'estado_fk': 'HistorialEstadosSerializer', 'detallepedido_set': 'DetallePedidoSerializer'}
 
     def validate_precio(self, value):
         # Validar que el precio sea un valor mayor a cero
@@ -151,14 +190,34 @@ class PedidoSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("El precio debe ser mayor a cero")
         return value
 
+class EventoEstadoPedidoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    class Meta:
+        model = EventoEstadoPedido
+        fields = '__all__'
+        # Relaciones que se pueden anidar con ?expand=
+        expandibles = {'pedido_fk': 'PedidoSerializer'}
+
+class TransicionEstadoSerializer(serializers.Serializer):
+    # Avanzar varios pedidos a un mismo estado
+    pedidos = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=1000)
+    estado = serializers.ChoiceField(choices=HistorialEstados.ESTADOS_CHOICES)
+
+    def validate_estado(self, value):
+        # El primer estado del flujo no se alcanza con una transición
+        if value == HistorialEstados.ESTADO_PREPARACION:
+            raise serializers.ValidationError("Un pedido no puede volver a preparación.")
+        return value
+
     
 ################################################################################################################### 
     
-class PromocionSerializer(serializers.ModelSerializer):
+class PromocionSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Promocion
         # Incluir todos los campos del modelo Promocion
         fields = '__all__'
+        # Relaciones que se pueden anidar con ?expand=
+        expandibles = {'menu_fk': 'MenuSerializer'}
 
     def validate(self, attrs):
         # Validar que el descuento esté entre 0 y 100
@@ -173,7 +232,7 @@ class PromocionSerializer(serializers.ModelSerializer):
         
 ###################################################################################################################   
 
-class MetodoDePagoSerializer(serializers.ModelSerializer):
+class MetodoDePagoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = MetodoDePago
         # Incluir todos los campos del modelo MetodoDePago
@@ -193,7 +252,7 @@ class MetodoDePagoSerializer(serializers.ModelSerializer):
     
 ################################################################################################################### 
     
-class MesasEstadoSerializer(serializers.ModelSerializer):
+class MesasEstadoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = MesasEstado
         # Incluir campos específicos del modelo MesasEstado
@@ -207,11 +266,21 @@ class MesasEstadoSerializer(serializers.ModelSerializer):
         
 ###################################################################################################################
 
-class MesasSerializer(serializers.ModelSerializer):
+def numero_mesa_duplicado(exc):
+    # MySQL y PostgreSQL nombran la restricción en el mensaje; SQLite, la tabla y la columna
+    mensaje = str(exc)
+    return 'mesa_numero_unico' in mensaje or f'{Mesas._meta.db_table}.numero_mesa' in mensaje
+
+class MesasSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Mesas
         # Incluir todos los campos del modelo Mesas
         fields = '__all__'
+        # La unicidad de numero_mesa la garantiza la restricción 'mesa_numero_unico' de la
+        # base de datos; se omite el UniqueValidator para no hacer una consulta previa.
+        extra_kwargs = {'numero_mesa': {'validators': []}}
+        # Relaciones que se pueden anidar con ?expand=
+        expandibles = {'estado_mesa_fk': 'MesasEstadoSerializer'}
 
     def validate_capacidad_mesa(self, value): 
         # Validar que la capacidad de la mesa sea mayor que cero
@@ -219,24 +288,56 @@ class MesasSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("La capacidad de la mesa debe ser mayor que cero") 
         return value 
     
-    def validate_numero_mesa(self, value): 
-        # Verificar si ya existe una mesa con el mismo número
-        if Mesas.objects.filter(numero_mesa=value).exists(): 
-            raise serializers.ValidationError("Ya existe una mesa con este número") 
-        return value 
-    
     def validate_disponibilidad_mesa(self, value): 
         # Validar que la mesa no esté reservada
         if value.estado == 'Reservada': 
             raise serializers.ValidationError("No se puede agregar una mesa que esté reservada") 
         return value
 
+    def save(self, **kwargs):
+        # Traducir la violación de la restricción única en un error de validación; cualquier
+        # otro IntegrityError (FK, NOT NULL...) se propaga tal cual
+        try:
+            with transaction.atomic():
+                return super().save(**kwargs)
+        except IntegrityError as exc:
+            if not numero_mesa_duplicado(exc):
+                raise
+            raise serializers.ValidationError({"numero_mesa": ["Ya existe una mesa con este número"]})
+
+###################################################################################################################
+
+class DisponibilidadMesasSerializer(serializers.Serializer):
+    # Parámetros de búsqueda de mesas disponibles
+    personas = serializers.IntegerField(min_value=1)
+    desde = serializers.DateTimeField()
+    hasta = serializers.DateTimeField()
+    # Duración supuesta de cada reserva, en minutos (hasta un día)
+    duracion = serializers.IntegerField(min_value=1, max_value=24 * 60, default=lambda: settings.RESERVA_DURACION_MINUTOS)
+
+    def validate(self, attrs):
+        # Validar que la ventana de tiempo sea coherente
+        if attrs['hasta'] <= attrs['desde']:
+            raise serializers.ValidationError({"hasta": "La hora final debe ser posterior a la inicial."})
+        # La búsqueda compara con desde - duracion: debe seguir siendo una fecha representable
+        try:
+            attrs['desde'] - timedelta(minutes=attrs['duracion'])
+        except OverflowError:
+            raise serializers.ValidationError({"desde": "La hora inicial está fuera del rango de fechas admitido."})
+        return attrs
+
+class MesaDisponibleSerializer(MesasSerializer):
+    # Asientos sobrantes de la mesa para el tamaño del grupo
+    holgura = serializers.IntegerField(read_only=True)
+
 ################################################################################################################### 
     
-class ComentariosSerializer(serializers.ModelSerializer):
+class ComentariosSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Comentarios
         fields = '__all__'
+        # Relaciones que se pueden anidar con ?expand=
+        expandibles = {'menu_fk': 'MenuSerializer'}
     
     def validate_comentario(self, value): 
         if not value: raise serializers.ValidationError("El comentario no puede estar vacío") 
@@ -256,7 +357,7 @@ class ComentariosSerializer(serializers.ModelSerializer):
         
 ###################################################################################################################
 
-class NotificacionesSerializer(serializers.ModelSerializer):
+class NotificacionesSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Notificaciones
         fields = '__all__'
@@ -268,34 +369,74 @@ class NotificacionesSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("El mensaje no puede exceder los 500 caracteres") 
         return value 
     
+class FanOutNotificacionesSerializer(serializers.Serializer):
+    # Envío masivo de una notificación a un grupo de destinatarios
+    mensaje = serializers.CharField()
+    destino = serializers.ChoiceField(choices=['clientes', 'menu'])
+    menu_fk = serializers.PrimaryKeyRelatedField(queryset=Menu.objects.all(), required=False)
+
+    def validate_mensaje(self, value):
+        # Mismas reglas que NotificacionesSerializer
+        return NotificacionesSerializer().validate_mensaje(value)
+
+    def validate(self, attrs):
+        # El destino 'menu' necesita el menú pedido por los destinatarios
+        if attrs['destino'] == 'menu' and 'menu_fk' not in attrs:
+            raise serializers.ValidationError({"menu_fk": "Indique el menú para el destino 'menu'."})
+        return attrs
+
+class MarcarLeidasSerializer(serializers.Serializer):
+    # Marcar como leídas todas las notificaciones del usuario hasta este id (inclusive)
+    hasta_id = serializers.IntegerField(min_value=1)
+
 ################################################################################################################### 
     
-class ReservaSerializer(serializers.ModelSerializer):
+class ReservaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Reserva
         # Incluir todos los campos del modelo Reserva
         fields = '__all__'
+        # Relaciones que se pueden anidar con ?expand=
+        expandibles = {'mesa_fk': 'MesasSerializer', 'metodo_pago_fk': 'MetodoDePagoSerializer'}
 
     def validate(self, attrs):
         # Validar que la fecha de reserva no sea en el pasado
-        if attrs['fecha_reserva'] < timezone.now():
+        # (la existencia de la mesa ya la valida el campo mesa_fk)
+        if 'fecha_reserva' in attrs and attrs['fecha_reserva'] < timezone.now():
             raise serializers.ValidationError({"fecha_reserva": "La fecha de reserva no puede ser en el pasado."})
-        
-        # Verificar que la mesa especificada exista
-        if not Mesas.objects.filter(id=attrs['id_mesa'].id).exists():
-            raise serializers.ValidationError({"id_mesa": "La mesa especificada no existe."})
 
         return attrs
+
+    def save(self, **kwargs):
+        # Reservar sin doble asignación: se bloquea solo la fila de la mesa afectada
+        # (SELECT ... FOR UPDATE) y el cruce de horarios se comprueba dentro de la misma
+        # transacción, de modo que las reservas de otras mesas no esperan.
+        mesa = self.validated_data.get('mesa_fk') or self.instance.mesa_fk
+        fecha_reserva = self.validated_data.get('fecha_reserva') or self.instance.fecha_reserva
+        duracion = timedelta(minutes=settings.RESERVA_DURACION_MINUTOS)
+
+        with transaction.atomic():
+            Mesas.objects.select_for_update().only('pk').get(pk=mesa.pk)
+            solapadas = Reserva.objects.filter(mesa_fk=mesa).solapadas(
+                fecha_reserva, fecha_reserva + duracion, duracion,
+            )
+            if self.instance is not None:
+                solapadas = solapadas.exclude(pk=self.instance.pk)
+            if solapadas.exists():
+                raise serializers.ValidationError({"fecha_reserva": "La mesa ya está reservada en ese horario."})
+            return super().save(**kwargs)
         
 ###################################################################################################################  
 
-class FacturaSerializer(serializers.ModelSerializer):
+class FacturaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Factura
         # Incluir todos los campos del modelo Factura
         fields = '__all__'
         # Definir campos de solo lectura
         read_only_fields = ['fecha_emision', 'total_factura']
+        # Relaciones que se pueden anidar con ?expand=
+        expandibles = {'metodo_pago_fk': 'MetodoDePagoSerializer', 'mesa_fk': 'MesasSerializer', 'detallepedido_set': 'DetallePedidoSerializer'}
         
     def validate_usuario(self, value):
         # Validar que el usuario no sea nulo
@@ -307,84 +448,200 @@ class FacturaSerializer(serializers.ModelSerializer):
         # Validar que haya al menos un detalle de pedido
         if not value.exists():
             raise serializers.ValidationError("Debe haber al menos un detalle de pedido.")
-        return value   
-    
-    def to_representation(self, instance):
-        # Personalizar la representación de la factura
-        representation = super().to_representation(instance)
-        
-        # Calcular el total de la factura sumando los detalles del pedido
-        total = sum(detalle.total for detalle in instance.detallepedido_set.all())
-        representation['total_factura'] = total
-        
-        return representation
+        return value
 
-    def create(self, validated_data):
-        # Crear una nueva factura
-        factura = Factura.objects.create(**validated_data)
-        
-        # Calcular el total de la factura y guardarlo
-        factura.total_factura = sum(detalle.total for detalle in factura.detallepedido_set.all())
-        factura.save()
-        
-        return factura    
+    # total_factura se mantiene actualizado desde los DetallePedido (ver api/signals.py),
+    # por lo que se serializa el valor almacenado sin recorrer los detalles.
+    # Para corregir desfases: python manage.py recalcular_totales_factura
 
 ###################################################################################################################  
 
-class DetallePedidoSerializer(serializers.ModelSerializer):
+TASA_IVA = Decimal('0.13')
+
+def calcular_montos(precio, cantidad, descuento=0):
+    # Calcular subtotal (con descuento de promoción), IVA y total de una línea de pedido
+    subtotal = precio * cantidad * (100 - descuento) / 100
+    iva = round(subtotal * TASA_IVA, 2)
+    total = round(subtotal + iva, 2)
+    # Los montos de DetallePedido son IntegerField: se devuelven ya como se guardan, para que
+    # el total incremental de la factura (api/signals.py) sume lo mismo que la base de datos
+    montos = {'subtotal': subtotal, 'iva': iva, 'total': total}
+    return {campo: DetallePedido._meta.get_field(campo).get_prep_value(valor) for campo, valor in montos.items()}
+
+class DetallePedidoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = DetallePedido
         # Incluir todos los campos del modelo DetallePedido
         fields = '__all__'
         # Definir campos de solo lectura
         read_only_fields = ['detalle_pedido_creado', 'detalle_pedido_actualizado', 'subtotal', 'iva', 'total']
+        # Relaciones que se pueden anidar con ?expand=
+        expandibles = {
+            'pedido_fk': 'PedidoSerializer', 'menu_fk': 'MenuSerializer',
+            'factura_fk': 'FacturaSerializer', 'promocion_fk': 'PromocionSerializer',
+        }
 
     def validate(self, data):
-        # Validar los detalles del pedido
-        cantidad = data.get('cantidad', 1)
-        id_menu = data.get('id_menu')
-        id_promocion = data.get('id_promocion')
-        menu = Menu.objects.get(id=id_menu.id)
-        subtotal = menu.precio * cantidad 
-
-        # Aplicar promoción si está presente y es válida
-        if id_promocion:
-            promocion = Promocion.objects.filter(id=id_promocion.id, fecha_vencimiento__gt=datetime.now()).first()
-            if promocion:
-                descuento = promocion.descuento / 100 
-                subtotal = subtotal * (1 - descuento)  
-            else:
+        # Validar los detalles del pedido; en una edición parcial (PATCH) los campos que no
+        # llegan conservan el valor del detalle
+        cantidad = data.get('cantidad', getattr(self.instance, 'cantidad', 1))
+        menu = data.get('menu_fk') or getattr(self.instance, 'menu_fk', None)
+        promocion_actual = getattr(self.instance, 'promocion_fk', None)
+        promocion = data['promocion_fk'] if 'promocion_fk' in data else promocion_actual
+        descuento = 0
+
+        # Aplicar promoción si está presente y es válida (la que ya tenía el detalle se conserva)
+        if promocion:
+            if promocion != promocion_actual and promocion.fecha_vencimiento <= timezone.now():
                 raise serializers.ValidationError("La promoción no es válida o ha expirado.")
+            descuento = promocion.descuento
 
-        # Calcular IVA y total
-        tasa_iva = 0.13
-        iva = round(subtotal * tasa_iva, 2)
-        total = round(subtotal + iva, 2)
-
-        # Almacenar cálculos en los datos
-        data['subtotal'] = subtotal
-        data['iva'] = iva
-        data['total'] = total
+        # Calcular subtotal, IVA y total y almacenarlos en los datos
+        data.update(calcular_montos(menu.precio, cantidad, descuento))
         return data
 
     def create(self, validated_data):
         # Crear un nuevo detalle de pedido
         return DetallePedido.objects.create(**validated_data)
+###################################################################################################################
 
-    def update(self, instance, validated_data):
-        # Actualizar los campos del detalle de pedido
-        instance.cantidad = validated_data.get('cantidad', instance.cantidad)
-        instance.id_pedido = validated_data.get('id_pedido', instance.id_pedido)
-        instance.id_menu = validated_data.get('id_menu', instance.id_menu)
-        instance.factura = validated_data.get('factura', instance.factura)
-        instance.id_promocion = validated_data.get('id_promocion', instance.id_promocion)
-
-        # Validar y calcular valores
-        validated_data = self.validate(validated_data)
-        instance.subtotal = validated_data['subtotal']
-        instance.iva = validated_data['iva']
-        instance.total = validated_data['total']
-
-        # Guardar cambios
-        instance.save()
-        return instance
\ No newline at end of file
+class LineaDetalleSerializer(DetallePedidoSerializer):
+    # Línea de PedidoDetalleSerializer con su menú y su promoción anidados
+    menu_fk = MenuSerializer(read_only=True)
+    promocion_fk = PromocionSerializer(read_only=True)
+
+class PedidoDetalleSerializer(PedidoSerializer):
+    # Pedido con su estado, sus líneas y su factura en una sola respuesta. Solo lectura: la
+    # vista carga todo con select_related / prefetch_related (ver PedidoDetalleCompleto).
+    estado_fk = HistorialEstadosSerializer(read_only=True)
+    lineas = LineaDetalleSerializer(source='detallepedido_set', many=True, read_only=True)
+    factura = serializers.SerializerMethodField()
+
+    class Meta(PedidoSerializer.Meta):
+        # Las relaciones ya vienen anidadas
+        expandibles = {}
+
+    def get_factura(self, pedido):
+        # Factura de las líneas del pedido, cargada junto con ellas
+        for linea in pedido.detallepedido_set.all():
+            if linea.factura_fk is not None:
+                return FacturaSerializer(linea.factura_fk).data
+        return None
+
+class LineaPedidoSerializer(serializers.Serializer):
+    # Línea de un pedido completo; los ids se resuelven en bloque en PedidoCompletoSerializer
+    menu_fk = serializers.IntegerField(min_value=1)
+    cantidad = serializers.IntegerField(min_value=1, default=1)
+    promocion_fk = serializers.IntegerField(min_value=1, required=False, allow_null=True)
+
+class PedidoCompletoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    lineas = LineaPedidoSerializer(many=True, write_only=True)
+
+    class Meta:
+        model = Pedido
+        # Incluir todos los campos del modelo Pedido más sus líneas
+        fields = '__all__'
+        read_only_fields = ('estado_actual', 'estado_actualizado')
+
+    def validate_lineas(self, value):
+        # Validar que el pedido tenga al menos una línea
+        if not value:
+            raise serializers.ValidationError("El pedido debe tener al menos una línea.")
+        return value
+
+    def validate(self, attrs):
+        lineas = attrs['lineas']
+
+        # Resolver todos los menús y promociones con una consulta IN cada uno
+        menus = Menu.objects.in_bulk({linea['menu_fk'] for linea in lineas})
+        ids_promocion = {linea['promocion_fk'] for linea in lineas if linea.get('promocion_fk')}
+        promociones = Promocion.objects.filter(fecha_vencimiento__gt=timezone.now()).in_bulk(ids_promocion) if ids_promocion else {}
+
+        # Validar y calcular cada línea en memoria, acumulando los errores por posición
+        errores = []
+        for linea in lineas:
+            error = {}
+            menu = menus.get(linea['menu_fk'])
+            if menu is None:
+                error['menu_fk'] = ["El menú especificado no existe."]
+            elif not menu.disponibilidad:
+                error['menu_fk'] = ["El menú especificado no está disponible."]
+
+            descuento = 0
+            if linea.get('promocion_fk'):
+                promocion = promociones.get(linea['promocion_fk'])
+                if promocion is None:
+                    error['promocion_fk'] = ["La promoción no es válida o ha expirado."]
+                elif promocion.menu_fk_id != linea['menu_fk']:
+                    error['promocion_fk'] = ["La promoción no corresponde al menú de la línea."]
+                else:
+                    descuento = promocion.descuento
+
+            if not error:
+                linea['menu'] = menu
+                linea.update(calcular_montos(menu.precio, linea['cantidad'], descuento))
+            errores.append(error)
+
+        if any(errores):
+            raise serializers.ValidationError({'lineas': errores})
+        return attrs
+
+    def create(self, validated_data):
+        lineas = validated_data.pop('lineas')
+
+        # Crear el pedido y todas sus líneas en una sola transacción
+        with transaction.atomic():
+            pedido = Pedido.objects.create(**validated_data)
+            DetallePedido.objects.bulk_create([
+                DetallePedido(
+                    pedido_fk=pedido,
+                    menu_fk=linea['menu'],
+                    promocion_fk_id=linea.get('promocion_fk'),
+                    cantidad=linea['cantidad'],
+                    subtotal=linea['subtotal'],
+                    iva=linea['iva'],
+                    total=linea['total'],
+                )
+                for linea in lineas
+            ])
+        return pedido
+
+    def to_representation(self, instance):
+        # Incluir las líneas creadas (una consulta, ya que bulk_create no devuelve ids en MySQL)
+        representation = super().to_representation(instance)
+        representation['lineas'] = DetallePedidoSerializer(instance.detallepedido_set.all(), many=True).data
+        return representation
+
+###################################################################################################################
+
+class ResumenVentasSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    class Meta:
+        model = ResumenVentas
+        fields = '__all__'
+
+class ReporteVentasSerializer(serializers.Serializer):
+    # Parámetros del reporte de ventas
+    dimension = serializers.ChoiceField(choices=ResumenVentas.DIMENSIONES_CHOICES)
+    periodo = serializers.ChoiceField(choices=ResumenVentas.PERIODOS_CHOICES, default=ResumenVentas.PERIODO_DIA)
+    desde = serializers.DateTimeField(required=False)
+    hasta = serializers.DateTimeField(required=False)
+    # Id del menú o de la categoría, o el tipo de pago
+    clave = serializers.CharField(required=False)
+
+    def validate(self, attrs):
+        # Validar que el rango de fechas sea coherente
+        if 'desde' in attrs and 'hasta' in attrs and attrs['hasta'] <= attrs['desde']:
+            raise serializers.ValidationError({"hasta": "La fecha final debe ser posterior a la inicial."})
+        return attrs
+
+class ExportacionSerializer(serializers.Serializer):
+    # Parámetros de las exportaciones: rango [desde, hasta) sobre la fecha de creación y formato
+    desde = serializers.DateTimeField(required=False)
+    hasta = serializers.DateTimeField(required=False)
+    formato = serializers.ChoiceField(choices=list(FORMATOS_EXPORTACION), default='csv')
+
+    def validate(self, attrs):
+        # Validar que el rango de fechas sea coherente
+        if 'desde' in attrs and 'hasta' in attrs and attrs['hasta'] <= attrs['desde']:
+            raise serializers.ValidationError({"hasta": "La fecha final debe ser posterior a la inicial."})
+        return attrs
@@ -0,0 +1,192 @@
+from django.contrib.auth.models import Group, User
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .broker import broker
+from .busqueda import get_backend as get_busqueda_backend
+from .cache import bump_catalogo_version
+from .calificaciones import aplicar_calificacion
+from .models import CategoriaMenu, Comentarios, DetallePedido, EventoEstadoPedido, Factura, Menu, Notificaciones, Pedido, Promocion
+from .roles import role_cache
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidar_roles_usuario(sender, instance, action, reverse, pk_set, **kwargs):
+    # Invalida la caché de roles cuando se agregan o quitan grupos de un usuario
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        # user.groups.add(...) / remove(...) / clear()
+        role_cache.invalidate([instance.pk])
+    elif pk_set:
+        # group.user_set.add(...) / remove(...)
+        role_cache.invalidate(pk_set)
+    else:
+        # group.user_set.clear(): no se conocen los usuarios afectados
+        role_cache.clear()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidar_roles_grupo(sender, **kwargs):
+    # Renombrar o eliminar un grupo afecta a todos sus usuarios
+    role_cache.clear()
+
+
+@receiver(post_delete, sender=User)
+def invalidar_roles_usuario_eliminado(sender, instance, **kwargs):
+    role_cache.invalidate([instance.pk])
+
+
+##############################################################################################################################
+# Totales de Factura mantenidos de forma incremental a partir de DetallePedido
+
+def _sumar_a_factura(factura_id, delta):
+    # UPDATE ... SET total_factura = total_factura + delta, sin leer la factura.
+    # update() no aplica auto_now: factura_actualizada se fija aquí para que cambien
+    # el ETag y el Last-Modified de la factura (ver api/conditional.py)
+    if factura_id is None or not delta:
+        return
+    Factura.objects.filter(pk=factura_id).update(
+        total_factura=F('total_factura') + delta, factura_actualizada=timezone.now(),
+    )
+
+
+def _total_guardado(detalle):
+    # Total tal como queda en la base de datos (IntegerField), aunque en memoria sea un Decimal
+    return DetallePedido._meta.get_field('total').get_prep_value(detalle.total)
+
+
+@receiver(pre_save, sender=DetallePedido)
+def guardar_detalle_anterior(sender, instance, **kwargs):
+    # Recordar la factura y el total que tenía el detalle antes de guardarse
+    instance._factura_anterior = None
+    if instance.pk is not None:
+        instance._factura_anterior = (
+            DetallePedido.objects.filter(pk=instance.pk).values_list('factura_fk_id', 'total').first()
+        )
+
+
+@receiver(post_save, sender=DetallePedido)
+def actualizar_total_factura(sender, instance, **kwargs):
+    anterior = getattr(instance, '_factura_anterior', None)
+    total = _total_guardado(instance)
+    if anterior is not None:
+        factura_anterior, total_anterior = anterior
+        if factura_anterior == instance.factura_fk_id:
+            # Mismo destino: aplicar solo la diferencia
+            _sumar_a_factura(instance.factura_fk_id, total - total_anterior)
+            return
+        # El detalle se movió a otra factura (o se desvinculó)
+        _sumar_a_factura(factura_anterior, -total_anterior)
+    _sumar_a_factura(instance.factura_fk_id, total)
+
+
+@receiver(post_delete, sender=DetallePedido)
+def restar_total_factura(sender, instance, **kwargs):
+    _sumar_a_factura(instance.factura_fk_id, -_total_guardado(instance))
+
+
+##############################################################################################################################
+# Versión del catálogo en caché (Menu, CategoriaMenu, Promocion)
+
+@receiver(post_save, sender=Menu)
+@receiver(post_delete, sender=Menu)
+@receiver(post_save, sender=CategoriaMenu)
+@receiver(post_delete, sender=CategoriaMenu)
+@receiver(post_save, sender=Promocion)
+@receiver(post_delete, sender=Promocion)
+def invalidar_catalogo(sender, **kwargs):
+    # Al confirmar: si se cambiara de versión antes, una lectura concurrente podría guardar
+    # las filas aún sin confirmar bajo la versión nueva
+    transaction.on_commit(bump_catalogo_version)
+
+
+##############################################################################################################################
+# Índice de búsqueda de Menu
+
+@receiver(post_save, sender=Menu)
+def indexar_menu(sender, instance, update_fields=None, **kwargs):
+    # Guardados que no tocan el texto (p. ej. solo disponibilidad) no reindexan
+    if update_fields is not None and not {'nombre', 'descripcion'} & set(update_fields):
+        return
+    get_busqueda_backend().menu_guardado(instance)
+
+
+@receiver(post_delete, sender=Menu)
+def desindexar_menu(sender, instance, **kwargs):
+    get_busqueda_backend().menu_eliminado(instance.pk)
+
+
+##############################################################################################################################
+# Resumen de calificaciones de cada Menu a partir de Comentarios
+
+@receiver(pre_save, sender=Comentarios)
+def guardar_calificacion_anterior(sender, instance, **kwargs):
+    # Recordar el menú y la calificación que tenía el comentario antes de guardarse
+    instance._calificacion_anterior = None
+    if instance.pk is not None:
+        instance._calificacion_anterior = (
+            Comentarios.objects.filter(pk=instance.pk).values_list('menu_fk_id', 'calificacion').first()
+        )
+
+
+@receiver(post_save, sender=Comentarios)
+def actualizar_calificaciones(sender, instance, **kwargs):
+    anterior = getattr(instance, '_calificacion_anterior', None)
+    if anterior is not None:
+        if anterior == (instance.menu_fk_id, instance.calificacion):
+            return
+        aplicar_calificacion(anterior[0], anterior[1], -1)
+    aplicar_calificacion(instance.menu_fk_id, instance.calificacion, 1)
+
+
+@receiver(post_delete, sender=Comentarios)
+def restar_calificacion(sender, instance, **kwargs):
+    aplicar_calificacion(instance.menu_fk_id, instance.calificacion, -1)
+
+
+##############################################################################################################################
+# Notificaciones nuevas hacia los streams SSE abiertos
+
+def publicar_notificacion(notificacion):
+    evento = {field.name: field.value_from_object(notificacion) for field in Notificaciones._meta.concrete_fields}
+    # Publicar solo cuando la fila ya es visible para otras conexiones
+    transaction.on_commit(lambda: broker.publicar(notificacion.cliente_fk_id, evento))
+
+
+@receiver(post_save, sender=Notificaciones)
+def notificacion_creada(sender, instance, created, **kwargs):
+    if created and not instance.leido:
+        publicar_notificacion(instance)
+
+
+##############################################################################################################################
+# Estado actual de cada Pedido y su registro de eventos
+
+@receiver(pre_save, sender=Pedido)
+def sincronizar_estado_pedido(sender, instance, **kwargs):
+    # estado_fk se conserva por compatibilidad: al crear el pedido o al cambiar de fila de
+    # HistorialEstados se toma su estado como estado actual del pedido
+    instance._nuevo_estado = False
+    if not instance._state.adding:
+        estado_fk_anterior = Pedido.objects.filter(pk=instance.pk).values_list('estado_fk_id', flat=True).first()
+        if estado_fk_anterior == instance.estado_fk_id:
+            return
+    estado = instance.estado_fk.estado
+    if instance._state.adding or estado != instance.estado_actual:
+        instance.estado_actual = estado
+        instance.estado_actualizado = timezone.now()
+        instance._nuevo_estado = True
+
+
+@receiver(post_save, sender=Pedido)
+def registrar_evento_estado(sender, instance, **kwargs):
+    if getattr(instance, '_nuevo_estado', False):
+        EventoEstadoPedido.objects.create(
+            pedido_fk=instance, estado=instance.estado_actual, evento_creado=instance.estado_actualizado,
+        )
@@ -1,3 +1,1611 @@
-from django.test import TestCase
+import csv
+import json
+import tempfile
+import threading
+import time
+from base64 import b64encode
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection
+from django.test import AsyncClient, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.mixins import ListModelMixin, RetrieveModelMixin
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from rest_framework.request import Request
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import CategoriaMenu, Comentarios, DetallePedido, EventoEstadoPedido, Factura, HistorialEstados, Menu, Mesas, MesasEstado, MetodoDePago, Notificaciones, Pedido, Promocion, Reserva, ResumenVentas
+from .async_views import AsyncNotificacionesStream
+from .benchmark import (
+    comparar, consultas_de_vista, medir_rutas, medir_serializadores, parametros_consulta, recorridos_completos,
+    resolver_ruta, rutas_get,
+)
+from .busqueda import FTS5Backend, IndiceInvertidoBackend
+from .cache import catalogo_cache, get_catalogo_version
+from .metricas import registro as registro_metricas
+from .perfilador import perfilando, rutas_lentas
+from .pagination import decode_position, encode_position
+from .roles import get_user_roles, role_cache
+from .signals import publicar_notificacion
+from .serializers import MesasSerializer
+from .views import IsAdministrador, IsCliente
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        role_cache.clear()
+        self.user = User.objects.create_user(username='admin1', password='secreto123')
+        self.user.groups.add(Group.objects.create(name='Admin'))
+        estado = HistorialEstados.objects.create(estado=HistorialEstados.ESTADO_ENTREGADO)
+        self.pedidos = [Pedido.objects.create(estado_fk=estado, cliente_fk=self.user) for _ in range(7)]
+        # Varias filas con el mismo timestamp: el id desempata dentro del cursor
+        mismo = timezone.now() - timedelta(hours=1)
+        Pedido.objects.filter(pk__in=[pedido.pk for pedido in self.pedidos[1:5]]).update(
+            pedido_creado=mismo, estado_actualizado=mismo,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _recorrer(self, url, page_size):
+        ids = []
+        parametros = {'page_size': page_size}
+        while url is not None:
+            response = self.client.get(url, parametros)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(fila['id'] for fila in response.json()['results'])
+            url, parametros = response.json()['next'], {}
+        return ids
+
+    def test_paginas_sin_duplicados_ni_huecos(self):
+        esperados = list(Pedido.objects.order_by('-pedido_creado', '-pk').values_list('pk', flat=True))
+        for page_size in (1, 2, 3, 50):
+            with self.subTest(page_size=page_size):
+                self.assertEqual(self._recorrer('/api/pedidos/', page_size), esperados)
+
+    def test_orden_ascendente(self):
+        esperados = list(Pedido.objects.order_by('estado_actualizado', 'pk').values_list('pk', flat=True))
+        ids = self._recorrer(f'/api/pedidos/estado/{HistorialEstados.ESTADO_ENTREGADO}/', 2)
+        self.assertEqual(ids, esperados)
+        self.assertEqual(ids[:4], [pedido.pk for pedido in self.pedidos[1:5]])
+
+    def test_cursor_invalido(self):
+        self.assertEqual(decode_position(encode_position(self.pedidos[0].pedido_creado, 7)), (self.pedidos[0].pedido_creado, 7))
+        for cursor in (
+            'no es base64!', 'Zm9v', b64encode(b'sin separador').decode(), b64encode(b'fecha|1').decode(),
+            b64encode(b'2024-01-01T00:00:00+00:00|abc').decode(), b64encode('2024-01-01T00:00:00+00:00|9'.encode() + b'9' * 30).decode(),
+            'w6k=',
+        ):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.client.get('/api/pedidos/', {'cursor': cursor}).status_code, 404)
+
+
+class RoleCacheTests(TestCase):
+    def setUp(self):
+        role_cache.clear()
+        self.admin = Group.objects.create(name='Admin')
+        self.cliente = Group.objects.create(name='Cliente')
+        self.user = User.objects.create_user(username='cliente1', password='secreto123')
+        self.user.groups.add(self.cliente)
+        role_cache.clear()
+
+    def _request(self):
+        request = APIRequestFactory().get('/api/menu/')
+        force_authenticate(request, user=self.user)
+        request = Request(request)
+        request.user  # Autenticar antes de contar consultas
+        return request
+
+    def test_permisos_combinados_una_sola_consulta_por_peticion(self):
+        # Sin caché, IsAdministrador | IsCliente hacía una consulta por permiso
+        request = self._request()
+        with self.assertNumQueries(1):
+            self.assertFalse(IsAdministrador().has_permission(request, None))
+            self.assertTrue(IsCliente().has_permission(request, None))
+
+    def test_peticiones_siguientes_no_consultan_la_base_de_datos(self):
+        get_user_roles(self._request())
+        request = self._request()
+        with self.assertNumQueries(0):
+            self.assertFalse(IsAdministrador().has_permission(request, None))
+            self.assertTrue(IsCliente().has_permission(request, None))
+
+    def test_cambio_de_grupos_invalida_la_cache(self):
+        self.assertEqual(get_user_roles(self._request()), {'Cliente'})
+        self.user.groups.add(self.admin)
+        self.assertEqual(get_user_roles(self._request()), {'Cliente', 'Admin'})
+        self.admin.user_set.remove(self.user)
+        self.assertEqual(get_user_roles(self._request()), {'Cliente'})
+
+    def test_vista_reduce_consultas(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        # Primera petición: consulta de roles + validadores (ETag) + listado paginado
+        with self.assertNumQueries(3):
+            self.assertEqual(client.get('/api/comentarios/').status_code, 200)
+        # Siguientes peticiones: solo validadores y listado
+        with self.assertNumQueries(2):
+            self.assertEqual(client.get('/api/comentarios/').status_code, 200)
+
+
+class FacturaTotalTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='cliente1', password='secreto123')
+        categoria = CategoriaMenu.objects.create(nombre='Platos', descripcion='Platos fuertes')
+        self.menu = Menu.objects.create(nombre='Pupusas', descripcion='Revueltas', precio=2, categoria_fk=categoria)
+        metodo = MetodoDePago.objects.create(tipo_pago='Efectivo', fecha_compra='2024-11-04', total_compra=10)
+        mesa = Mesas.objects.create(
+            numero_mesa=1, capacidad_mesa=4,
+            estado_mesa_fk=MesasEstado.objects.create(nombre_estado='disponible'),
+        )
+        self.pedido = Pedido.objects.create(estado_fk=HistorialEstados.objects.create(), cliente_fk=self.user)
+        self.factura = Factura.objects.create(metodo_pago_fk=metodo, mesa_fk=mesa, cliente_fk=self.user)
+        self.otra = Factura.objects.create(metodo_pago_fk=metodo, mesa_fk=mesa, cliente_fk=self.user)
+
+    def _detalle(self, total, factura):
+        return DetallePedido.objects.create(
+            cantidad=1, subtotal=total, iva=0, total=total,
+            pedido_fk=self.pedido, menu_fk=self.menu, factura_fk=factura,
+        )
+
+    def _totales(self):
+        return list(Factura.objects.order_by('pk').values_list('total_factura', flat=True))
+
+    def test_totales_incrementales(self):
+        detalle = self._detalle(10, self.factura)
+        self._detalle(5, self.factura)
+        self.assertEqual(self._totales(), [Decimal('15'), Decimal('0')])
+
+        detalle.total = 20
+        detalle.save()
+        self.assertEqual(self._totales(), [Decimal('25'), Decimal('0')])
+
+        detalle.factura_fk = self.otra
+        detalle.save()
+        self.assertEqual(self._totales(), [Decimal('5'), Decimal('20')])
+
+        detalle.delete()
+        self.assertEqual(self._totales(), [Decimal('5'), Decimal('0')])
+
+    def test_editar_detalle_por_la_api(self):
+        role_cache.clear()
+        self.user.groups.add(Group.objects.create(name='Admin'))
+        client = APIClient()
+        client.force_authenticate(self.user)
+        # Montos enteros: subtotal, iva y total de DetallePedido son IntegerField
+        self.menu.precio = 100
+        self.menu.save()
+        promocion = Promocion.objects.create(
+            nombre='Mitad', descripcion='Promo', descuento=50,
+            fecha_vencimiento=timezone.now() + timedelta(days=1), menu_fk=self.menu,
+        )
+        detalle = DetallePedido.objects.create(
+            cantidad=2, subtotal=100, iva=13, total=113,
+            pedido_fk=self.pedido, menu_fk=self.menu, factura_fk=self.factura, promocion_fk=promocion,
+        )
+        url = f'/api/detallespedido/{detalle.pk}/'
+
+        # PATCH: la promoción y el resto de campos se conservan
+        response = client.patch(url, {'cantidad': 4}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual((response.json()['promocion_fk'], response.json()['total']), (promocion.pk, 226))
+        self.assertEqual(self._totales(), [Decimal('226'), Decimal('0')])
+
+        # PUT: sin promoción y a la otra factura
+        response = client.put(url, {
+            'cantidad': 3, 'pedido_fk': self.pedido.pk, 'menu_fk': self.menu.pk,
+            'factura_fk': self.otra.pk, 'promocion_fk': None,
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['total'], 339)
+        self.assertEqual(self._totales(), [Decimal('0'), Decimal('339')])
+
+    def test_precio_no_entero_coincide_con_la_reconciliacion(self):
+        role_cache.clear()
+        self.user.groups.add(Group.objects.create(name='Admin'))
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.menu.precio = Decimal('2.50')
+        self.menu.save()
+        response = client.post('/api/detallespedido/', {
+            'cantidad': 1, 'pedido_fk': self.pedido.pk, 'menu_fk': self.menu.pk, 'factura_fk': self.factura.pk,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        detalle = DetallePedido.objects.get(pk=response.json()['id'])
+        # 2.50 + 0.33 de IVA se guardan como enteros; la factura suma lo guardado
+        self.assertEqual((detalle.subtotal, detalle.iva, detalle.total), (2, 0, 2))
+        self.assertEqual(self._totales(), [Decimal('2'), Decimal('0')])
+
+        # Un total Decimal asignado a mano también se suma como se guarda
+        detalle.total = Decimal('7.90')
+        detalle.save()
+        self.assertEqual(self._totales(), [Decimal('7'), Decimal('0')])
+        detalle.delete()
+        self.assertEqual(self._totales(), [Decimal('0'), Decimal('0')])
+
+        self._detalle(Decimal('3.75'), self.factura)
+        incremental = self._totales()
+        call_command('recalcular_totales_factura', stdout=StringIO())
+        self.assertEqual(self._totales(), incremental)
+
+    def test_comando_de_reconciliacion(self):
+        self._detalle(10, self.factura)
+        Factura.objects.update(total_factura=99)
+        call_command('recalcular_totales_factura', stdout=StringIO())
+        self.assertEqual(self._totales(), [Decimal('10'), Decimal('0')])
+
+
+class PedidoCompletoTests(TestCase):
+    def setUp(self):
+        role_cache.clear()
+        self.user = User.objects.create_user(username='cliente1', password='secreto123')
+        self.user.groups.add(Group.objects.create(name='Cliente'))
+        categoria = CategoriaMenu.objects.create(nombre='Platos', descripcion='Platos fuertes')
+        self.menus = [
+            Menu.objects.create(nombre=f'Plato {i}', descripcion='Plato', precio=10, categoria_fk=categoria)
+            for i in range(10)
+        ]
+        self.promocion = Promocion.objects.create(
+            nombre='Dos por uno', descripcion='Promo', descuento=50,
+            fecha_vencimiento=timezone.now() + timedelta(days=1), menu_fk=self.menus[0],
+        )
+        self.estado = HistorialEstados.objects.create()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _pedido(self, lineas):
+        return self.client.post('/api/pedidos/completo/', {
+            'estado_fk': self.estado.pk, 'cliente_fk': self.user.pk, 'lineas': lineas,
+        }, format='json')
+
+    def test_crea_pedido_y_lineas(self):
+        response = self._pedido([
+            {'menu_fk': self.menus[0].pk, 'cantidad': 2, 'promocion_fk': self.promocion.pk},
+            {'menu_fk': self.menus[1].pk, 'cantidad': 1},
+        ])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['lineas']), 2)
+        detalles = DetallePedido.objects.filter(pedido_fk=response.data['id']).order_by('menu_fk')
+        self.assertEqual([d.subtotal for d in detalles], [10, 10])
+
+    def test_consultas_no_crecen_con_las_lineas(self):
+        self._pedido([{'menu_fk': self.menus[0].pk}])
+        with CaptureQueriesContext(connection) as una_linea:
+            self._pedido([{'menu_fk': self.menus[0].pk}])
+        with CaptureQueriesContext(connection) as diez_lineas:
+            self._pedido([{'menu_fk': menu.pk} for menu in self.menus])
+        self.assertEqual(len(una_linea), len(diez_lineas))
+
+    def test_errores_por_linea_sin_crear_nada(self):
+        response = self._pedido([
+            {'menu_fk': self.menus[0].pk},
+            {'menu_fk': 9999},
+            {'menu_fk': self.menus[1].pk, 'promocion_fk': self.promocion.pk},
+        ])
+        self.assertEqual(response.status_code, 400)
+        errores = response.data['lineas']
+        self.assertEqual(errores[0], {})
+        self.assertIn('menu_fk', errores[1])
+        self.assertIn('promocion_fk', errores[2])
+        self.assertFalse(Pedido.objects.exists())
+
+
+class CatalogoCacheTests(TestCase):
+    def setUp(self):
+        role_cache.clear()
+        catalogo_cache().clear()
+        self.user = User.objects.create_user(username='cliente1', password='secreto123')
+        self.user.groups.add(Group.objects.create(name='Cliente'))
+        self.categoria = CategoriaMenu.objects.create(nombre='Platos', descripcion='Platos fuertes')
+        Menu.objects.create(nombre='Pupusas', descripcion='Revueltas', precio=2, categoria_fk=self.categoria)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_lecturas_repetidas_sin_consultas(self):
+        primera = self.client.get('/api/menu/')
+        with self.assertNumQueries(0):
+            segunda = self.client.get('/api/menu/')
+        self.assertEqual(primera.content, segunda.content)
+
+    def test_guardar_menu_invalida_el_catalogo(self):
+        self.client.get('/api/menu/')
+        version = get_catalogo_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            Menu.objects.create(nombre='Tamales', descripcion='De pollo', precio=1, categoria_fk=self.categoria)
+            # La versión cambia al confirmar la transacción, no antes
+            self.assertEqual(get_catalogo_version(), version)
+        self.assertNotEqual(get_catalogo_version(), version)
+        response = self.client.get('/api/menu/')
+        self.assertEqual(len(response.json()['results']), 2)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        role_cache.clear()
+        catalogo_cache().clear()
+        self.user = User.objects.create_user(username='admin1', password='secreto123')
+        self.user.groups.add(Group.objects.create(name='Admin'))
+        self.pedido = Pedido.objects.create(estado_fk=HistorialEstados.objects.create(), cliente_fk=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        # Calentar la caché de roles para contar solo las consultas de la vista
+        self.client.get('/api/pedidos/')
+
+    def test_listado_304_sin_serializar(self):
+        etag = self.client.get('/api/pedidos/')['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/pedidos/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        Pedido.objects.create(estado_fk=self.pedido.estado_fk, cliente_fk=self.user)
+        self.assertEqual(self.client.get('/api/pedidos/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_listado_solo_con_etag_de_la_pagina(self):
+        pedidos = [Pedido.objects.create(estado_fk=self.pedido.estado_fk, cliente_fk=self.user) for _ in range(3)]
+        response = self.client.get('/api/pedidos/', {'page_size': 2})
+        self.assertNotIn('Last-Modified', response)
+        etag = response['ETag']
+
+        # Borrar una fila que no es la más reciente cambia el ETag de la página
+        Pedido.objects.filter(pk=pedidos[1].pk).delete()
+        self.assertEqual(self.client.get('/api/pedidos/', {'page_size': 2}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        # Los validadores leen solo las filas de la página, no todo el listado
+        with CaptureQueriesContext(connection) as capturadas:
+            self.client.get('/api/pedidos/', {'page_size': 2})
+        validadores = capturadas.captured_queries[0]['sql']
+        self.assertIn('LIMIT 3', validadores)
+        self.assertNotIn('COUNT(', validadores)
+
+    def test_detalle_304_y_cambio(self):
+        url = f'/api/pedidos/{self.pedido.pk}/'
+        response = self.client.get(url)
+        self.assertIn('Last-Modified', response)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        Pedido.objects.filter(pk=self.pedido.pk).update(pedido_actualizado=timezone.now() + timedelta(minutes=1))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+    def test_nuevo_detalle_invalida_etag_de_factura(self):
+        metodo = MetodoDePago.objects.create(tipo_pago='Efectivo', fecha_compra='2024-11-04', total_compra=10)
+        mesa = Mesas.objects.create(
+            numero_mesa=1, capacidad_mesa=4,
+            estado_mesa_fk=MesasEstado.objects.create(nombre_estado='disponible'),
+        )
+        factura = Factura.objects.create(metodo_pago_fk=metodo, mesa_fk=mesa, cliente_fk=self.user)
+        menu = Menu.objects.create(
+            nombre='Pupusas', descripcion='Revueltas', precio=2,
+            categoria_fk=CategoriaMenu.objects.create(nombre='Platos', descripcion='Platos fuertes'),
+        )
+        url = f'/api/facturas/{factura.pk}/'
+        etag_detalle = self.client.get(url)['ETag']
+        etag_listado = self.client.get('/api/facturas/')['ETag']
+
+        DetallePedido.objects.create(
+            cantidad=1, subtotal=50, iva=0, total=50,
+            pedido_fk=self.pedido, menu_fk=menu, factura_fk=factura,
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag_detalle)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Decimal(str(response.json()['total_factura'])), Decimal('50'))
+        self.assertEqual(self.client.get('/api/facturas/', HTTP_IF_NONE_MATCH=etag_listado).status_code, 200)
+
+    def test_catalogo_304_sin_consultas(self):
+        etag = self.client.get('/api/menu/')['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/menu/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+class IndexPlanTests(TestCase):
+    # Verifica que el plan de ejecución use los índices compuestos de la migración 0003
+    def setUp(self):
+        self.user = User.objects.create_user(username='cliente1', password='secreto123')
+
+    def assertUsaIndice(self, queryset, indice):
+        plan = queryset.explain()
+        self.assertIn(indice, plan, plan)
+
+    def test_pedidos_por_cliente(self):
+        queryset = Pedido.objects.filter(cliente_fk=self.user.pk).order_by('-pedido_creado', '-pk')
+        self.assertUsaIndice(queryset, 'pedido_cliente_creado_idx')
+
+    def test_comentarios_por_cliente(self):
+        queryset = Comentarios.objects.filter(cliente_fk=self.user.pk).order_by('-comentario_creado', '-pk')
+        self.assertUsaIndice(queryset, 'comentario_cliente_creado_idx')
+
+    def test_notificaciones_no_leidas(self):
+        queryset = Notificaciones.objects.filter(cliente_fk=self.user.pk).no_leidas()
+        self.assertUsaIndice(queryset, 'notificacion_cliente_leido_idx')
+
+    def test_promociones_vigentes(self):
+        queryset = Promocion.objects.filter(menu_fk=1, fecha_vencimiento__gt=timezone.now())
+        self.assertUsaIndice(queryset, 'promocion_menu_vence_idx')
+
+    def test_pedidos_por_estado(self):
+        queryset = Pedido.objects.filter(estado_actual='enviado').order_by('estado_actualizado', 'pk')
+        self.assertUsaIndice(queryset, 'pedido_estado_idx')
+
+    def test_reservas_por_mesa_y_fecha(self):
+        ahora = timezone.now()
+        queryset = Reserva.objects.filter(mesa_fk=1, fecha_reserva__range=(ahora, ahora + timedelta(hours=2)))
+        self.assertUsaIndice(queryset, 'reserva_mesa_fecha_idx')
+
+
+class MesasUnicidadTests(TestCase):
+    def setUp(self):
+        role_cache.clear()
+        self.user = User.objects.create_user(username='admin1', password='secreto123')
+        self.user.groups.add(Group.objects.create(name='Admin'))
+        self.estado = MesasEstado.objects.create(nombre_estado='disponible')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_numero_mesa_duplicado(self):
+        datos = {'numero_mesa': 7, 'capacidad_mesa': 4, 'estado_mesa_fk': self.estado.pk}
+        self.assertEqual(self.client.post('/api/mesas/', datos).status_code, 201)
+        response = self.client.post('/api/mesas/', datos)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('numero_mesa', response.data)
+        self.assertEqual(Mesas.objects.count(), 1)
+
+    def test_otros_errores_de_integridad_no_se_traducen(self):
+        serializer = MesasSerializer(data={'numero_mesa': 8, 'capacidad_mesa': 4, 'estado_mesa_fk': self.estado.pk})
+        self.assertTrue(serializer.is_valid())
+        # NOT NULL en estado_mesa_fk: no es un número de mesa repetido
+        with self.assertRaises(IntegrityError):
+            serializer.save(estado_mesa_fk=None)
+
+
+class MesasDisponiblesTests(TestCase):
+    def setUp(self):
+        role_cache.clear()
+        self.user = User.objects.create_user(username='cliente1', password='secreto123')
+        self.user.groups.add(Group.objects.create(name='Cliente'))
+        estado = MesasEstado.objects.create(nombre_estado='disponible')
+        self.mesas = {
+            capacidad: Mesas.objects.create(numero_mesa=capacidad, capacidad_mesa=capacidad, estado_mesa_fk=estado)
+            for capacidad in (2, 4, 6, 8)
+        }
+        metodo = MetodoDePago.objects.create(tipo_pago='Efectivo', fecha_compra='2024-11-04', total_compra=10)
+        self.inicio = (timezone.now() + timedelta(days=1)).replace(hour=20, minute=0, second=0, microsecond=0)
+        # La mesa de 4 ya está reservada a las 19:00 (ocupada hasta las 21:00)
+        Reserva.objects.create(
+            mesa_fk=self.mesas[4], metodo_pago_fk=metodo, cliente_fk=self.user,
+            fecha_reserva=self.inicio - timedelta(hours=1),
+        )
+        # La mesa de 6 tiene una reserva a las 22:00, fuera de la ventana
+        Reserva.objects.create(
+            mesa_fk=self.mesas[6], metodo_pago_fk=metodo, cliente_fk=self.user,
+            fecha_reserva=self.inicio + timedelta(hours=2),
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_mesas_libres_ordenadas_por_ajuste(self):
+        response = self.client.get('/api/mesas/disponibles/', {
+            'personas': 3,
+            'desde': self.inicio.isoformat(),
+            'hasta': (self.inicio + timedelta(hours=2)).isoformat(),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([mesa['capacidad_mesa'] for mesa in response.data], [6, 8])
+        self.assertEqual(response.data[0]['holgura'], 3)
+
+    def test_ventana_invalida(self):
+        response = self.client.get('/api/mesas/disponibles/', {
+            'personas': 3, 'desde': self.inicio.isoformat(), 'hasta': self.inicio.isoformat(),
+        })
+        self.assertEqual(response.status_code, 400)
+
+        # Duraciones o fechas fuera de rango: 400, no un OverflowError
+        ventana = {'personas': 3, 'desde': self.inicio.isoformat(), 'hasta': (self.inicio + timedelta(hours=1)).isoformat()}
+        response = self.client.get('/api/mesas/disponibles/', {**ventana, 'duracion': 1000000000000})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('duracion', response.data)
+        response = self.client.get('/api/mesas/disponibles/', {
+            'personas': 3, 'desde': '0001-01-01T00:00:00Z', 'hasta': '0001-01-01T05:00:00Z',
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('desde', response.data)
+
+
+def _reservas_serializadas():
+    # select_for_update bloquea la fila en MySQL/PostgreSQL; en SQLite el mismo efecto se
+    # obtiene con transacciones IMMEDIATE sobre una base de datos en archivo.
+    if connection.features.has_select_for_update:
+        return True
+    return (
+        connection.vendor == 'sqlite'
+        and not connection.is_in_memory_db()
+        and connection.settings_dict['OPTIONS'].get('transaction_mode') == 'IMMEDIATE'
+    )
+
+
+@skipUnless(_reservas_serializadas(), 'La base de datos no puede serializar reservas concurrentes.')
+class ReservaConcurrenciaTests(TransactionTestCase):
+    HILOS_POR_MESA = 8
+
+    def setUp(self):
+        role_cache.clear()
+        self.user = User.objects.create_user(username='cliente1', password='secreto123')
+        self.user.groups.add(Group.objects.create(name='Cliente'))
+        estado = MesasEstado.objects.create(nombre_estado='disponible')
+        self.mesas = [
+            Mesas.objects.create(numero_mesa=numero, capacidad_mesa=4, estado_mesa_fk=estado)
+            for numero in range(1, 6)
+        ]
+        self.metodo = MetodoDePago.objects.create(tipo_pago='Efectivo', fecha_compra='2024-11-04', total_compra=10)
+        self.fecha = timezone.now() + timedelta(days=1)
+
+    def _reservar(self, mesa, fecha, resultados):
+        try:
+            client = APIClient()
+            client.force_authenticate(self.user)
+            response = client.post('/api/reservas/', {
+                'mesa_fk': mesa.pk, 'metodo_pago_fk': self.metodo.pk,
+                'cliente_fk': self.user.pk, 'fecha_reserva': fecha.isoformat(),
+            })
+            resultados.append(response.status_code)
+        finally:
+            connection.close()
+
+    def _en_paralelo(self, tareas):
+        resultados = []
+        hilos = [threading.Thread(target=self._reservar, args=(*tarea, resultados)) for tarea in tareas]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        return resultados, time.perf_counter() - inicio
+
+    def test_sin_dobles_reservas(self):
+        # Varios hilos compiten por el mismo horario de cada mesa
+        tareas = [(mesa, self.fecha) for mesa in self.mesas for _ in range(self.HILOS_POR_MESA)]
+        resultados, _ = self._en_paralelo(tareas)
+
+        self.assertEqual(resultados.count(201), len(self.mesas))
+        self.assertEqual(resultados.count(400), len(tareas) - len(self.mesas))
+        for mesa in self.mesas:
+            self.assertEqual(Reserva.objects.filter(mesa_fk=mesa).count(), 1)
+
+    def test_horarios_distintos_no_se_bloquean(self):
+        # Reservas sin cruce (en otras mesas u otros horarios) deben completarse todas
+        tareas = [
+            (mesa, self.fecha + timedelta(hours=3 * turno))
+            for mesa in self.mesas for turno in range(4)
+        ]
+        resultados, segundos = self._en_paralelo(tareas)
+
+        self.assertEqual(resultados, [201] * len(tareas))
+        self.assertEqual(Reserva.objects.count(), len(tareas))
+        self.assertGreater(len(tareas) / segundos, 1)
+
+
+class ReservaBloqueoTests(TestCase):
+    # Versión determinista de ReservaConcurrenciaTests, que corre en cualquier base de datos
+    def setUp(self):
+        role_cache.clear()
+        self.user = User.objects.create_user(username='cliente1', password='secreto123')
+        self.user.groups.add(Group.objects.create(name='Cliente'))
+        estado = MesasEstado.objects.create(nombre_estado='disponible')
+        self.mesas = [
+            Mesas.objects.create(numero_mesa=numero, capacidad_mesa=4, estado_mesa_fk=estado)
+            for numero in range(1, 3)
+        ]
+        self.metodo = MetodoDePago.objects.create(tipo_pago='Efectivo', fecha_compra='2024-11-04', total_compra=10)
+        self.fecha = timezone.now() + timedelta(days=1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.client.get('/api/reservas/')
+
+    def _reservar(self, mesa, fecha):
+        return self.client.post('/api/reservas/', {
+            'mesa_fk': mesa.pk, 'metodo_pago_fk': self.metodo.pk,
+            'cliente_fk': self.user.pk, 'fecha_reserva': fecha.isoformat(),
+        })
+
+    def test_bloquea_solo_la_mesa_antes_de_comprobar_el_cruce(self):
+        with CaptureQueriesContext(connection) as capturadas:
+            self.assertEqual(self._reservar(self.mesas[0], self.fecha).status_code, 201)
+        sqls = [consulta['sql'].replace('`', '"') for consulta in capturadas.captured_queries]
+        # El bloqueo lee solo el id de la mesa (.only('pk')), a diferencia de la validación de mesa_fk
+        bloqueo = next(i for i, sql in enumerate(sqls) if sql.startswith('SELECT "api_mesas"."id" FROM "api_mesas"'))
+        cruce = next(i for i, sql in enumerate(sqls) if sql.startswith('SELECT') and 'FROM "api_reserva"' in sql)
+        insercion = next(i for i, sql in enumerate(sqls) if sql.startswith('INSERT') and '"api_reserva"' in sql)
+        self.assertLess(bloqueo, cruce)
+        self.assertLess(cruce, insercion)
+
+        bloqueos = [sql for sql in sqls if 'FOR UPDATE' in sql]
+        if connection.features.has_select_for_update:
+            self.assertEqual(bloqueos, [sqls[bloqueo]])
+        else:
+            self.assertEqual(bloqueos, [])
+
+    def test_reservas_cruzadas_se_rechazan(self):
+        self.assertEqual(self._reservar(self.mesas[0], self.fecha).status_code, 201)
+        response = self._reservar(self.mesas[0], self.fecha + timedelta(minutes=30))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('fecha_reserva', response.data)
+        # Otra mesa u otro horario sí se pueden reservar
+        self.assertEqual(self._reservar(self.mesas[1], self.fecha).status_code, 201)
+        duracion = timedelta(minutes=settings.RESERVA_DURACION_MINUTOS)
+        self.assertEqual(self._reservar(self.mesas[0], self.fecha + duracion).status_code, 201)
+        self.assertEqual(Reserva.objects.count(), 3)
+
+
+class AsyncViewsTests(TestCase):
+    def setUp(self):
+        role_cache.clear()
+        catalogo_cache().clear()
+        grupo = Group.objects.create(name='Cliente')
+        self.user = User.objects.create_user(username='cliente1', password='secreto123')
+        self.user.groups.add(grupo)
+        self.otro = User.objects.create_user(username='cliente2', password='secreto123')
+        self.otro.groups.add(grupo)
+        categoria = CategoriaMenu.objects.create(nombre='Platos', descripcion='Platos fuertes')
+        for i in range(3):
+            Menu.objects.create(nombre=f'Plato {i}', descripcion='Plato', precio='10.50', categoria_fk=categoria)
+        Notificaciones.objects.create(mensaje='Para mí', leido=False, cliente_fk=self.user)
+        Notificaciones.objects.create(mensaje='Para otro', leido=False, cliente_fk=self.otro)
+        token = RefreshToken.for_user(self.user).access_token
+        self.headers = {'Authorization': f'Bearer {token}'}
+
+    async def _get(self, url, autenticado=True):
+        return await AsyncClient().get(url, headers=self.headers if autenticado else None)
+
+    async def test_menu_igual_que_la_vista_sincrona(self):
+        sincrona = (await self._get('/api/menu/?page_size=2')).json()
+        asincrona = (await self._get('/api/async/menu/?page_size=2')).json()
+        self.assertEqual(asincrona['results'], sincrona['results'])
+
+        siguiente = await self._get(asincrona['next'])
+        self.assertEqual(len(siguiente.json()['results']), 1)
+        self.assertIsNone(siguiente.json()['next'])
+
+    async def test_notificaciones_propias(self):
+        response = await self._get('/api/async/notificaciones/')
+        self.assertEqual([n['mensaje'] for n in response.json()['results']], ['Para mí'])
+
+    async def test_permisos_y_autenticacion(self):
+        self.assertEqual((await self._get(f'/api/async/pedidos/cliente/{self.user.pk}/')).status_code, 200)
+        self.assertEqual((await self._get(f'/api/async/pedidos/cliente/{self.otro.pk}/')).status_code, 403)
+        self.assertEqual((await self._get('/api/async/mesas/')).status_code, 403)
+        self.assertEqual((await self._get('/api/async/menu/', autenticado=False)).status_code, 401)
+        self.assertEqual((await self._get('/api/async/menu/999/')).status_code, 404)
+
+
+class NotificacionesStreamTests(TestCase):
+    def setUp(self):
+        role_cache.clear()
+        self.user = User.objects.create_user(username='cliente1', password='secreto123')
+        self.user.groups.add(Group.objects.create(name='Cliente'))
+        self.vista = Notificaciones.objects.create(mensaje='Vista', leido=False, cliente_fk=self.user)
+        self.pendiente = Notificaciones.objects.create(mensaje='Pendiente', leido=False, cliente_fk=self.user)
+        Notificaciones.objects.create(mensaje='Leída', leido=True, cliente_fk=self.user)
+        token = RefreshToken.for_user(self.user).access_token
+        self.headers = {'Authorization': f'Bearer {token}', 'Last-Event-ID': str(self.vista.pk)}
+
+    def _crear_notificacion(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Notificaciones.objects.create(mensaje='Nueva', leido=False, cliente_fk=self.user)
+
+    async def test_reenvio_y_eventos_nuevos(self):
+        response = await AsyncClient().get('/api/async/notificaciones/stream/', headers=self.headers)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        eventos = response.streaming_content
+        try:
+            # Solo se reenvían las no leídas posteriores a Last-Event-ID
+            primero = (await anext(eventos)).decode()
+            self.assertTrue(primero.startswith(f'id: {self.pendiente.pk}\n'))
+
+            nueva = await sync_to_async(self._crear_notificacion)()
+            segundo = (await anext(eventos)).decode()
+            self.assertTrue(segundo.startswith(f'id: {nueva.pk}\n'))
+            self.assertIn('"mensaje": "Nueva"', segundo)
+        finally:
+            await eventos.aclose()
+
+    def _publicar_tarde(self, notificacion):
+        # Una notificación con id menor que otra ya enviada, confirmada después que ella
+        with self.captureOnCommitCallbacks(execute=True):
+            publicar_notificacion(notificacion)
+
+    async def test_reenvio_completo_por_paginas_y_confirmaciones_tardias(self):
+        extra = await sync_to_async(Notificaciones.objects.create)(mensaje='Otra', leido=False, cliente_fk=self.user)
+        max_reenvio = AsyncNotificacionesStream.max_reenvio
+        AsyncNotificacionesStream.max_reenvio = 1
+        try:
+            response = await AsyncClient().get('/api/async/notificaciones/stream/', headers=self.headers)
+            eventos = response.streaming_content
+            try:
+                # Más pendientes que max_reenvio: se reenvían todas, una consulta por página
+                ids = [(await anext(eventos)).decode().split('\n')[0] for _ in range(2)]
+                self.assertEqual(ids, [f'id: {self.pendiente.pk}', f'id: {extra.pk}'])
+
+                # Un id anterior al último enviado también se entrega
+                await sync_to_async(self._publicar_tarde)(self.vista)
+                tardia = (await anext(eventos)).decode()
+                self.assertTrue(tardia.startswith(f'id: {self.vista.pk}\n'))
+            finally:
+                await eventos.aclose()
+        finally:
+            AsyncNotificacionesStream.max_reenvio = max_reenvio
+
+    def test_marcar_leidas_en_un_update(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        # Roles ya en caché para contar solo la consulta de la vista
+        role_cache.set(self.user.pk, frozenset(['Cliente']))
+
+        with self.assertNumQueries(1):
+            response = client.post('/api/notificaciones/marcar-leidas/', {'hasta_id': self.pendiente.pk})
+        self.assertEqual(response.data, {'actualizadas': 2})
+        self.assertFalse(Notificaciones.objects.filter(cliente_fk=self.user).no_leidas().exists())
+
+
+class NotificacionesFanOutTests(TestCase):
+    def setUp(self):
+        role_cache.clear()
+        cliente = Group.objects.create(name='Cliente')
+        self.clientes = [User.objects.create_user(username=f'cliente{i}', password='secreto123') for i in range(5)]
+        for user in self.clientes:
+            user.groups.add(cliente)
+        self.admin = User.objects.create_user(username='admin1', password='secreto123')
+        self.admin.groups.add(Group.objects.create(name='Admin'))
+        categoria = CategoriaMenu.objects.create(nombre='Platos', descripcion='Platos fuertes')
+        self.menu = Menu.objects.create(nombre='Pupusas', descripcion='Revueltas', precio=2, categoria_fk=categoria)
+        pedido = Pedido.objects.create(estado_fk=HistorialEstados.objects.create(), cliente_fk=self.clientes[0])
+        DetallePedido.objects.create(
+            cantidad=1, subtotal=2, iva=0, total=2, pedido_fk=pedido, menu_fk=self.menu,
+        )
+
+    def test_todos_los_clientes_por_lotes(self):
+        salida = StringIO()
+        call_command('enviar_notificaciones', 'Promo de temporada', '--lote', '2', stdout=salida)
+        self.assertIn('5 notificaciones creadas', salida.getvalue())
+        self.assertEqual(
+            set(Notificaciones.objects.values_list('cliente_fk', flat=True)),
+            {user.pk for user in self.clientes},
+        )
+
+    def test_lote_invalido(self):
+        for lote in ('0', '-1'):
+            with self.assertRaises(CommandError):
+                call_command('enviar_notificaciones', 'Promo de temporada', '--lote', lote, stdout=StringIO())
+        self.assertFalse(Notificaciones.objects.exists())
+
+    def test_quienes_pidieron_un_menu(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.post('/api/notificaciones/fan-out/', {
+            'mensaje': 'Nuevo sabor', 'destino': 'menu', 'menu_fk': self.menu.pk,
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['filas'], 1)
+        self.assertEqual(list(Notificaciones.objects.values_list('cliente_fk', flat=True)), [self.clientes[0].pk])
+
+
+class EstadosPedidoTests(TestCase):
+    def setUp(self):
+        role_cache.clear()
+        self.admin = User.objects.create_user(username='admin1', password='secreto123')
+        self.admin.groups.add(Group.objects.create(name='Admin'))
+        self.preparacion = HistorialEstados.objects.create()
+        self.pedidos = [
+            Pedido.objects.create(estado_fk=self.preparacion, cliente_fk=self.admin) for _ in range(3)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_evento_inicial_al_crear(self):
+        self.assertEqual(self.pedidos[0].estado_actual, 'preparación')
+        self.assertEqual(
+            list(EventoEstadoPedido.objects.filter(pedido_fk=self.pedidos[0]).values_list('estado', flat=True)),
+            ['preparación'],
+        )
+
+    def test_editar_historial_compartido_no_mueve_pedidos(self):
+        self.preparacion.estado = 'entregado'
+        self.preparacion.save()
+        self.assertEqual(set(Pedido.objects.values_list('estado_actual', flat=True)), {'preparación'})
+
+    def test_transicion_en_lote(self):
+        ids = [pedido.pk for pedido in self.pedidos[:2]]
+        response = self.client.post('/api/pedidos/estado/', {'pedidos': ids + [9999], 'estado': 'enviado'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'actualizados': ids, 'omitidos': [9999]})
+        # Repetir la transición no duplica eventos
+        response = self.client.post('/api/pedidos/estado/', {'pedidos': ids, 'estado': 'enviado'}, format='json')
+        self.assertEqual(response.data['actualizados'], [])
+        self.assertEqual(EventoEstadoPedido.objects.filter(estado='enviado').count(), 2)
+
+        response = self.client.get(f'/api/pedidos/{ids[0]}/estados/')
+        self.assertEqual([evento['estado'] for evento in response.data['results']], ['enviado', 'preparación'])
+
+    def test_tablero_del_mas_antiguo_al_mas_reciente(self):
+        self.client.post('/api/pedidos/estado/', {'pedidos': [self.pedidos[2].pk], 'estado': 'enviado'}, format='json')
+        self.client.post('/api/pedidos/estado/', {'pedidos': [self.pedidos[0].pk], 'estado': 'enviado'}, format='json')
+        response = self.client.get('/api/pedidos/estado/enviado/', {'page_size': 1})
+        self.assertEqual([pedido['id'] for pedido in response.data['results']], [self.pedidos[2].pk])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([pedido['id'] for pedido in response.data['results']], [self.pedidos[0].pk])
+        self.assertIsNone(response.data['next'])
+
+
+@override_settings(VENTAS_RESUMEN_RETRASO=0)
+class ResumenVentasTests(TestCase):
+    def setUp(self):
+        role_cache.clear()
+        self.admin = User.objects.create_user(username='admin1', password='secreto123')
+        self.admin.groups.add(Group.objects.create(name='Admin'))
+        categoria = CategoriaMenu.objects.create(nombre='Platos', descripcion='Platos fuertes')
+        self.pupusas = Menu.objects.create(nombre='Pupusas', descripcion='Revueltas', precio=2, categoria_fk=categoria)
+        self.tamales = Menu.objects.create(nombre='Tamales', descripcion='De pollo', precio=3, categoria_fk=categoria)
+        mesa = Mesas.objects.create(
+            numero_mesa=1, capacidad_mesa=4,
+            estado_mesa_fk=MesasEstado.objects.create(nombre_estado='disponible'),
+        )
+        metodo = MetodoDePago.objects.create(tipo_pago='Tarjeta', fecha_compra='2024-11-04', total_compra=10)
+        self.factura = Factura.objects.create(metodo_pago_fk=metodo, mesa_fk=mesa, cliente_fk=self.admin)
+        self.pedido = Pedido.objects.create(estado_fk=HistorialEstados.objects.create(), cliente_fk=self.admin)
+        self.ayer = timezone.now().replace(hour=10, minute=30) - timedelta(days=2)
+
+    def _detalle(self, menu, cantidad, creado, factura=None):
+        detalle = DetallePedido.objects.create(
+            cantidad=cantidad, subtotal=cantidad * 10, iva=cantidad, total=cantidad * 11,
+            pedido_fk=self.pedido, menu_fk=menu, factura_fk=factura,
+        )
+        DetallePedido.objects.filter(pk=detalle.pk).update(detalle_pedido_creado=creado)
+        detalle.refresh_from_db()
+        return detalle
+
+    def _resumen(self, periodo, dimension):
+        return {
+            (fila.clave, fila.inicio): (fila.cantidad, fila.total)
+            for fila in ResumenVentas.objects.filter(periodo=periodo, dimension=dimension)
+        }
+
+    def test_actualizacion_incremental(self):
+        self._detalle(self.pupusas, 2, self.ayer)
+        detalle = self._detalle(self.pupusas, 1, self.ayer + timedelta(hours=1))
+        self._detalle(self.tamales, 3, self.ayer, factura=self.factura)
+        call_command('actualizar_resumen_ventas', stdout=StringIO())
+
+        hora = self.ayer.replace(minute=0, second=0, microsecond=0)
+        dia = hora.replace(hour=0)
+        self.assertEqual(self._resumen('hora', 'menu'), {
+            (str(self.pupusas.pk), hora): (2, 22),
+            (str(self.pupusas.pk), hora + timedelta(hours=1)): (1, 11),
+            (str(self.tamales.pk), hora): (3, 33),
+        })
+        self.assertEqual(self._resumen('dia', 'categoria'), {(str(self.pupusas.categoria_fk_id), dia): (6, 66)})
+        self.assertEqual(self._resumen('dia', 'tipo_pago'), {('Tarjeta', dia): (3, 33)})
+
+        # Facturar un detalle ya resumido lo lleva al resumen por tipo de pago
+        detalle.factura_fk = self.factura
+        detalle.save()
+        salida = StringIO()
+        call_command('actualizar_resumen_ventas', stdout=salida)
+        self.assertIn('1 detalles', salida.getvalue())
+        self.assertEqual(self._resumen('dia', 'tipo_pago'), {('Tarjeta', dia): (4, 44)})
+        self.assertEqual(self._resumen('dia', 'menu')[(str(self.pupusas.pk), dia)], (3, 33))
+
+    def test_reconstruccion_igual_a_incremental(self):
+        for horas in range(0, 30, 5):
+            self._detalle(self.pupusas, 1, self.ayer - timedelta(hours=horas), factura=self.factura)
+        call_command('actualizar_resumen_ventas', stdout=StringIO())
+        incremental = list(ResumenVentas.objects.order_by('periodo', 'dimension', 'clave', 'inicio').values_list(
+            'periodo', 'dimension', 'clave', 'inicio', 'lineas', 'total',
+        ))
+        ResumenVentas.objects.all().delete()
+        call_command('reconstruir_resumen_ventas', '--horas-por-lote', '6', stdout=StringIO())
+        reconstruido = list(ResumenVentas.objects.order_by('periodo', 'dimension', 'clave', 'inicio').values_list(
+            'periodo', 'dimension', 'clave', 'inicio', 'lineas', 'total',
+        ))
+        self.assertEqual(incremental, reconstruido)
+
+    def test_reporte_lee_los_resumenes(self):
+        self._detalle(self.pupusas, 2, self.ayer)
+        call_command('actualizar_resumen_ventas', stdout=StringIO())
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        with CaptureQueriesContext(connection) as consultas:
+            response = client.get('/api/reportes/ventas/', {'dimension': 'menu'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([fila['etiqueta'] for fila in response.data['results']], ['Pupusas'])
+        self.assertFalse(any('api_detallepedido' in consulta['sql'] for consulta in consultas.captured_queries))
+        self.assertEqual(client.get('/api/reportes/ventas/').status_code, 400)
+
+
+class CalificacionesMenuTests(TestCase):
+    def setUp(self):
+        role_cache.clear()
+        catalogo_cache().clear()
+        self.user = User.objects.create_user(username='cliente1', password='secreto123')
+        self.user.groups.add(Group.objects.create(name='Cliente'))
+        categoria = CategoriaMenu.objects.create(nombre='Platos', descripcion='Platos fuertes')
+        self.pupusas = Menu.objects.create(nombre='Pupusas', descripcion='Revueltas', precio=2, categoria_fk=categoria)
+        self.tamales = Menu.objects.create(nombre='Tamales', descripcion='De pollo', precio=3, categoria_fk=categoria)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _comentar(self, menu, calificacion):
+        return Comentarios.objects.create(comentario='Rico', calificacion=calificacion, menu_fk=menu, cliente_fk=self.user)
+
+    def _resumen(self, menu):
+        menu.refresh_from_db()
+        return (
+            menu.calificaciones_total, menu.calificaciones_suma, menu.calificacion_promedio,
+            [getattr(menu, f'calificaciones_{valor}') for valor in range(1, 6)],
+        )
+
+    def test_crear_editar_y_eliminar(self):
+        self._comentar(self.pupusas, 5)
+        comentario = self._comentar(self.pupusas, 4)
+        self.assertEqual(self._resumen(self.pupusas), (2, 9, Decimal('4.50'), [0, 0, 0, 1, 1]))
+
+        comentario.calificacion = 2
+        comentario.save()
+        self.assertEqual(self._resumen(self.pupusas), (2, 7, Decimal('3.50'), [0, 1, 0, 0, 1]))
+
+        comentario.menu_fk = self.tamales
+        comentario.save()
+        self.assertEqual(self._resumen(self.pupusas), (1, 5, Decimal('5.00'), [0, 0, 0, 0, 1]))
+        self.assertEqual(self._resumen(self.tamales), (1, 2, Decimal('2.00'), [0, 1, 0, 0, 0]))
+
+        comentario.delete()
+        self.assertEqual(self._resumen(self.tamales), (0, 0, Decimal('0.00'), [0, 0, 0, 0, 0]))
+
+    def test_guardar_menu_no_pisa_las_calificaciones(self):
+        menu = Menu.objects.get(pk=self.pupusas.pk)
+        self._comentar(self.pupusas, 3)
+        menu.precio = 4
+        menu.save()
+        self.assertEqual(self._resumen(self.pupusas)[:2], (1, 3))
+
+    def test_catalogo_y_mejor_calificados(self):
+        self.client.get('/api/menu/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self._comentar(self.pupusas, 3)
+            self._comentar(self.tamales, 5)
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get('/api/menu/')
+        self.assertEqual(
+            {menu['nombre']: menu['calificacion_promedio'] for menu in response.json()['results']},
+            {'Pupusas': '3.00', 'Tamales': '5.00'},
+        )
+        self.assertFalse(any('api_comentarios' in consulta['sql'] for consulta in consultas.captured_queries))
+
+        response = self.client.get('/api/menu/mejor-calificados/', {'limite': 1})
+        self.assertEqual([menu['nombre'] for menu in response.json()], ['Tamales'])
+
+    def test_comando_de_reparacion(self):
+        self._comentar(self.pupusas, 1)
+        self._comentar(self.pupusas, 4)
+        Menu.objects.update(calificaciones_total=99, calificaciones_1=7)
+        with CaptureQueriesContext(connection) as consultas:
+            call_command('reparar_calificaciones', stdout=StringIO())
+        self.assertEqual(sum('api_comentarios' in consulta['sql'] for consulta in consultas.captured_queries), 1)
+        self.assertEqual(self._resumen(self.pupusas), (2, 5, Decimal('2.50'), [1, 0, 0, 1, 0]))
+        self.assertEqual(self._resumen(self.tamales), (0, 0, Decimal('0.00'), [0, 0, 0, 0, 0]))
+
+
+class BusquedaMenuTests(TestCase):
+    def setUp(self):
+        role_cache.clear()
+        catalogo_cache().clear()
+        self.user = User.objects.create_user(username='cliente1', password='secreto123')
+        self.user.groups.add(Group.objects.create(name='Cliente'))
+        categoria = CategoriaMenu.objects.create(nombre='Platos', descripcion='Platos fuertes')
+        self.pupusas = Menu.objects.create(nombre='Pupusas de queso', descripcion='Con loroco', precio=2, categoria_fk=categoria)
+        self.pinon = Menu.objects.create(nombre='Piñón asado', descripcion='Piña y especias', precio=3, categoria_fk=categoria)
+        self.sopa = Menu.objects.create(nombre='Sopa de gallina', descripcion='Con pupusas de queso', precio=4, categoria_fk=categoria)
+
+    def _buscar(self, backend, consulta):
+        return [menu_id for menu_id, _ in backend.buscar(consulta, 10)]
+
+    def _comprobar_backend(self, backend):
+        # Sin acentos ni mayúsculas, y por prefijo
+        self.assertEqual(self._buscar(backend, 'PINON'), [self.pinon.pk])
+        self.assertEqual(self._buscar(backend, 'pin'), [self.pinon.pk])
+        # Todos los términos deben coincidir; el nombre pesa más que la descripción
+        self.assertEqual(self._buscar(backend, 'pupu que'), [self.pupusas.pk, self.sopa.pk])
+        self.assertEqual(self._buscar(backend, 'pupusas gallina'), [self.sopa.pk])
+        self.assertEqual(self._buscar(backend, 'tamal'), [])
+
+    def test_fts5(self):
+        self._comprobar_backend(FTS5Backend())
+
+    def test_indice_invertido(self):
+        self._comprobar_backend(IndiceInvertidoBackend(ttl=300))
+
+    def test_indice_invertido_sigue_las_senales(self):
+        backend = IndiceInvertidoBackend(ttl=300)
+        backend.reconstruir()
+        self.pinon.nombre = 'Tamal de elote'
+        with self.captureOnCommitCallbacks(execute=True):
+            backend.menu_guardado(self.pinon)
+            backend.menu_eliminado(self.sopa.pk)
+        self.assertEqual(self._buscar(backend, 'tamal'), [self.pinon.pk])
+        self.assertEqual(self._buscar(backend, 'pinon'), [])
+        self.assertEqual(self._buscar(backend, 'pupusas'), [self.pupusas.pk])
+
+    def test_indice_vencido_mientras_otro_hilo_reconstruye(self):
+        backend = IndiceInvertidoBackend(ttl=0)
+        backend.reconstruir()
+        # Otro hilo está reconstruyendo: la búsqueda usa el índice anterior sin consultar Menu
+        with backend._reconstruyendo, self.assertNumQueries(0):
+            self.assertEqual(self._buscar(backend, 'pinon'), [self.pinon.pk])
+        with self.assertNumQueries(1):
+            self.assertEqual(self._buscar(backend, 'pinon'), [self.pinon.pk])
+
+    def test_endpoint_y_senales(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get('/api/menu/buscar/', {'q': 'piñ'})
+        self.assertEqual([menu['nombre'] for menu in response.json()], ['Piñón asado'])
+
+        self.pinon.nombre = 'Tamal de elote'
+        self.pinon.save()
+        self.assertEqual(client.get('/api/menu/buscar/', {'q': 'asado'}).json(), [])
+        self.assertEqual([menu['id'] for menu in client.get('/api/menu/buscar/', {'q': 'tamal'}).json()], [self.pinon.pk])
+        self.assertEqual(client.get('/api/menu/buscar/').status_code, 400)
+
+
+@override_settings(METRICAS_MUESTREO=1.0)
+class MetricasTests(TestCase):
+    def setUp(self):
+        role_cache.clear()
+        registro_metricas.limpiar()
+        self.admin = User.objects.create_user(username='admin1', password='secreto123')
+        self.admin.groups.add(Group.objects.create(name='Admin'))
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_server_timing(self):
+        response = self.client.get('/api/pedidos/')
+        fases = dict(parte.split(';', 1)[0:2] for parte in response['Server-Timing'].split(', '))
+        self.assertEqual(set(fases), {'db', 'serializacion', 'vista', 'render', 'total'})
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="\d+ consultas"')
+
+    def test_sin_muestreo_no_instrumenta(self):
+        with override_settings(METRICAS_MUESTREO=0):
+            response = self.client.get('/api/pedidos/')
+        self.assertNotIn('Server-Timing', response)
+        self.assertIn('api_peticiones_total{ruta="api/pedidos/",metodo="GET",estado="200"} 1', registro_metricas.exportar())
+
+    def test_endpoint_prometheus(self):
+        self.client.get('/api/pedidos/')
+        self.client.get('/api/pedidos/1/')
+        response = self.client.get('/api/metricas/')
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        texto = response.content.decode()
+        # Rutas sin resolver los parámetros
+        self.assertIn('api_peticiones_total{ruta="api/pedidos/<int:pk>/",metodo="GET",estado="404"} 1', texto)
+        self.assertIn('api_latencia_segundos_count{ruta="api/pedidos/",metodo="GET"} 1', texto)
+        self.assertIn('api_consultas_db_bucket{ruta="api/pedidos/",metodo="GET",le="+Inf"} 1', texto)
+
+        cliente = User.objects.create_user(username='cliente1', password='secreto123')
+        self.client.force_authenticate(cliente)
+        self.assertEqual(self.client.get('/api/metricas/').status_code, 403)
+
+    async def test_vistas_asincronas(self):
+        token = await sync_to_async(lambda: str(RefreshToken.for_user(self.admin).access_token))()
+        response = await AsyncClient().get('/api/async/mesas/', headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 200)
+        # Usuario, grupos y mesas
+        self.assertIn('desc="3 consultas"', response['Server-Timing'])
+
+
+class PerfiladorTests(TestCase):
+    def setUp(self):
+        role_cache.clear()
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.directorio = Path(directorio.name)
+        rutas_lentas.clear()
+        ajustes = override_settings(PERFILADOR_DIRECTORIO=self.directorio, PERFILADOR_MUESTREO=0, PERFILADOR_MAXIMO=2)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.admin = User.objects.create_user(username='admin1', password='secreto123')
+        self.admin.groups.add(Group.objects.create(name='Admin'))
+        self.cliente = User.objects.create_user(username='cliente1', password='secreto123')
+        self.cliente.groups.add(Group.objects.create(name='Cliente'))
+
+    def _get(self, user, **headers):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+        return client.get('/api/facturas/', headers=headers)
+
+    def _perfiles(self):
+        return sorted(archivo.name for archivo in self.directorio.glob('*.prof'))
+
+    def test_cabecera_solo_para_admin(self):
+        response = self._get(self.admin, **{'X-Perfilar': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._perfiles(), [response['X-Perfilar']])
+        self.assertIn('api_facturas', response['X-Perfilar'])
+
+        response = self._get(self.cliente, **{'X-Perfilar': '1'})
+        self.assertNotIn('X-Perfilar', response)
+        self.assertEqual(len(self._perfiles()), 1)
+
+    def test_ruta_lenta_perfila_la_siguiente_peticion(self):
+        # Sin muestreo: la primera petición lenta solo marca la ruta, la siguiente se perfila
+        with override_settings(PERFILADOR_UMBRAL_MS=0):
+            self._get(self.admin)
+            self.assertEqual(self._perfiles(), [])
+            self._get(self.admin)
+            self.assertEqual(len(self._perfiles()), 1)
+            self.assertIn('api_facturas', self._perfiles()[0])
+        with override_settings(PERFILADOR_UMBRAL_MS=0, PERFILADOR_LENTAS=False):
+            self._get(self.admin)
+            self._get(self.admin)
+        self.assertEqual(len(self._perfiles()), 1)
+
+    def test_con_otro_perfil_activo_no_se_perfila(self):
+        # Otra petición perfilándose en otro hilo: esta responde normalmente, sin perfil
+        with perfilando:
+            response = self._get(self.admin, **{'X-Perfilar': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Perfilar', response)
+        self.assertEqual(self._perfiles(), [])
+
+    def test_muestreo_con_umbral_y_rotacion(self):
+        with override_settings(PERFILADOR_MUESTREO=1, PERFILADOR_UMBRAL_MS=60000):
+            self._get(self.admin)
+        self.assertEqual(self._perfiles(), [])
+        with override_settings(PERFILADOR_MUESTREO=1, PERFILADOR_UMBRAL_MS=0):
+            for _ in range(3):
+                self._get(self.admin)
+                time.sleep(0.01)
+        self.assertEqual(len(self._perfiles()), 2)
+
+        salida = StringIO()
+        call_command('perfiles_top', '--limite', '5', '--ruta', 'api_facturas', stdout=salida)
+        self.assertIn('2 perfiles combinados', salida.getvalue())
+        self.assertIn('cumulative', salida.getvalue())
+
+
+class GenerarDatosTests(TestCase):
+    def _generar(self, *args):
+        call_command('generar_datos', '--escala', '0.01', '--dias', '30', '--hasta', '2025-06-30', '--lote', '70', *args, stdout=StringIO())
+        return (
+            list(Menu.objects.order_by('pk').values_list('pk', 'nombre', 'precio', 'calificaciones_total')),
+            list(DetallePedido.objects.order_by('pk').values_list('pk', 'pedido_fk', 'menu_fk', 'factura_fk', 'total', 'detalle_pedido_creado')),
+            list(Reserva.objects.order_by('pk').values_list('mesa_fk', 'fecha_reserva', 'cliente_fk')),
+        )
+
+    def test_determinista_y_consistente(self):
+        primera = self._generar()
+        self.assertEqual(Pedido.objects.count(), 200)
+        self.assertEqual(User.objects.filter(groups__name='Cliente').count(), 10)
+        self.assertEqual(User.objects.filter(groups__name='Admin').count(), 1)
+        self.assertEqual(Comentarios.objects.count(), 50)
+
+        # Totales de factura, calificaciones y eventos coherentes con las filas generadas
+        for factura in Factura.objects.all()[:20]:
+            suma = sum(DetallePedido.objects.filter(factura_fk=factura).values_list('total', flat=True))
+            self.assertEqual(factura.total_factura, suma)
+        self.assertEqual(sum(total for *_, total in primera[0]), 50)
+        self.assertEqual(EventoEstadoPedido.objects.filter(estado=HistorialEstados.ESTADO_PREPARACION).count(), 200)
+        self.assertTrue(ResumenVentas.objects.exists())
+        fechas = Pedido.objects.order_by('pk').values_list('pedido_creado', flat=True)
+        self.assertEqual(list(fechas), sorted(fechas))
+
+        with self.assertRaises(CommandError):
+            self._generar()
+        self.assertEqual(self._generar('--limpiar'), primera)
+        self.assertNotEqual(self._generar('--limpiar', '--semilla', '2')[1], primera[1])
+
+
+class BenchmarkTests(TestCase):
+    def test_todas_las_rutas_get_responden(self):
+        call_command('generar_datos', '--escala', '0.01', '--dias', '30', '--password', 'secreto123', '--sin-resumenes', stdout=StringIO())
+        admin = User.objects.filter(groups__name='Admin').first()
+        cliente = User.objects.filter(groups__name='Cliente', pedido__isnull=False).first()
+
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            rutas = medir_rutas(admin, cliente, 'secreto123', repeticiones=2)
+        self.assertEqual(len(rutas), len(rutas_get()))
+        self.assertIn('GET facturas/<int:pk>/', rutas)
+        self.assertNotIn('GET pedidos/completo/', rutas)
+        self.assertEqual({nombre: medidas['estado'] for nombre, medidas in rutas.items() if medidas['estado'] != 200}, {})
+        self.assertLessEqual(rutas['GET menu/']['p50_ms'], rutas['GET menu/']['p99_ms'])
+
+        serializadores = medir_serializadores(admin, filas=20, repeticiones=1)
+        self.assertEqual(serializadores['facturas/ FacturaSerializer']['filas'], 20)
+
+    def test_comparar_con_tolerancia(self):
+        base = {'escalas': {'1.0': {
+            'rutas': {'GET menu/': {'p50_ms': 10.0, 'p95_ms': 20.0, 'rps': 100.0}, 'GET mesas/': {'p50_ms': 0.5, 'p95_ms': 1.0, 'rps': 1000.0}},
+            'serializadores': {'menu/ MenuSerializer': {'filas_por_s': 1000.0}},
+        }}}
+        actual = {'escalas': {'1.0': {
+            'rutas': {'GET menu/': {'p50_ms': 11.0, 'p95_ms': 30.0, 'rps': 60.0}, 'GET mesas/': {'p50_ms': 0.9, 'p95_ms': 1.8, 'rps': 600.0}},
+            'serializadores': {'menu/ MenuSerializer': {'filas_por_s': 500.0}},
+        }}}
+        regresiones = {(nombre, metrica) for _, nombre, metrica, _, _ in comparar(actual, base, 0.25)}
+        # GET mesas/ empeora más del 25 % pero menos de 1 ms: se considera ruido
+        self.assertEqual(regresiones, {('GET menu/', 'p95_ms'), ('GET menu/', 'rps'), ('menu/ MenuSerializer', 'filas_por_s')})
+        self.assertEqual(comparar(actual, base, 1.5), [])
+
+
+class PresupuestoConsultasTests(TestCase):
+    # Máximo de consultas de una petición GET por ruta (autenticación, validadores de caché
+    # condicional y datos), que debe cumplirse igual con 1 que con 1000 filas. Toda ruta nueva
+    # tiene que declarar el suyo.
+    PRESUPUESTOS = {
+        'users/': 2, 'users/<int:pk>/': 2,
+        'categoriamenu/': 2, 'categoriamenu/<int:pk>/': 3,
+        'menu/': 2, 'menu/<int:pk>/': 3, 'menu/mejor-calificados/': 2, 'menu/buscar/': 2,
+        'historialestados/': 3, 'historialestados/<int:pk>/': 3,
+        'pedidos/': 3, 'pedidos/<int:pk>/': 3, 'pedidos/estado/<str:estado>/': 3, 'pedidos/<int:pk>/estados/': 2,
+        'pedidos/<int:pk>/detalle/': 3,
+        'promociones/': 2, 'promociones/<int:pk>/': 3,
+        'metodosdepago/': 3, 'metodosdepago/<int:pk>/': 3,
+        'estadomesas/': 3, 'estadomesas/<int:pk>/': 3,
+        'mesas/': 3, 'mesas/<int:pk>/': 3, 'mesas/disponibles/': 2,
+        'comentarios/': 3, 'comentarios/<int:pk>/': 3,
+        'notificaciones/': 3, 'notificaciones/<int:pk>/': 3,
+        'reservas/': 3, 'reservas/<int:pk>/': 3,
+        'facturas/': 3, 'facturas/<int:pk>/': 3,
+        'detallespedido/': 3, 'detallespedido/<int:pk>/': 3,
+        'pedidos/cliente/<int:id_cliente>/': 3, 'comentarios/usuario/<int:usuario_id>/': 3,
+        'reportes/ventas/': 2, 'metricas/': 1,
+        'pedidos/exportar/': 2, 'detallespedido/exportar/': 2, 'facturas/exportar/': 2,
+        'async/menu/': 2, 'async/menu/<int:pk>/': 2, 'async/mesas/': 2, 'async/mesas/<int:pk>/': 2,
+        'async/pedidos/cliente/<int:id_cliente>/': 2, 'async/notificaciones/': 2,
+    }
+    # Tablas que el queryset de una ruta puede recorrer completas: catálogos pequeños (y en
+    # caché) y auth_user, que no admite índices propios. Cualquier otro recorrido completo
+    # indica que una consulta dejó de usar su índice.
+    RECORRIDOS_PERMITIDOS = {
+        'users/': {'auth_user'},
+        'categoriamenu/': {'api_categoriamenu'},
+        'menu/': {'api_menu'},
+        'historialestados/': {'api_historialestados'},
+        'promociones/': {'api_promocion'},
+        'estadomesas/': {'api_mesasestado'},
+        'mesas/': {'api_mesas'},
+        'mesas/disponibles/': {'api_mesas'},
+    }
+
+    def _generar(self, escala):
+        call_command(
+            'generar_datos', '--limpiar', '--escala', escala, '--dias', '30', '--password', 'secreto123',
+            '--sin-resumenes', stdout=StringIO(),
+        )
+        admin = User.objects.filter(groups__name='Admin').first()
+        cliente = User.objects.filter(groups__name='Cliente', pedido__isnull=False).first()
+        return admin, cliente
+
+    def _consultas(self, escala):
+        admin, cliente = self._generar(escala)
+        # Las exportaciones hacen una consulta por cada EXPORTACION_LOTE filas: con un lote
+        # mayor que los datos el presupuesto cubre la parte fija
+        with override_settings(ALLOWED_HOSTS=['testserver'], EXPORTACION_LOTE=10000):
+            rutas = medir_rutas(admin, cliente, 'secreto123', repeticiones=1)
+        return {nombre.removeprefix('GET '): medidas.get('consultas') for nombre, medidas in rutas.items()}
+
+    def test_presupuesto_de_consultas_independiente_del_tamano(self):
+        # 0.0001 deja una fila por tabla (dos pedidos); 0.05, 1000 pedidos y 2500 líneas
+        pocas = self._consultas('0.0001')
+        self.assertEqual(Pedido.objects.count(), 2)
+        muchas = self._consultas('0.05')
+        self.assertEqual(Pedido.objects.count(), 1000)
+
+        self.assertEqual(set(muchas) - set(self.PRESUPUESTOS), set(), 'Rutas sin presupuesto de consultas')
+        for ruta, presupuesto in self.PRESUPUESTOS.items():
+            with self.subTest(ruta=ruta):
+                self.assertIsNotNone(muchas[ruta], 'La ruta no respondió 200')
+                # Toda petición autentica o lee datos: 0 indica que no se capturó nada
+                self.assertGreater(muchas[ruta], 0)
+                self.assertLessEqual(muchas[ruta], presupuesto)
+                self.assertEqual(pocas[ruta], muchas[ruta])
+
+    @skipUnless(connection.vendor == 'sqlite', 'Los planes se leen con EXPLAIN QUERY PLAN de SQLite.')
+    def test_busqueda_expandida_en_consultas_constantes(self):
+        # Los resultados de la búsqueda son una lista: la expansión se resuelve al cargarlos
+        role_cache.clear()
+        admin = User.objects.create_user(username='admin1', password='secreto123')
+        admin.groups.add(Group.objects.create(name='Admin'))
+        categorias = [CategoriaMenu.objects.create(nombre=f'Platos {i}', descripcion='Platos fuertes') for i in range(5)]
+        for i in range(30):
+            Menu.objects.create(nombre=f'Pollo {i}', descripcion='Asado', precio=5, categoria_fk=categorias[i % 5])
+        client = APIClient()
+        client.force_authenticate(admin)
+        client.get('/api/menu/')
+        consultas = []
+        for limite in (3, 30):
+            catalogo_cache().clear()
+            with CaptureQueriesContext(connection) as capturadas:
+                response = client.get('/api/menu/buscar/', {'q': 'pollo', 'limite': limite, 'expand': 'categoria_fk'})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()), limite)
+            self.assertIn('nombre', response.json()[0]['categoria_fk'])
+            consultas.append(len(capturadas))
+        self.assertEqual(consultas[0], consultas[1])
+        self.assertLessEqual(consultas[1], self.PRESUPUESTOS['menu/buscar/'])
+
+    def test_planes_usan_indices(self):
+        admin, cliente = self._generar('0.05')
+        for ruta, vista in rutas_get():
+            if not issubclass(vista, (ListModelMixin, RetrieveModelMixin)):
+                continue
+            with self.subTest(ruta=ruta):
+                sqls = consultas_de_vista(resolver_ruta(ruta, cliente), parametros_consulta(ruta), admin)
+                self.assertTrue(sqls)
+                self.assertLessEqual(recorridos_completos(sqls), self.RECORRIDOS_PERMITIDOS.get(ruta, set()))
+
+    def test_detecta_recorrido_completo(self):
+        self._generar('0.0001')
+        sql = str(Factura.objects.order_by('-fecha_emision', '-pk')[:10].query)
+        self.assertEqual(recorridos_completos([sql]), set())
+        sql = str(Factura.objects.order_by('-total_factura')[:10].query)
+        self.assertEqual(recorridos_completos([sql]), {'api_factura'})
+
+
+class ExportacionTests(TestCase):
+    def setUp(self):
+        call_command('generar_datos', '--escala', '0.01', '--dias', '30', '--sin-resumenes', stdout=StringIO())
+        self.admin = User.objects.filter(groups__name='Admin').first()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.admin).access_token}')
+
+    def _leer(self, url, **parametros):
+        response = self.client.get(url, parametros)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_por_lotes_con_rango(self):
+        detalles = DetallePedido.objects.order_by('detalle_pedido_creado', 'pk')
+        desde, hasta = detalles[100].detalle_pedido_creado, detalles[400].detalle_pedido_creado
+        esperados = list(detalles.filter(detalle_pedido_creado__gte=desde, detalle_pedido_creado__lt=hasta).values_list('pk', flat=True))
+
+        with override_settings(EXPORTACION_LOTE=40), CaptureQueriesContext(connection) as capturadas:
+            contenido = self._leer('/api/detallespedido/exportar/', desde=desde.isoformat(), hasta=hasta.isoformat())
+        filas = list(csv.reader(StringIO(contenido)))
+        self.assertEqual(filas[0][:3], ['id', 'detalle_pedido_creado', 'pedido_fk'])
+        self.assertEqual([int(fila[0]) for fila in filas[1:]], esperados)
+
+        # Una consulta por lote, todas por el índice (creado, id)
+        lotes = [consulta['sql'] for consulta in capturadas.captured_queries if 'api_detallepedido' in consulta['sql']]
+        self.assertEqual(len(lotes), len(esperados) // 40 + 1)
+        if connection.vendor == 'sqlite':
+            self.assertEqual(recorridos_completos(lotes), set())
+
+    def test_ndjson_y_permisos(self):
+        lineas = self._leer('/api/facturas/exportar/', formato='ndjson').splitlines()
+        self.assertEqual(len(lineas), Factura.objects.count())
+        primera = json.loads(lineas[0])
+        factura = Factura.objects.order_by('fecha_emision', 'pk').first()
+        self.assertEqual(primera['id'], factura.pk)
+        self.assertEqual(Decimal(primera['total_factura']), factura.total_factura)
+        self.assertIn('metodo_pago_fk__tipo_pago', primera)
+
+        response = self.client.get('/api/pedidos/exportar/', {'desde': '2025-02-01T00:00', 'hasta': '2025-01-01T00:00'})
+        self.assertEqual(response.status_code, 400)
+        cliente = User.objects.filter(groups__name='Cliente').first()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(cliente).access_token}')
+        self.assertEqual(self.client.get('/api/pedidos/exportar/').status_code, 403)
+
+
+class ImportacionCatalogoTests(TestCase):
+    def setUp(self):
+        catalogo_cache().clear()
+        self.admin = User.objects.create_user(username='admin1', password='secreto123')
+        self.admin.groups.add(Group.objects.create(name='Admin'))
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.admin).access_token}')
+        self.platos = CategoriaMenu.objects.create(nombre='Platos', descripcion='Platos fuertes')
+
+    def _subir(self, url, nombre, contenido, **datos):
+        archivo = SimpleUploadedFile(nombre, contenido.encode())
+        return self.client.post(url, {'archivo': archivo, **datos}, format='multipart')
+
+    def test_upsert_de_menus_con_reporte_por_fila(self):
+        existente = Menu.objects.create(nombre='Pollo asado', descripcion='Con arroz', precio=Decimal('8.00'), categoria_fk=self.platos)
+        Comentarios.objects.create(comentario='Bueno', calificacion=5, menu_fk=existente, cliente_fk=self.admin)
+        existente.refresh_from_db()
+        self.client.get('/api/menu/')
+        version = self.client.get('/api/menu/')['ETag']
+
+        contenido = (
+            'nombre,descripcion,precio,categoria,disponibilidad\n'
+            'Pollo asado,Con papas,9.50,Platos,si\n'
+            'Sopa de res,Con verduras,6.25,Platos,no\n'
+            'Pastel,Postre de la casa,3,Postres,\n'
+            'Piña123,Fruta,2,Platos,\n'
+            'Flan,Dulce,-1,Platos,\n'
+            'Huevos rancheros,Con 2 huevos #1!,4,Platos,\n'
+        )
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as capturadas:
+            response = self._subir('/api/menu/importar/', 'menu.csv', contenido)
+        self.assertEqual(response.status_code, 200)
+        reporte = response.json()
+        self.assertEqual((reporte['creados'], reporte['actualizados'], reporte['errores_total']), (1, 1, 4))
+        self.assertEqual(
+            {error['fila']: sorted(error['errores']) for error in reporte['errores']},
+            {4: ['categoria'], 5: ['nombre'], 6: ['precio'], 7: ['descripcion']},
+        )
+        # Categorías y menús existentes del lote se resuelven con una consulta cada uno
+        self.assertEqual(sum('FROM "api_categoriamenu"' in consulta['sql'] for consulta in capturadas.captured_queries), 1)
+        self.assertEqual(sum(consulta['sql'].startswith('SELECT') and 'FROM "api_menu"' in consulta['sql'] for consulta in capturadas.captured_queries), 1)
+
+        actualizado = Menu.objects.get(pk=existente.pk)
+        self.assertEqual((actualizado.descripcion, actualizado.precio), ('Con papas', Decimal('9.50')))
+        # El resumen de calificaciones no se toca
+        self.assertEqual((actualizado.calificaciones_total, actualizado.calificaciones_5), (1, 1))
+        self.assertFalse(Menu.objects.get(nombre='Sopa de res').disponibilidad)
+        # Índice de búsqueda y caché del catálogo al día
+        self.assertEqual([menu['nombre'] for menu in self.client.get('/api/menu/buscar/', {'q': 'sopa'}).json()], ['Sopa de res'])
+        self.assertNotEqual(self.client.get('/api/menu/')['ETag'], version)
+
+    def test_ndjson_simulado_y_categorias(self):
+        response = self._subir(
+            '/api/categoriamenu/importar/', 'categorias.ndjson',
+            '{"nombre": "Platos", "descripcion": "Platos del dia"}\n{"nombre": "Postres", "descripcion": "Dulces"}\nno es json\n',
+        )
+        reporte = response.json()
+        self.assertEqual((reporte['creados'], reporte['actualizados'], reporte['errores_total']), (1, 1, 1))
+        self.assertEqual(CategoriaMenu.objects.get(pk=self.platos.pk).descripcion, 'Platos del dia')
+        self.assertTrue(CategoriaMenu.objects.filter(nombre='Postres').exists())
+
+        response = self._subir('/api/menu/importar/', 'menu.jsonl', '{"nombre": "Flan", "descripcion": "Casero", "precio": "2.5", "categoria": "Postres"}\n', simular=True)
+        self.assertEqual(response.json()['creados'], 1)
+        self.assertFalse(Menu.objects.filter(nombre='Flan').exists())
+
+        ruta = Path(tempfile.mkdtemp()) / 'menu.csv'
+        ruta.write_text('nombre,descripcion,precio,categoria\nFlan,Casero,2.5,Postres\nFlan,Casero con caramelo,2.75,Postres\n', encoding='utf-8')
+        salida = StringIO()
+        call_command('importar_catalogo', 'menu', str(ruta), '--lote', '1', stdout=salida)
+        self.assertIn('1 creados, 1 actualizados, 0 filas con errores', salida.getvalue())
+        self.assertEqual(Menu.objects.get(nombre='Flan').precio, Decimal('2.75'))
+
+
+class CamposDinamicosTests(TestCase):
+    def setUp(self):
+        catalogo_cache().clear()
+        call_command('generar_datos', '--escala', '0.01', '--dias', '30', '--sin-resumenes', stdout=StringIO())
+        self.admin = User.objects.filter(groups__name='Admin').first()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.admin).access_token}')
+        # Calentar la caché de roles para que las consultas contadas sean solo las de la vista
+        self.client.get('/api/pedidos/', {'page_size': 1})
+
+    def _get(self, url, **parametros):
+        with CaptureQueriesContext(connection) as capturadas:
+            response = self.client.get(url, parametros)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json(), [consulta['sql'] for consulta in capturadas.captured_queries]
+
+    def test_fields_restringe_respuesta_y_columnas(self):
+        datos, sqls = self._get('/api/pedidos/', fields='id,estado_actual')
+        self.assertEqual(set(datos['results'][0]), {'id', 'estado_actual'})
+        # La consulta de la página, no la de los validadores (id, pedido_actualizado)
+        pedidos = [sql for sql in sqls if 'FROM "api_pedido"' in sql and '"estado_actual"' in sql]
+        self.assertEqual(len(pedidos), 1)
+        self.assertNotIn('fecha_pedido', pedidos[0])
+        # El cursor de la página siguiente sigue funcionando con las columnas recortadas
+        siguiente = self.client.get(datos['next'])
+        self.assertEqual(siguiente.status_code, 200)
+        self.assertEqual(set(siguiente.json()['results'][0]), {'id', 'estado_actual'})
+
+        self.assertEqual(self.client.get('/api/pedidos/', {'fields': 'id,inexistente'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/pedidos/', {'expand': 'cliente_fk'}).status_code, 400)
+
+    def test_expand_con_consultas_constantes(self):
+        parametros = {'expand': 'menu_fk.categoria_fk,promocion_fk,pedido_fk', 'fields': 'id,menu_fk.nombre,menu_fk.categoria_fk'}
+        pocas, sqls_pocas = self._get('/api/detallespedido/', page_size=2, **parametros)
+        muchas, sqls_muchas = self._get('/api/detallespedido/', page_size=100, **parametros)
+        _, sqls_sin_expandir = self._get('/api/detallespedido/', page_size=100)
+        self.assertEqual(len(sqls_pocas), len(sqls_muchas))
+        # select_related: la misma cantidad de consultas que sin expandir, menos la de validadores
+        self.assertEqual(len(sqls_muchas), len(sqls_sin_expandir) - 1)
+
+        detalle = DetallePedido.objects.select_related('menu_fk__categoria_fk').get(pk=muchas['results'][0]['id'])
+        fila = muchas['results'][0]
+        self.assertEqual(set(fila), {'id', 'menu_fk', 'promocion_fk', 'pedido_fk'})
+        self.assertEqual(fila['menu_fk'], {'nombre': detalle.menu_fk.nombre, 'categoria_fk': {
+            'id': detalle.menu_fk.categoria_fk.pk, 'categoria_creada': fila['menu_fk']['categoria_fk']['categoria_creada'],
+            'categoria_actualizada': fila['menu_fk']['categoria_fk']['categoria_actualizada'],
+            'nombre': detalle.menu_fk.categoria_fk.nombre, 'descripcion': detalle.menu_fk.categoria_fk.descripcion,
+        }})
+        self.assertEqual(fila['pedido_fk']['id'], detalle.pedido_fk_id)
+
+    def test_expand_inverso_con_prefetch(self):
+        parametros = {'expand': 'detallepedido_set.menu_fk', 'fields': 'id,detallepedido_set.id,detallepedido_set.menu_fk'}
+        _, sqls_pocas = self._get('/api/pedidos/', page_size=2, **parametros)
+        datos, sqls_muchas = self._get('/api/pedidos/', page_size=100, **parametros)
+        self.assertEqual(len(sqls_pocas), len(sqls_muchas))
+        for pedido in datos['results'][:10]:
+            esperados = list(DetallePedido.objects.filter(pedido_fk=pedido['id']).values_list('pk', 'menu_fk__nombre'))
+            self.assertCountEqual([(linea['id'], linea['menu_fk']['nombre']) for linea in pedido['detallepedido_set']], esperados)
+
+    def test_detalle_y_validadores(self):
+        menu = Menu.objects.first()
+        url = f'/api/menu/{menu.pk}/'
+        completo = self.client.get(url)
+        recortado = self.client.get(url, {'fields': 'id,nombre'})
+        self.assertEqual(recortado.json(), {'id': menu.pk, 'nombre': menu.nombre})
+        # Cada ?fields= tiene su propio ETag
+        self.assertNotEqual(completo['ETag'], recortado['ETag'])
+        self.assertEqual(self.client.get(url, {'fields': 'id,nombre'}, HTTP_IF_NONE_MATCH=recortado['ETag']).status_code, 304)
+        self.assertEqual(self.client.get(url, {'fields': 'id,nombre'}, HTTP_IF_NONE_MATCH=completo['ETag']).status_code, 200)
+
+        # Con ?expand= no hay ETag: la categoría puede cambiar sin tocar el menú
+        expandido = self.client.get(url, {'expand': 'categoria_fk'})
+        self.assertNotIn('ETag', expandido)
+        self.assertEqual(expandido.json()['categoria_fk']['nombre'], menu.categoria_fk.nombre)
+
+        # Listados sin paginar: queryset recortado (mejor calificados) y lista (búsqueda)
+        datos, _ = self._get('/api/menu/mejor-calificados/', fields='id,nombre', expand='categoria_fk')
+        self.assertEqual(set(datos[0]), {'id', 'nombre', 'categoria_fk'})
+        datos, _ = self._get('/api/menu/buscar/', q=menu.nombre, fields='id')
+        self.assertIn({'id': menu.pk}, datos)
+
+        # Las escrituras ignoran los parámetros
+        response = self.client.patch(url + '?expand=categoria_fk&fields=id', {'precio': '9.50'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['categoria_fk'], menu.categoria_fk_id)
+
+
+class PedidoDetalleCompletoTests(TestCase):
+    def setUp(self):
+        call_command('generar_datos', '--escala', '0.01', '--dias', '30', '--sin-resumenes', stdout=StringIO())
+        self.admin = User.objects.filter(groups__name='Admin').first()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.admin).access_token}')
+
+    def test_pedido_con_lineas_en_consultas_constantes(self):
+        pedido = Pedido.objects.filter(detallepedido__factura_fk__isnull=False).first()
+        menu = Menu.objects.create(nombre='Sopa del dia', descripcion='Sopa', precio=Decimal('3.00'), categoria_fk=CategoriaMenu.objects.first())
+        promocion = Promocion.objects.filter(menu_fk__isnull=False).first()
+        url = f'/api/pedidos/{pedido.pk}/detalle/'
+        self.client.get(url)  # Calentar la caché de roles
+
+        with CaptureQueriesContext(connection) as pocas:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        # Más líneas no deben añadir consultas
+        for _ in range(20):
+            DetallePedido.objects.create(
+                pedido_fk=pedido, menu_fk=menu, promocion_fk=promocion, cantidad=1, subtotal=3, iva=0, total=3,
+            )
+        with CaptureQueriesContext(connection) as muchas:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(pocas.captured_queries), len(muchas.captured_queries))
+
+        datos = response.json()
+        self.assertEqual(datos['id'], pedido.pk)
+        self.assertEqual(datos['estado_fk']['id'], pedido.estado_fk_id)
+        self.assertEqual(datos['estado_actual'], pedido.estado_actual)
+        lineas = list(DetallePedido.objects.filter(pedido_fk=pedido).order_by('pk'))
+        self.assertEqual([linea['id'] for linea in datos['lineas']], [linea.pk for linea in lineas])
+        self.assertEqual(datos['lineas'][-1]['menu_fk']['nombre'], 'Sopa del dia')
+        self.assertEqual(datos['lineas'][-1]['promocion_fk']['id'], promocion.pk)
+        factura = lineas[0].factura_fk
+        self.assertEqual(datos['factura']['id'], factura.pk)
+        self.assertEqual(Decimal(datos['factura']['total_factura']), Factura.objects.get(pk=factura.pk).total_factura)
+
+    def test_cliente_solo_ve_sus_pedidos(self):
+        cliente = User.objects.filter(groups__name='Cliente', pedido__isnull=False).first()
+        propio = Pedido.objects.filter(cliente_fk=cliente).first()
+        ajeno = Pedido.objects.exclude(cliente_fk=cliente).first()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(cliente).access_token}')
+        self.assertEqual(self.client.get(f'/api/pedidos/{propio.pk}/detalle/').status_code, 200)
+        self.assertEqual(self.client.get(f'/api/pedidos/{ajeno.pk}/detalle/').status_code, 404)
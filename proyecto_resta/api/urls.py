@@ -1,17 +1,26 @@
 from django.urls import path
-from . import views
+from . import views, async_views
 
 urlpatterns = [
     path('users/', views.UserListCreate.as_view(), name='user-list-create'),  
     path('users/<int:pk>/', views.UserDetail.as_view(), name='user-detail'),  
     path('categoriamenu/', views.CategoriaMenuListCreate.as_view(), name='categoriamenu-list'), 
     path('categoriamenu/<int:pk>/', views.CategoriaMenuDetail.as_view(), name='categoriamenu-detail'),
+    path('categoriamenu/importar/', views.CategoriaMenuImportar.as_view(), name='categoriamenu-importar'),
     path('menu/', views.MenuListCreate.as_view(), name='mesas-list'),
     path('menu/<int:pk>/', views.MenuDetail.as_view(), name='mesas-detail'),
+    path('menu/importar/', views.MenuImportar.as_view(), name='menu-importar'),
+    path('menu/mejor-calificados/', views.MenuMejorCalificados.as_view(), name='menu-mejor-calificados'),
+    path('menu/buscar/', views.MenuBuscar.as_view(), name='menu-buscar'),
     path('historialestados/', views.HistorialEstadosListCreate.as_view(), name='historialestados-list'), 
     path('historialestados/<int:pk>/', views.HistorialEstadosDetail.as_view(), name='historialestados-detail'),
     path('pedidos/', views.PedidoListCreate.as_view(), name='pedidos-list'), 
     path('pedidos/<int:pk>/', views.PedidoDetail.as_view(), name='pedidos-detail'), 
+    path('pedidos/completo/', views.PedidoCompletoCreate.as_view(), name='pedidos-completo'),
+    path('pedidos/estado/', views.PedidoTransicionEstado.as_view(), name='pedidos-transicion-estado'),
+    path('pedidos/estado/<str:estado>/', views.PedidoPorEstado.as_view(), name='pedidos-por-estado'),
+    path('pedidos/<int:pk>/estados/', views.PedidoEventos.as_view(), name='pedidos-eventos'),
+    path('pedidos/<int:pk>/detalle/', views.PedidoDetalleCompleto.as_view(), name='pedidos-detalle-completo'),
     path('promociones/', views.PromocionListCreate.as_view(), name='promociones-list'), 
     path('promociones/<int:pk>/', views.PromocionDetail.as_view(), name='promociones-detail'), 
     path('metodosdepago/', views.MetodoDePagoListCreate.as_view(), name='metodosdepago-list'),
@@ -20,10 +29,13 @@ urlpatterns = [
     path('estadomesas/<int:pk>/', views.MesasEstadoDetail.as_view(), name='estadomesas-detail'),
     path('mesas/', views.MesasListCreate.as_view(), name='mesas-list'),
     path('mesas/<int:pk>/', views.MesasDetail.as_view(), name='mesas-detail'),
+    path('mesas/disponibles/', views.MesasDisponibles.as_view(), name='mesas-disponibles'),
     path('comentarios/', views.ComentariosListCreate.as_view(), name='comentarios-list'),
     path('comentarios/<int:pk>/', views.ComentariosDetail.as_view(), name='comentarios-detail'),
     path('notificaciones/', views.NotificacionesListCreate.as_view(), name='notificaciones-list'),
     path('notificaciones/<int:pk>/', views.NotificacionesDetail.as_view(), name='notificaciones-detail'),
+    path('notificaciones/marcar-leidas/', views.NotificacionesMarcarLeidas.as_view(), name='notificaciones-marcar-leidas'),
+    path('notificaciones/fan-out/', views.NotificacionesFanOut.as_view(), name='notificaciones-fan-out'),
     path('reservas/', views.ReservaListCreate.as_view(), name='reserva-list'),
     path('reservas/<int:pk>/', views.ReservaDetail.as_view(), name='reserva-detail'),
     path('facturas/', views.FacturaListCreate.as_view(), name='facturas-list'),
@@ -32,5 +44,18 @@ urlpatterns = [
     path('detallespedido/<int:pk>/', views.DetallePedidoDetail.as_view(), name='detallespedido-detail'),
     path('pedidos/cliente/<int:id_cliente>/', views.PedidoPorUsuario.as_view(), name='pedidos_por_usuario'),
     path('comentarios/usuario/<int:usuario_id>/', views.ComentarioPorUsuario.as_view(), name='comentarios_por_usuario'),
+    path('pedidos/exportar/', views.PedidoExportar.as_view(), name='pedidos-exportar'),
+    path('detallespedido/exportar/', views.DetallePedidoExportar.as_view(), name='detallespedido-exportar'),
+    path('facturas/exportar/', views.FacturaExportar.as_view(), name='facturas-exportar'),
+    path('reportes/ventas/', views.ReporteVentas.as_view(), name='reporte-ventas'),
+    path('metricas/', views.Metricas.as_view(), name='metricas'),
+    # Lecturas asíncronas (ASGI) de los endpoints más consultados
+    path('async/menu/', async_views.AsyncMenuList.as_view(), name='async-menu-list'),
+    path('async/menu/<int:pk>/', async_views.AsyncMenuDetail.as_view(), name='async-menu-detail'),
+    path('async/mesas/', async_views.AsyncMesasList.as_view(), name='async-mesas-list'),
+    path('async/mesas/<int:pk>/', async_views.AsyncMesasDetail.as_view(), name='async-mesas-detail'),
+    path('async/pedidos/cliente/<int:id_cliente>/', async_views.AsyncPedidoPorUsuario.as_view(), name='async-pedidos-por-usuario'),
+    path('async/notificaciones/', async_views.AsyncNotificacionesList.as_view(), name='async-notificaciones-list'),
+    path('async/notificaciones/stream/', async_views.AsyncNotificacionesStream.as_view(), name='async-notificaciones-stream'),
 ]
 
@@ -0,0 +1,179 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Sum
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+
+from .models import DetallePedido, MarcaResumenVentas, ResumenVentas
+from .pagination import keyset_filter
+
+# Resúmenes de ventas por hora y por día. Cada hora se recalcula completa con un GROUP BY sobre
+# el rango de DetallePedido creados en ella (delete + bulk_create), así que volver a procesar
+# una hora es idempotente; los días se suman a partir de los resúmenes por hora.
+
+# Campo de DetallePedido que agrupa cada dimensión y el que da su etiqueta
+DIMENSIONES = {
+    ResumenVentas.DIMENSION_MENU: ('menu_fk', 'menu_fk__nombre'),
+    ResumenVentas.DIMENSION_CATEGORIA: ('menu_fk__categoria_fk', 'menu_fk__categoria_fk__nombre'),
+    ResumenVentas.DIMENSION_TIPO_PAGO: ('factura_fk__metodo_pago_fk__tipo_pago', 'factura_fk__metodo_pago_fk__tipo_pago'),
+}
+MEDIDAS = ('cantidad', 'subtotal', 'iva', 'total')
+HORA = timedelta(hours=1)
+DIA = timedelta(days=1)
+# Días recalculados por transacción al reconstruir
+DIAS_POR_LOTE = 31
+# Posición inicial de la marca de agua
+MARCA_INICIAL = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def inicio_hora(valor):
+    return timezone.localtime(valor).replace(minute=0, second=0, microsecond=0)
+
+
+def inicio_dia(valor):
+    return timezone.localtime(valor).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def tramos(inicios, paso):
+    # Agrupa inicios de periodo en rangos contiguos [desde, hasta)
+    rangos = []
+    for inicio in sorted(inicios):
+        if rangos and rangos[-1][1] == inicio:
+            rangos[-1][1] = inicio + paso
+        else:
+            rangos.append([inicio, inicio + paso])
+    return rangos
+
+
+def _sumas():
+    return {'lineas': Count('pk'), **{medida: Sum(medida) for medida in MEDIDAS}}
+
+
+def _recalcular_horas(desde, hasta):
+    detalles = DetallePedido.objects.filter(detalle_pedido_creado__gte=desde, detalle_pedido_creado__lt=hasta)
+    filas = []
+    for dimension, (campo, etiqueta) in DIMENSIONES.items():
+        grupos = detalles.filter(**{f'{campo}__isnull': False})
+        grupos = (
+            grupos
+            .annotate(inicio=TruncHour('detalle_pedido_creado'))
+            .values('inicio', clave=F(campo), nombre=F(etiqueta))
+            .annotate(**_sumas())
+            .order_by()
+        )
+        filas += [
+            ResumenVentas(
+                periodo=ResumenVentas.PERIODO_HORA, dimension=dimension, clave=str(grupo['clave']),
+                etiqueta=grupo['nombre'], inicio=grupo['inicio'], lineas=grupo['lineas'],
+                **{medida: grupo[medida] for medida in MEDIDAS},
+            )
+            for grupo in grupos
+        ]
+    ResumenVentas.objects.filter(periodo=ResumenVentas.PERIODO_HORA, inicio__gte=desde, inicio__lt=hasta).delete()
+    ResumenVentas.objects.bulk_create(filas, batch_size=1000)
+
+
+def _recalcular_dias(desde, hasta):
+    # Los días se obtienen de los resúmenes por hora, sin volver a leer DetallePedido
+    grupos = (
+        ResumenVentas.objects
+        .filter(periodo=ResumenVentas.PERIODO_HORA, inicio__gte=desde, inicio__lt=hasta)
+        .annotate(dia=TruncDay('inicio'))
+        .values('dimension', 'clave', 'dia')
+        .annotate(nombre=Max('etiqueta'), lineas_dia=Sum('lineas'), **{f'{medida}_dia': Sum(medida) for medida in MEDIDAS})
+        .order_by()
+    )
+    filas = [
+        ResumenVentas(
+            periodo=ResumenVentas.PERIODO_DIA, dimension=grupo['dimension'], clave=grupo['clave'],
+            etiqueta=grupo['nombre'], inicio=grupo['dia'], lineas=grupo['lineas_dia'],
+            **{medida: grupo[f'{medida}_dia'] for medida in MEDIDAS},
+        )
+        for grupo in grupos
+    ]
+    ResumenVentas.objects.filter(periodo=ResumenVentas.PERIODO_DIA, inicio__gte=desde, inicio__lt=hasta).delete()
+    ResumenVentas.objects.bulk_create(filas, batch_size=1000)
+
+
+def recalcular(horas):
+    # Recalcula las horas indicadas y los días que las contienen
+    with transaction.atomic():
+        for desde, hasta in tramos(horas, HORA):
+            _recalcular_horas(desde, hasta)
+        for desde, hasta in tramos({inicio_dia(hora) for hora in horas}, DIA):
+            _recalcular_dias(desde, hasta)
+
+
+def actualizar_resumenes(lote=None):
+    # Incorpora los DetallePedido creados o modificados desde la marca de agua, por lotes.
+    # Solo se recalculan las horas a las que pertenecen esos detalles. Devuelve cuántos se procesaron.
+    lote = lote or settings.VENTAS_RESUMEN_LOTE
+    tope = timezone.now() - timedelta(seconds=settings.VENTAS_RESUMEN_RETRASO)
+    MarcaResumenVentas.objects.get_or_create(pk=1, defaults={'actualizado': MARCA_INICIAL, 'detalle_id': 0})
+    procesados = 0
+
+    while True:
+        with transaction.atomic():
+            # Bloquear la marca evita que dos ejecuciones simultáneas procesen el mismo lote
+            marca = MarcaResumenVentas.objects.select_for_update().get(pk=1)
+            detalles = list(
+                DetallePedido.objects
+                .filter(detalle_pedido_actualizado__lte=tope)
+                .filter(keyset_filter('detalle_pedido_actualizado', marca.actualizado, marca.detalle_id, ascending=True))
+                .order_by('detalle_pedido_actualizado', 'pk')
+                .values_list('pk', 'detalle_pedido_actualizado', 'detalle_pedido_creado')[:lote]
+            )
+            if not detalles:
+                return procesados
+
+            recalcular({inicio_hora(creado) for _, _, creado in detalles})
+            marca.detalle_id, marca.actualizado, _ = detalles[-1]
+            marca.save()
+        procesados += len(detalles)
+
+
+def reconstruir_resumenes(desde=None, hasta=None, horas_por_lote=24):
+    # Reconstruye los resúmenes por rangos de 'horas_por_lote' horas, cada uno en su propia
+    # transacción. Sin rango, reconstruye todo y deja la marca de agua al día.
+    completo = desde is None and hasta is None
+    tope = timezone.now() - timedelta(seconds=settings.VENTAS_RESUMEN_RETRASO)
+    limites = DetallePedido.objects.aggregate(primero=Min('detalle_pedido_creado'), ultimo=Max('detalle_pedido_creado'))
+    if limites['primero'] is None:
+        if completo:
+            ResumenVentas.objects.all().delete()
+        return 0
+
+    desde = inicio_dia(desde or limites['primero'])
+    hasta = inicio_dia(hasta or limites['ultimo']) + DIA
+    paso = HORA * horas_por_lote
+    inicio = desde
+    while inicio < hasta:
+        with transaction.atomic():
+            _recalcular_horas(inicio, min(inicio + paso, hasta))
+        inicio += paso
+
+    inicio = desde
+    while inicio < hasta:
+        with transaction.atomic():
+            _recalcular_dias(inicio, min(inicio + DIAS_POR_LOTE * DIA, hasta))
+        inicio += DIAS_POR_LOTE * DIA
+
+    if completo:
+        with transaction.atomic():
+            # Quitar resúmenes de periodos que ya no tienen detalles
+            ResumenVentas.objects.exclude(inicio__gte=desde, inicio__lt=hasta).delete()
+            ultimo = (
+                DetallePedido.objects
+                .filter(detalle_pedido_actualizado__lte=tope)
+                .order_by('-detalle_pedido_actualizado', '-pk')
+                .values_list('pk', 'detalle_pedido_actualizado')
+                .first()
+            )
+            if ultimo is not None:
+                MarcaResumenVentas.objects.update_or_create(
+                    pk=1, defaults={'detalle_id': ultimo[0], 'actualizado': ultimo[1]},
+                )
+    return (hasta - desde) // HORA
+
@@ -1,23 +1,39 @@
 from rest_framework import generics, status
-from .models import CategoriaMenu, Menu, HistorialEstados, Pedido, Promocion, MetodoDePago, MesasEstado, Mesas, Comentarios, Notificaciones, Reserva, Factura, DetallePedido
+from .models import CategoriaMenu, Menu, HistorialEstados, Pedido, EventoEstadoPedido, Promocion, MetodoDePago, MesasEstado, Mesas, Comentarios, Notificaciones, Reserva, Factura, DetallePedido, ResumenVentas
 from rest_framework.response import Response
-from .serializers import CategoriaMenuSerializer, UserRegisterSerializer, MenuSerializer, HistorialEstadosSerializer, PedidoSerializer, PromocionSerializer, MetodoDePagoSerializer, MesasEstadoSerializer, MesasSerializer, ComentariosSerializer, NotificacionesSerializer, ReservaSerializer, FacturaSerializer, DetallePedidoSerializer
+from .serializers import CategoriaMenuSerializer, UserRegisterSerializer, MenuSerializer, HistorialEstadosSerializer, PedidoSerializer, MejorCalificadosSerializer, BusquedaMenuSerializer, EventoEstadoPedidoSerializer, TransicionEstadoSerializer, PromocionSerializer, MetodoDePagoSerializer, MesasEstadoSerializer, MesasSerializer, ComentariosSerializer, NotificacionesSerializer, ReservaSerializer, FacturaSerializer, DetallePedidoSerializer, PedidoCompletoSerializer, PedidoDetalleSerializer, DisponibilidadMesasSerializer, MesaDisponibleSerializer, MarcarLeidasSerializer, FanOutNotificacionesSerializer, ResumenVentasSerializer, ReporteVentasSerializer, ExportacionSerializer, ImportacionSerializer
 from rest_framework.permissions import IsAuthenticated, BasePermission
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.db.models import Exists, F, OuterRef, Prefetch
+from django.http import HttpResponse
+from django.utils import timezone
+from datetime import timedelta
+from .roles import get_user_roles
+from .cache import CatalogoCacheMixin
+from .conditional import ConditionalGetMixin
+from .notificaciones import destinatarios, enviar_notificaciones
+from .estados import avanzar_pedidos
+from .busqueda import buscar_menus
+from .metricas import registro as registro_metricas
+from .exportacion import respuesta_exportacion
+from .importacion import ImportadorCategorias, ImportadorMenus, leer_filas
 
 class IsAdministrador(BasePermission):
     # Permiso para verificar si el usuario pertenece al grupo "Admin"
     def has_permission(self, request, view):
-        return request.user and request.user.groups.filter(name="Admin").exists()
+        return "Admin" in get_user_roles(request)
     
 class IsCliente(BasePermission):
     # Permiso para verificar si el usuario pertenece al grupo "Cliente"
     def has_permission(self, request, view):
-        return request.user and request.user.groups.filter(name="Cliente").exists() 
+        return "Cliente" in get_user_roles(request)
 
 class UserListCreate(generics.ListCreateAPIView):
     queryset = User.objects.all()
     serializer_class = UserRegisterSerializer
+    # Campo de creación usado por la paginación por cursor
+    cursor_field = 'date_joined'
     # Permisos para acceder a la vista: autenticado y ser Admin o Cliente
     permission_classes = [IsAuthenticated, IsAdministrador | IsCliente]
     
@@ -34,13 +50,15 @@ class UserDetail(generics.RetrieveUpdateDestroyAPIView):
 
 ##############################################################################################################################
 
-class CategoriaMenuListCreate(generics.ListCreateAPIView):
+class CategoriaMenuListCreate(CatalogoCacheMixin, generics.ListCreateAPIView):
     queryset = CategoriaMenu.objects.all()
     serializer_class = CategoriaMenuSerializer
+    # Campo de creación usado por la paginación por cursor
+    cursor_field = 'categoria_creada'
     # Permisos para acceder a la vista: autenticado y ser Admin
     permission_classes = [IsAuthenticated, IsAdministrador]
 
-class CategoriaMenuDetail(generics.RetrieveUpdateDestroyAPIView):
+class CategoriaMenuDetail(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = CategoriaMenu.objects.all()
     serializer_class = CategoriaMenuSerializer
     # Permisos para acceder a la vista: autenticado y ser Admin
@@ -53,13 +71,51 @@ class CategoriaMenuDetail(generics.RetrieveUpdateDestroyAPIView):
     
 ##############################################################################################################################
 
-class MenuListCreate(generics.ListCreateAPIView):
+class MenuListCreate(CatalogoCacheMixin, generics.ListCreateAPIView):
     queryset = Menu.objects.all()
     serializer_class = MenuSerializer
+    # Campo de creación usado por la paginación por cursor
+    cursor_field = 'menu_creado'
     # Permisos para acceder a la vista: autenticado y ser Admin o Cliente
     permission_classes = [IsAuthenticated, IsAdministrador | IsCliente]
 
-class MenuDetail(generics.RetrieveUpdateDestroyAPIView):
+class MenuMejorCalificados(CatalogoCacheMixin, generics.ListAPIView):
+    # Menús con mejor calificación promedio; lee el resumen guardado en Menu, sin agregar Comentarios
+    serializer_class = MenuSerializer
+    pagination_class = None
+    # Permisos para acceder a la vista: autenticado y ser Admin o Cliente
+    permission_classes = [IsAuthenticated, IsAdministrador | IsCliente]
+
+    def get_queryset(self):
+        parametros = MejorCalificadosSerializer(data=self.request.query_params)
+        parametros.is_valid(raise_exception=True)
+        # Usa el índice (calificacion_promedio, calificaciones_total, id) en orden descendente
+        return (
+            Menu.objects
+            .filter(calificaciones_total__gte=parametros.validated_data['minimo'])
+            .order_by('-calificacion_promedio', '-calificaciones_total', '-id')
+            [:parametros.validated_data['limite']]
+        )
+
+class MenuBuscar(CatalogoCacheMixin, generics.ListAPIView):
+    # Búsqueda por nombre y descripción sin distinguir acentos, con prefijos para autocompletar,
+    # ordenada por relevancia (ver api/busqueda.py)
+    serializer_class = MenuSerializer
+    pagination_class = None
+    # Permisos para acceder a la vista: autenticado y ser Admin o Cliente
+    permission_classes = [IsAuthenticated, IsAdministrador | IsCliente]
+
+    def get_queryset(self):
+        parametros = BusquedaMenuSerializer(data=self.request.query_params)
+        parametros.is_valid(raise_exception=True)
+        # Lista ya ordenada por relevancia, no un queryset: los filtros (?fields=, ?expand=) se
+        # aplican antes, al queryset de Menu con el que se cargan los resultados
+        return buscar_menus(
+            parametros.validated_data['q'], parametros.validated_data['limite'],
+            queryset=self.filter_queryset(Menu.objects.all()),
+        )
+
+class MenuDetail(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Menu.objects.all()
     serializer_class = MenuSerializer
     # Permisos para acceder a la vista: autenticado y ser Admin
@@ -72,13 +128,15 @@ class MenuDetail(generics.RetrieveUpdateDestroyAPIView):
 
 ##############################################################################################################################
 
-class HistorialEstadosListCreate(generics.ListCreateAPIView):
+class HistorialEstadosListCreate(ConditionalGetMixin, generics.ListCreateAPIView):
     queryset = HistorialEstados.objects.all()
     serializer_class = HistorialEstadosSerializer
+    # Campo de creación usado por la paginación por cursor
+    cursor_field = 'historial_creado'
     # Permisos para acceder a la vista: autenticado y ser Admin
     permission_classes = [IsAuthenticated, IsAdministrador]
 
-class HistorialEstadosDetail(generics.RetrieveUpdateDestroyAPIView):
+class HistorialEstadosDetail(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = HistorialEstados.objects.all()
     serializer_class = HistorialEstadosSerializer
     # Permisos para acceder a la vista: autenticado y ser Admin
@@ -91,27 +149,97 @@ class HistorialEstadosDetail(generics.RetrieveUpdateDestroyAPIView):
 
 ##############################################################################################################################
 
-class PedidoListCreate(generics.ListCreateAPIView):
+class PedidoListCreate(ConditionalGetMixin, generics.ListCreateAPIView):
     queryset = Pedido.objects.all()
     serializer_class = PedidoSerializer
+    # Campo de creación usado por la paginación por cursor
+    cursor_field = 'pedido_creado'
     # Permisos para acceder a la vista: autenticado y ser Admin o Cliente
     permission_classes = [IsAuthenticated, IsAdministrador | IsCliente]
 
-class PedidoDetail(generics.RetrieveUpdateDestroyAPIView):
+class PedidoDetail(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Pedido.objects.all()
     serializer_class = PedidoSerializer
     # Permisos para acceder a la vista: autenticado y ser Admin
     permission_classes = [IsAuthenticated, IsAdministrador]
 
+class PedidoDetalleCompleto(generics.RetrieveAPIView):
+    # Un pedido con su estado, sus líneas (con menú y promoción) y su factura, en dos consultas
+    # sin importar cuántas líneas tenga: el pedido con su estado y las líneas con lo demás
+    serializer_class = PedidoDetalleSerializer
+    # El queryset ya carga todo lo que se serializa
+    filter_backends = []
+    # Permisos para acceder a la vista: autenticado y ser Admin o Cliente
+    permission_classes = [IsAuthenticated, IsAdministrador | IsCliente]
+
+    def get_queryset(self):
+        lineas = DetallePedido.objects.select_related('menu_fk', 'promocion_fk', 'factura_fk').order_by('pk')
+        pedidos = Pedido.objects.select_related('estado_fk').prefetch_related(Prefetch('detallepedido_set', queryset=lineas))
+        # Un cliente solo ve sus propios pedidos
+        if "Admin" not in get_user_roles(self.request):
+            pedidos = pedidos.filter(cliente_fk=self.request.user)
+        return pedidos
+
+class PedidoCompletoCreate(generics.CreateAPIView):
+    # Crea un pedido con todas sus líneas (DetallePedido) en una sola petición y transacción
+    queryset = Pedido.objects.all()
+    serializer_class = PedidoCompletoSerializer
+    # Permisos para acceder a la vista: autenticado y ser Admin o Cliente
+    permission_classes = [IsAuthenticated, IsAdministrador | IsCliente]
+
+class PedidoPorEstado(ConditionalGetMixin, generics.ListAPIView):
+    # Tablero de cocina: pedidos en un estado, del que lleva más tiempo en él al más reciente
+    serializer_class = PedidoSerializer
+    # Se pagina por el momento en que el pedido llegó a su estado actual, en orden ascendente
+    cursor_field = 'estado_actualizado'
+    cursor_ascending = True
+    # Permisos para acceder a la vista: autenticado y ser Admin
+    permission_classes = [IsAuthenticated, IsAdministrador]
+
+    def get_queryset(self):
+        # Usa el índice (estado_actual, estado_actualizado, id)
+        return Pedido.objects.filter(estado_actual=self.kwargs['estado'])
+
+class PedidoTransicionEstado(generics.GenericAPIView):
+    # Avanza varios pedidos a un mismo estado en una sola transacción
+    serializer_class = TransicionEstadoSerializer
+    # Permisos para acceder a la vista: autenticado y ser Admin
+    permission_classes = [IsAuthenticated, IsAdministrador]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        actualizados, omitidos = avanzar_pedidos(
+            serializer.validated_data['pedidos'], serializer.validated_data['estado'],
+        )
+        return Response({'actualizados': actualizados, 'omitidos': omitidos}, status=status.HTTP_200_OK)
+
+class PedidoEventos(ConditionalGetMixin, generics.ListAPIView):
+    # Historial de estados de un pedido
+    serializer_class = EventoEstadoPedidoSerializer
+    # Campo de creación usado por la paginación por cursor
+    cursor_field = 'evento_creado'
+    # Permisos para acceder a la vista: autenticado y ser Admin o Cliente
+    permission_classes = [IsAuthenticated, IsAdministrador | IsCliente]
+
+    def get_queryset(self):
+        eventos = EventoEstadoPedido.objects.filter(pedido_fk=self.kwargs['pk'])
+        # Un cliente solo ve el historial de sus propios pedidos
+        if "Admin" not in get_user_roles(self.request):
+            eventos = eventos.filter(pedido_fk__cliente_fk=self.request.user)
+        return eventos
+
 ##############################################################################################################################
 
-class PromocionListCreate(generics.ListCreateAPIView):
+class PromocionListCreate(CatalogoCacheMixin, generics.ListCreateAPIView):
     queryset = Promocion.objects.all()
     serializer_class = PromocionSerializer
+    # Campo de creación usado por la paginación por cursor
+    cursor_field = 'promocion_creado'
     # Permisos para acceder a la vista: autenticado y ser Admin
     permission_classes = [IsAuthenticated, IsAdministrador]
 
-class PromocionDetail(generics.RetrieveUpdateDestroyAPIView):
+class PromocionDetail(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Promocion.objects.all()
     serializer_class = PromocionSerializer
     # Permisos para acceder a la vista: autenticado y ser Admin
@@ -119,13 +247,15 @@ class PromocionDetail(generics.RetrieveUpdateDestroyAPIView):
 
 ##############################################################################################################################
 
-class MetodoDePagoListCreate(generics.ListCreateAPIView):
+class MetodoDePagoListCreate(ConditionalGetMixin, generics.ListCreateAPIView):
     queryset = MetodoDePago.objects.all()
     serializer_class = MetodoDePagoSerializer
+    # Campo de creación usado por la paginación por cursor
+    cursor_field = 'metodo_pago_creado'
     # Permisos para acceder a la vista: autenticado y ser Admin
     permission_classes = [IsAuthenticated, IsAdministrador]
 
-class MetodoDePagoDetail(generics.RetrieveUpdateDestroyAPIView):
+class MetodoDePagoDetail(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = MetodoDePago.objects.all()
     serializer_class = MetodoDePagoSerializer
     # Permisos para acceder a la vista: autenticado y ser Admin
@@ -138,9 +268,11 @@ class MetodoDePagoDetail(generics.RetrieveUpdateDestroyAPIView):
 
 ##############################################################################################################################
 
-class MesasEstadoListCreate(generics.ListCreateAPIView):
+class MesasEstadoListCreate(ConditionalGetMixin, generics.ListCreateAPIView):
     queryset = MesasEstado.objects.all()
     serializer_class = MesasEstadoSerializer
+    # Campo de creación usado por la paginación por cursor
+    cursor_field = 'estado_mesa_creado'
     # Permisos para acceder a la vista: autenticado y ser Admin
     permission_classes = [IsAuthenticated, IsAdministrador]
 
@@ -155,7 +287,7 @@ class MesasEstadoListCreate(generics.ListCreateAPIView):
         self.perform_create(serializer)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-class MesasEstadoDetail(generics.RetrieveUpdateDestroyAPIView):
+class MesasEstadoDetail(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = MesasEstado.objects.all()
     serializer_class = MesasEstadoSerializer
     # Permisos para acceder a la vista: autenticado y ser Admin
@@ -176,14 +308,43 @@ class MesasEstadoDetail(generics.RetrieveUpdateDestroyAPIView):
     
 ##############################################################################################################################
 
-class MesasListCreate(generics.ListCreateAPIView):
+class MesasListCreate(ConditionalGetMixin, generics.ListCreateAPIView):
     queryset = Mesas.objects.all()
     serializer_class = MesasSerializer
+    # Campo de creación usado por la paginación por cursor
+    cursor_field = 'mesa_creada'
     # Permisos para acceder a la vista: autenticado y ser Admin
     permission_classes = [IsAuthenticated, IsAdministrador]
 
+class MesasDisponibles(generics.ListAPIView):
+    # Busca mesas con capacidad suficiente y sin reservas que se crucen con la ventana pedida,
+    # ordenadas por la menor holgura (capacidad sobrante) primero
+    serializer_class = MesaDisponibleSerializer
+    pagination_class = None
+    # Permisos para acceder a la vista: autenticado y ser Admin o Cliente
+    permission_classes = [IsAuthenticated, IsAdministrador | IsCliente]
+
+    def get_queryset(self):
+        parametros = DisponibilidadMesasSerializer(data=self.request.query_params)
+        parametros.is_valid(raise_exception=True)
+        personas = parametros.validated_data['personas']
+        desde = parametros.validated_data['desde']
+        hasta = parametros.validated_data['hasta']
+        duracion = timedelta(minutes=parametros.validated_data['duracion'])
+
+        # El NOT EXISTS correlacionado se resuelve con un rango sobre el índice
+        # (mesa_fk, fecha_reserva) por cada mesa candidata
+        ocupada = Reserva.objects.filter(mesa_fk=OuterRef('pk')).solapadas(desde, hasta, duracion)
+        return (
+            Mesas.objects
+            .filter(capacidad_mesa__gte=personas)
+            .filter(~Exists(ocupada))
+            .annotate(holgura=F('capacidad_mesa') - personas)
+            .order_by('holgura', 'numero_mesa')
+        )
+
 # Detail
-class MesasDetail(generics.RetrieveUpdateDestroyAPIView):
+class MesasDetail(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Mesas.objects.all()
     serializer_class = MesasSerializer
     # Permisos para acceder a la vista: autenticado y ser Admin
@@ -196,14 +357,16 @@ class MesasDetail(generics.RetrieveUpdateDestroyAPIView):
 
 ##############################################################################################################################
 
-class ComentariosListCreate(generics.ListCreateAPIView):
+class ComentariosListCreate(ConditionalGetMixin, generics.ListCreateAPIView):
     queryset = Comentarios.objects.all()
     serializer_class = ComentariosSerializer
+    # Campo de creación usado por la paginación por cursor
+    cursor_field = 'comentario_creado'
     # Permisos para acceder a la vista: autenticado y ser Admin o Cliente
     permission_classes = [IsAuthenticated, IsAdministrador | IsCliente]
 
 # Detail
-class ComentariosDetail(generics.RetrieveUpdateDestroyAPIView):
+class ComentariosDetail(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Comentarios.objects.all()
     serializer_class = ComentariosSerializer
     # Permisos para acceder a la vista: autenticado y ser Admin o Cliente
@@ -217,14 +380,16 @@ class ComentariosDetail(generics.RetrieveUpdateDestroyAPIView):
 ##############################################################################################################################
 
 # ListCreate   
-class NotificacionesListCreate(generics.ListCreateAPIView):
+class NotificacionesListCreate(ConditionalGetMixin, generics.ListCreateAPIView):
     queryset = Notificaciones.objects.all()
     serializer_class = NotificacionesSerializer
+    # Campo de creación usado por la paginación por cursor
+    cursor_field = 'notificacion_creada'
     # Permisos para acceder a la vista: autenticado y ser Admin
     permission_classes = [IsAuthenticated, IsAdministrador]
 
 # Detail
-class NotificacionesDetail(generics.RetrieveUpdateDestroyAPIView):
+class NotificacionesDetail(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Notificaciones.objects.all()
     serializer_class = NotificacionesSerializer
     # Permisos para acceder a la vista: autenticado y ser Admin
@@ -235,17 +400,51 @@ class NotificacionesDetail(generics.RetrieveUpdateDestroyAPIView):
         instance.delete()
         return Response({'message': 'Notificación eliminada correctamente.'}, status=status.HTTP_204_NO_CONTENT)
 
+class NotificacionesFanOut(generics.GenericAPIView):
+    # Envía una notificación a todos los destinatarios del selector con bulk_create por lotes
+    serializer_class = FanOutNotificacionesSerializer
+    # Permisos para acceder a la vista: autenticado y ser Admin
+    permission_classes = [IsAuthenticated, IsAdministrador]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        datos = serializer.validated_data
+        menu = datos.get('menu_fk')
+        usuarios = destinatarios(datos['destino'], menu.pk if menu else None)
+        resultado = enviar_notificaciones(datos['mensaje'], usuarios, lote=settings.NOTIFICACIONES_LOTE)
+        return Response(resultado, status=status.HTTP_201_CREATED)
+
+class NotificacionesMarcarLeidas(generics.GenericAPIView):
+    serializer_class = MarcarLeidasSerializer
+    # Permisos para acceder a la vista: autenticado y ser Admin o Cliente
+    permission_classes = [IsAuthenticated, IsAdministrador | IsCliente]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        # Un solo UPDATE sobre las no leídas del usuario con id <= hasta_id
+        actualizadas = (
+            Notificaciones.objects
+            .filter(cliente_fk=request.user, id__lte=serializer.validated_data['hasta_id'])
+            .no_leidas()
+            .update(leido=True, notificacion_actualizada=timezone.now())
+        )
+        return Response({'actualizadas': actualizadas}, status=status.HTTP_200_OK)
+
 ##############################################################################################################################
 
 # ListCreate   
-class ReservaListCreate(generics.ListCreateAPIView):
+class ReservaListCreate(ConditionalGetMixin, generics.ListCreateAPIView):
     queryset = Reserva.objects.all()
     serializer_class = ReservaSerializer
+    # Campo de creación usado por la paginación por cursor
+    cursor_field = 'reserva_creada'
     # Permisos para acceder a la vista: autenticado y ser Admin o Cliente
     permission_classes = [IsAuthenticated, IsAdministrador | IsCliente]
 
 # Detail
-class ReservaDetail(generics.RetrieveUpdateDestroyAPIView):
+class ReservaDetail(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Reserva.objects.all()
     serializer_class = ReservaSerializer
     # Permisos para acceder a la vista: autenticado y ser Admin
@@ -258,14 +457,16 @@ class ReservaDetail(generics.RetrieveUpdateDestroyAPIView):
 
 ##############################################################################################################################
 
-class FacturaListCreate(generics.ListCreateAPIView):
+class FacturaListCreate(ConditionalGetMixin, generics.ListCreateAPIView):
     queryset = Factura.objects.all()
     serializer_class = FacturaSerializer
+    # Campo de creación usado por la paginación por cursor
+    cursor_field = 'fecha_emision'
     # Permisos para acceder a la vista: autenticado y ser Admin
     permission_classes = [IsAuthenticated, IsAdministrador]
 
 # Detail
-class FacturaDetail(generics.RetrieveUpdateDestroyAPIView):
+class FacturaDetail(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Factura.objects.all()
     serializer_class = FacturaSerializer
     # Permisos para acceder a la vista: autenticado y ser Admin
@@ -278,14 +479,16 @@ class FacturaDetail(generics.RetrieveUpdateDestroyAPIView):
 
 ##############################################################################################################################
 
-class DetallePedidoListCreate(generics.ListCreateAPIView):
+class DetallePedidoListCreate(ConditionalGetMixin, generics.ListCreateAPIView):
     queryset = DetallePedido.objects.all()
     serializer_class = DetallePedidoSerializer
+    # Campo de creación usado por la paginación por cursor
+    cursor_field = 'detalle_pedido_creado'
     # Permisos para acceder a la vista: autenticado y ser Admin
     permission_classes = [IsAuthenticated, IsAdministrador]
 
 # Detail
-class DetallePedidoDetail(generics.RetrieveUpdateDestroyAPIView):
+class DetallePedidoDetail(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = DetallePedido.objects.all()
     serializer_class = DetallePedidoSerializer
     # Permisos para acceder a la vista: autenticado y ser Admin
@@ -298,8 +501,10 @@ class DetallePedidoDetail(generics.RetrieveUpdateDestroyAPIView):
 
 ##############################################################################################################################
 
-class PedidoPorUsuario(generics.ListAPIView):
+class PedidoPorUsuario(ConditionalGetMixin, generics.ListAPIView):
     serializer_class = PedidoSerializer
+    # Campo de creación usado por la paginación por cursor
+    cursor_field = 'pedido_creado'
 
     def get_queryset(self):
         id_cliente = self.kwargs['id_cliente']
@@ -308,10 +513,116 @@ class PedidoPorUsuario(generics.ListAPIView):
 
 ##############################################################################################################################
 
-class ComentarioPorUsuario(generics.ListAPIView):
+class ComentarioPorUsuario(ConditionalGetMixin, generics.ListAPIView):
     serializer_class = ComentariosSerializer
+    # Campo de creación usado por la paginación por cursor
+    cursor_field = 'comentario_creado'
 
     def get_queryset(self):
         usuario_id = self.kwargs['usuario_id']
         # Filtra los comentarios por el usuario especificado
-        return Comentarios.objects.filter(cliente_fk=usuario_id)
\ No newline at end of file
+        return Comentarios.objects.filter(cliente_fk=usuario_id)
+
+##############################################################################################################################
+
+class ReporteVentas(generics.ListAPIView):
+    # Ventas por menú, categoría o tipo de pago, por hora o por día. Solo lee ResumenVentas,
+    # que se mantiene con los comandos actualizar_resumen_ventas y reconstruir_resumen_ventas.
+    serializer_class = ResumenVentasSerializer
+    # Campo usado por la paginación por cursor (del periodo más reciente al más antiguo)
+    cursor_field = 'inicio'
+    # Permisos para acceder a la vista: autenticado y ser Admin
+    permission_classes = [IsAuthenticated, IsAdministrador]
+
+    def get_queryset(self):
+        parametros = ReporteVentasSerializer(data=self.request.query_params)
+        parametros.is_valid(raise_exception=True)
+        filtros = parametros.validated_data
+        # Usa el índice (periodo, dimension, inicio, id)
+        resumenes = ResumenVentas.objects.filter(periodo=filtros['periodo'], dimension=filtros['dimension'])
+        if 'desde' in filtros:
+            resumenes = resumenes.filter(inicio__gte=filtros['desde'])
+        if 'hasta' in filtros:
+            resumenes = resumenes.filter(inicio__lt=filtros['hasta'])
+        if 'clave' in filtros:
+            resumenes = resumenes.filter(clave=filtros['clave'])
+        return resumenes
+
+##############################################################################################################################
+
+class ImportacionView(generics.GenericAPIView):
+    # Importación masiva (upsert) desde un archivo CSV o NDJSON subido como multipart en el
+    # campo 'archivo'. Devuelve cuántas filas se crearon y actualizaron y los errores por fila.
+    serializer_class = ImportacionSerializer
+    # Permisos para acceder a la vista: autenticado y ser Admin
+    permission_classes = [IsAuthenticated, IsAdministrador]
+    importador = None
+
+    def post(self, request, *args, **kwargs):
+        parametros = self.get_serializer(data=request.data)
+        parametros.is_valid(raise_exception=True)
+        datos = parametros.validated_data
+        importador = self.importador(simular=datos['simular'])
+        reporte = importador.importar(leer_filas(datos['archivo'], datos['formato']))
+        return Response(reporte, status=status.HTTP_200_OK)
+
+class CategoriaMenuImportar(ImportacionView):
+    importador = ImportadorCategorias
+
+class MenuImportar(ImportacionView):
+    importador = ImportadorMenus
+
+##############################################################################################################################
+
+class ExportacionView(generics.GenericAPIView):
+    # Exporta en streaming (CSV o NDJSON) las filas creadas en [desde, hasta), de la más antigua
+    # a la más reciente, sin paginar ni construir instancias del modelo
+    # Permisos para acceder a la vista: autenticado y ser Admin
+    permission_classes = [IsAuthenticated, IsAdministrador]
+    # Campo de creación usado para el rango y el recorrido por cursor
+    cursor_field = None
+    # Columnas exportadas (values_list); deben incluir 'id' y cursor_field
+    columnas = ()
+    nombre = None
+
+    def get(self, request, *args, **kwargs):
+        parametros = ExportacionSerializer(data=request.query_params)
+        parametros.is_valid(raise_exception=True)
+        filtros = parametros.validated_data
+        queryset = self.get_queryset()
+        if 'desde' in filtros:
+            queryset = queryset.filter(**{f'{self.cursor_field}__gte': filtros['desde']})
+        if 'hasta' in filtros:
+            queryset = queryset.filter(**{f'{self.cursor_field}__lt': filtros['hasta']})
+        return respuesta_exportacion(queryset, self.cursor_field, self.columnas, filtros['formato'], self.nombre)
+
+class PedidoExportar(ExportacionView):
+    queryset = Pedido.objects.all()
+    cursor_field = 'pedido_creado'
+    columnas = ('id', 'pedido_creado', 'fecha_pedido', 'cliente_fk', 'estado_actual', 'estado_actualizado')
+    nombre = 'pedidos'
+
+class DetallePedidoExportar(ExportacionView):
+    queryset = DetallePedido.objects.all()
+    cursor_field = 'detalle_pedido_creado'
+    columnas = (
+        'id', 'detalle_pedido_creado', 'pedido_fk', 'menu_fk', 'menu_fk__nombre', 'factura_fk', 'promocion_fk',
+        'cantidad', 'subtotal', 'iva', 'total',
+    )
+    nombre = 'detallespedido'
+
+class FacturaExportar(ExportacionView):
+    queryset = Factura.objects.all()
+    cursor_field = 'fecha_emision'
+    columnas = ('id', 'fecha_emision', 'cliente_fk', 'mesa_fk', 'metodo_pago_fk', 'metodo_pago_fk__tipo_pago', 'total_factura')
+    nombre = 'facturas'
+
+##############################################################################################################################
+
+class Metricas(generics.GenericAPIView):
+    # Métricas por ruta en formato de texto de Prometheus (por proceso)
+    # Permisos para acceder a la vista: autenticado y ser Admin
+    permission_classes = [IsAuthenticated, IsAdministrador]
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(registro_metricas.exportar(), content_type='text/plain; version=0.0.4; charset=utf-8')
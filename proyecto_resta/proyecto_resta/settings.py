@@ -44,6 +44,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Métricas por ruta y cabecera Server-Timing (primero, para medir toda la petición)
+    'api.metricas.MetricasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -51,6 +53,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Perfilado opcional de vistas con cProfile (último, para envolver solo la vista)
+    'api.perfilador.PerfiladorMiddleware',
 ]
 
 ROOT_URLCONF = 'proyecto_resta.urls'
@@ -134,5 +138,87 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
-}
\ No newline at end of file
+    ),
+    # Paginación por cursor (creado, id) para todas las vistas de listado
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.KeysetPagination',
+    'PAGE_SIZE': 50,
+    # ?fields= y ?expand= ajustan el queryset de las lecturas (ver api/campos.py)
+    'DEFAULT_FILTER_BACKENDS': ['api.campos.CamposDinamicosFilter'],
+}
+
+# Tope máximo de resultados que un cliente puede pedir con ?page_size=
+API_MAX_PAGE_SIZE = 200
+
+# Caché de roles por proceso usada por IsAdministrador / IsCliente. Las señales de cambio de
+# grupos solo invalidan la caché del proceso que hizo el cambio: los demás workers siguen
+# usando los roles anteriores (p. ej. un Admin revocado) hasta ROLE_CACHE_TTL segundos.
+ROLE_CACHE_MAX_SIZE = 10000
+ROLE_CACHE_TTL = 30  # segundos
+
+# Caché
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# 'catalogo' guarda las respuestas renderizadas de menú, categorías y promociones.
+# LocMem es por proceso; con varios workers usar un backend compartido, p. ej.
+# 'django.core.cache.backends.filebased.FileBasedCache' o Redis/Memcached.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'catalogo': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'catalogo',
+        'TIMEOUT': 300,
+    },
+}
+
+CATALOGO_CACHE_ALIAS = 'catalogo'
+
+# Duración supuesta (en minutos) de una reserva al buscar mesas disponibles
+RESERVA_DURACION_MINUTOS = 120
+
+# Stream SSE de notificaciones: intervalo de keep-alive (segundos) y eventos
+# pendientes por conexión antes de cerrarla para que el cliente se reconecte
+SSE_HEARTBEAT = 15
+SSE_COLA_MAXIMA = 100
+
+# Filas por bulk_create en el envío masivo de notificaciones
+NOTIFICACIONES_LOTE = 1000
+
+# Resúmenes de ventas: solo se incorporan detalles modificados hace más de estos segundos,
+# para no saltarse filas de transacciones que aún no confirmaron; y filas por lote
+VENTAS_RESUMEN_RETRASO = 60
+VENTAS_RESUMEN_LOTE = 5000
+
+# Búsqueda de Menu: ruta del backend (None elige FTS5 en SQLite y el índice invertido en
+# memoria con otras bases) y segundos tras los que el índice en memoria se reconstruye
+MENU_BUSQUEDA_BACKEND = None
+MENU_BUSQUEDA_TTL = 300
+
+# Fracción de peticiones instrumentadas con conteo de consultas, tiempo de base de datos,
+# fases y cabecera Server-Timing (la latencia y el total se registran siempre)
+METRICAS_MUESTREO = 0.05
+
+# Perfilado con cProfile: fracción de peticiones perfiladas (0 = solo con la cabecera
+# X-Perfilar de un Admin o por lentitud), duración a partir de la cual se guarda un perfil
+# muestreado, directorio de los archivos .prof y cuántos se conservan.
+# Con PERFILADOR_LENTAS todas las peticiones se cronometran: una petición no perfilada que
+# supera el umbral no se puede perfilar a posteriori, así que se perfila la siguiente de la
+# misma ruta y se guarda si también lo supera.
+PERFILADOR_MUESTREO = 0
+PERFILADOR_UMBRAL_MS = 1000
+PERFILADOR_LENTAS = True
+PERFILADOR_DIRECTORIO = BASE_DIR / 'perfiles'
+PERFILADOR_MAXIMO = 200
+
+# benchmark_endpoints: empeoramiento relativo admitido frente a la línea base antes de
+# marcar una regresión (0.25 = 25 %)
+BENCHMARK_TOLERANCIA = 0.25
+
+# Filas leídas por consulta en las exportaciones en streaming (CSV/NDJSON)
+EXPORTACION_LOTE = 2000
+
+# Importación masiva de Menu y CategoriaMenu: filas por lote (una transacción cada uno) y
+# máximo de filas con errores incluidas en el reporte
+IMPORTACION_LOTE = 1000
+IMPORTACION_MAX_ERRORES = 1000